@@ -0,0 +1,90 @@
+from __future__ import annotations
+from typing import List, Dict, Optional, TYPE_CHECKING
+
+# NOTE: pandas is imported inside the methods so only runs with compliance enabled pay for it
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Timecard payload fields used for the hours aggregation
+USER_FIELD = 'FirmUserId'
+DATE_FIELD = 'Date'
+HOURS_FIELD = 'Hours'
+
+# Day statuses reported by the compliance engine
+STATUS_MISSING = 'missing'
+STATUS_UNDER_LOGGED = 'under_logged'
+STATUS_COMPLIANT = 'compliant'
+
+class ComplianceEngine:
+    """Hours-based timesheet compliance: logged hours per user per day against expected hours."""
+    def __init__(self, default_hours: float = 8.0, expected_hours: Optional[Dict[int, float]] = None):
+        """
+        Args:
+        - default_hours: Expected hours per work day for users without an override.
+        - expected_hours: Dictionary of user ID to expected hours per work day.
+        """
+        self.default_hours = default_hours
+        self.expected_hours = expected_hours or {}
+
+    def aggregate_hours(self, timecards: List[Dict]) -> pd.Series:
+        """
+        Sum logged hours per user per day over a batch of timecards.
+
+        Args:
+        - timecards: Timecard payloads with 'FirmUserId', 'Date' and 'Hours' fields.
+
+        Returns:
+        - Series of total hours indexed by (UserId, Date).
+        """
+        import pandas as pd
+
+        frame = pd.DataFrame.from_records(timecards, columns=[USER_FIELD, DATE_FIELD, HOURS_FIELD])
+        frame[DATE_FIELD] = frame[DATE_FIELD].astype(str).str.slice(0, 10)
+        frame[HOURS_FIELD] = pd.to_numeric(frame[HOURS_FIELD], errors='coerce').fillna(0.0)
+
+        hours = frame.groupby([USER_FIELD, DATE_FIELD], sort=False)[HOURS_FIELD].sum()
+        hours.index = hours.index.set_names(['UserId', 'Date'])
+        return hours
+
+    def evaluate(self, timecards: List[Dict], user_ids: List[int], work_dates: List[str]) -> pd.DataFrame:
+        """
+        Check every user's logged hours for every work day against their expected hours.
+
+        Args:
+        - timecards: All timecard payloads for the period (any number of users).
+        - user_ids: Users to evaluate; users without timecards count as missing every day.
+        - work_dates: Work days to evaluate ('YYYY-MM-DD').
+
+        Returns:
+        - DataFrame with one row per (UserId, Date) and columns 'Hours', 'ExpectedHours' and 'Status'.
+        """
+        import numpy as np
+        import pandas as pd
+
+        grid = pd.MultiIndex.from_product([user_ids, work_dates], names=['UserId', 'Date'])
+        hours = self.aggregate_hours(timecards).reindex(grid, fill_value=0.0)
+
+        result = hours.rename('Hours').to_frame()
+        user_level = result.index.get_level_values('UserId')
+        result['ExpectedHours'] = pd.Series(user_level, index=result.index).map(self.expected_hours).fillna(self.default_hours)
+        result['Status'] = np.select(
+            [result['Hours'] <= 0, result['Hours'] < result['ExpectedHours']],
+            [STATUS_MISSING, STATUS_UNDER_LOGGED],
+            default=STATUS_COMPLIANT
+        )
+        return result
+
+    def dates_by_status(self, evaluation: pd.DataFrame, status: str) -> Dict[int, List[str]]:
+        """
+        Group an evaluate() result into the list of dates per user with the given status.
+
+        Returns:
+        - Dictionary of user ID to sorted dates, only for users with at least one such date.
+        """
+        flagged = evaluation[evaluation['Status'] == status].reset_index().sort_values(['UserId', 'Date'])
+
+        # Single pass over the (already sorted) flagged rows instead of a Python call per group
+        dates_by_user = {}
+        for user_id, date_str in zip(flagged['UserId'].tolist(), flagged['Date'].tolist()):
+            dates_by_user.setdefault(user_id, []).append(date_str)
+        return dates_by_user
@@ -0,0 +1,139 @@
+import os
+import ast
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+
+# Tracks whether the .env file has already been loaded into the environment
+_env_loaded = False
+
+def _ensure_env_loaded():
+    """Load the .env file once, on first configuration access rather than at import time."""
+    global _env_loaded
+    if _env_loaded:
+        return
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    _env_loaded = True
+
+def get_env(name: str, default: Optional[str] = None) -> Optional[str]:
+    """
+    Read a configuration value from the environment (or .env file).
+
+    Args:
+    - name: Name of the environment variable.
+    - default: Value returned when the variable is not set.
+
+    Returns:
+    - The variable's value, or the default if it is not set.
+    """
+    _ensure_env_loaded()
+    return os.getenv(name, default)
+
+# Local databases (outbound spool, rollups, results, snapshots, report cache) live in this git-ignored
+# directory; the workflow keeps it between runs as an encrypted artifact instead of committing it
+DEFAULT_STATE_DIR = 'state'
+
+def get_state_path(name: str) -> str:
+    """
+    Path of a file or directory inside the state directory (STATE_DIR, then DEFAULT_STATE_DIR), which is created if needed.
+
+    Args:
+    - name: File or directory name inside the state directory.
+
+    Returns:
+    - The path.
+    """
+    state_dir = get_env('STATE_DIR') or DEFAULT_STATE_DIR
+    os.makedirs(state_dir, exist_ok=True)
+    return os.path.join(state_dir, name)
+
+def get_state_file(env_name: str, default_name: str) -> str:
+    """
+    Path of a local database configured by an environment variable.
+
+    A relative value is taken as a file name inside the state directory (so it is never written into the
+    repository), an absolute value is used as is (its directory is created if needed).
+
+    Args:
+    - env_name: Name of the environment variable holding the file name or absolute path.
+    - default_name: File name inside the state directory when the variable is not set.
+
+    Returns:
+    - The path.
+    """
+    value = get_env(env_name)
+    if value and os.path.isabs(value):
+        os.makedirs(os.path.dirname(value), exist_ok=True)
+        return value
+    return get_state_path(os.path.basename(value) if value else default_name)
+
+def get_flag(name: str) -> bool:
+    """True if the environment variable is set to 1, true, yes or on (case-insensitive)."""
+    return (get_env(name) or '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+@lru_cache(maxsize=None)
+def get_admin_emails() -> List[str]:
+    """
+    Parse the ADMIN_EMAILS variable, e.g. "['a@firm.com', 'b@firm.com']".
+
+    Returns:
+    - List of admin email addresses (empty if the variable is not set).
+    """
+    raw_value = get_env('ADMIN_EMAILS')
+    if not raw_value:
+        return []
+
+    admin_emails = ast.literal_eval(raw_value)
+    if isinstance(admin_emails, str):
+        return [admin_emails]
+    return list(admin_emails)
+
+@lru_cache(maxsize=None)
+def get_expected_hours() -> Optional[Tuple[float, Dict[int, float]]]:
+    """
+    Parse the expected daily hours configuration for the compliance engine.
+
+    EXPECTED_HOURS is the firm-wide default (e.g. "8"), and EXPECTED_HOURS_BY_USER
+    optionally overrides it per user ID (e.g. "{87002: 4, 93812: 6}").
+
+    Returns:
+    - None if EXPECTED_HOURS is not set (hours-based compliance disabled).
+    - Otherwise a tuple of (default hours, dictionary of user ID to expected hours).
+    """
+    default_hours = get_env('EXPECTED_HOURS')
+    if not default_hours:
+        return None
+
+    raw_overrides = get_env('EXPECTED_HOURS_BY_USER')
+    overrides = ast.literal_eval(raw_overrides) if raw_overrides else {}
+    return float(default_hours), {int(user_id): float(hours) for user_id, hours in overrides.items()}
+
+@lru_cache(maxsize=None)
+def get_report_formats() -> List[str]:
+    """
+    Parse the REPORT_FORMATS variable, e.g. "csv,xlsx,parquet".
+
+    Returns:
+    - Lowercase attachment formats for the summary reports (['csv'] if the variable is not set).
+    """
+    raw_value = get_env('REPORT_FORMATS')
+    if not raw_value:
+        return ['csv']
+    return [fmt.strip().lower() for fmt in raw_value.split(',') if fmt.strip()]
+
+@lru_cache(maxsize=None)
+def get_manager_reports() -> Dict[str, List[int]]:
+    """
+    Parse the MANAGER_REPORTS variable, mapping a manager's email to the IDs of the users on their team,
+    e.g. "{'manager@firm.com': [87002, 93812]}".
+
+    Returns:
+    - Dictionary of manager email to list of user IDs (empty if the variable is not set).
+    """
+    raw_value = get_env('MANAGER_REPORTS')
+    if not raw_value:
+        return {}
+
+    manager_reports = ast.literal_eval(raw_value)
+    return {email: [int(user_id) for user_id in user_ids] for email, user_ids in manager_reports.items()}
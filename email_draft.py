@@ -1,20 +1,49 @@
-import requests
-import msal
+from __future__ import annotations
+import csv
+import heapq
 import json
 import os
-from dotenv import load_dotenv
 import base64
-import pandas as pd
-from typing import List, Dict, Tuple
-import ast
- 
-load_dotenv()
-CLIENT_ID = os.getenv('MICROSOFT_CLIENT_ID')
-CLIENT_SECRET = os.getenv('MICROSOFT_CLIENT_SECRET')
-TENANT_ID = os.getenv('MICROSOFT_TENANT_ID')
-SENDER_EMAIL = os.getenv('SENDER_EMAIL')
+from collections import Counter
+from typing import List, Dict, Tuple, Iterable, Iterator, Optional, TYPE_CHECKING
+from config import get_env
+from email_templates import EmailTemplates
+from profiling import mark_phase
+from spill import ColumnarSpill
+
+# NOTE: msal, pandas and requests are imported inside the methods that need them so importing this module stays cheap
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Name of the summary CSV attachment (also its temporary path while the message is built)
+SUMMARY_FILENAME = 'missing_time_sheets_summary.csv'
+
+# Stand-in for the attachment's contentBytes when the attachment is streamed from disk (see post_message)
+ATTACHMENT_PLACEHOLDER = '__STREAMED_ATTACHMENT__'
+
+# Bytes read per chunk when streaming an attachment (a multiple of 3, so base64 chunks concatenate cleanly)
+ATTACHMENT_CHUNK_BYTES = 3 * 64 * 1024
+
+# Graph rejects inline (sendMail) attachments above about 3 MB; larger ones are uploaded to a draft with an upload session
+INLINE_ATTACHMENT_LIMIT = 3 * 1024 * 1024
+
+# Bytes per upload session PUT (Graph requires a multiple of 320 KiB)
+UPLOAD_CHUNK_BYTES = 10 * 320 * 1024
+
+# Memory-bounded mode: users listed by name in the summary's errors and under-logged sections (the rest are only counted)
+SUMMARY_LIST_LIMIT = 100
+
+# Columns written to the summary CSV attachment when users are passed as a list of rows
+SUMMARY_COLUMNS = ['UserId', 'Email', 'Name', 'NoSubmissionDates', 'NoSubmissionCount', 'UnderLoggedDates', 'lastEmailSentDate', 'lastUpdateDate', 'Comments']
 
 class EmailDraft:
+    def __init__(self):
+        self.client_id = get_env('MICROSOFT_CLIENT_ID')
+        self.client_secret = get_env('MICROSOFT_CLIENT_SECRET')
+        self.tenant_id = get_env('MICROSOFT_TENANT_ID')
+        self.sender_email = get_env('SENDER_EMAIL')
+        self.templates = EmailTemplates()
+
     def get_access_token(self) -> tuple[bool, str]:
         """
         Authenticate with Microsoft Graph API to get token.
@@ -22,12 +51,13 @@ class EmailDraft:
         Returns:
         - A tuple containing a boolean indicating success, and the access token or error message.
         """
-        authority = f"https://login.microsoftonline.com/{TENANT_ID}"
+        import msal
+        authority = f"https://login.microsoftonline.com/{self.tenant_id}"
 
         app = msal.ConfidentialClientApplication(
-            CLIENT_ID,
+            self.client_id,
             authority=authority,
-            client_credential=CLIENT_SECRET
+            client_credential=self.client_secret
         )
         
         # Request token with Mail.Send scope
@@ -59,6 +89,8 @@ class EmailDraft:
         - user_error_desc: DataFrame of users with errors
         - file_path: Path to the generated bar graph image
         """
+        import pandas as pd
+
         # Top 5 users with most missing submissions
         users['NoSubmissionCount'] = pd.to_numeric(users['NoSubmissionCount'], errors='coerce')
         top_5 = users.nlargest(5, 'NoSubmissionCount')
@@ -87,163 +119,371 @@ class EmailDraft:
 
         return top_5_no_subs, percentage_missing, most_frequent_day, user_error_desc
 
+    def records_statistics(self, users: Iterable[Dict], list_limit: Optional[int] = None) -> tuple[List[Dict], float, Dict[str, int], List[Dict], List[Dict], Dict[str, int]]:
+        """
+        Pandas-free equivalent of statistics_generator (plus the under-logged users), computed in a single pass.
+
+        Args:
+        - users: List of user rows (or a ColumnarSpill), each with 'NoSubmissionDates', 'NoSubmissionCount' and 'Comments' keys.
+        - list_limit: Keep at most this many rows in user_error_desc and under_logged (the rest are only counted),
+          so memory stays bounded for a ColumnarSpill. None keeps every row.
 
-    def send_email(self, token, to_email, name, user_id, start_date, end_date, missing_dates) -> tuple[bool, str]:
+        Returns:
+        - top_5_no_subs: List of the top 5 user rows by missing submission count
+        - percentage_missing: Percentage of users with missing submissions
+        - most_frequent_day: Dict of most frequently missed dates to their count
+        - user_error_desc: List of user rows with errors
+        - under_logged: List of user rows with under-logged days ('UnderLoggedDates')
+        - omitted: Number of rows left out of user_error_desc and under_logged by list_limit ('errors', 'under_logged')
         """
-        Send an email using Microsoft Graph API.
+        top_5_heap = []             # (count, -position, row), so ties keep their original order like DataFrame.nlargest
+        total_users = 0
+        total_missing = 0
+        days_count = Counter()
+        user_error_desc = []
+        under_logged = []
+        omitted = {'errors': 0, 'under_logged': 0}
+
+        for position, row in enumerate(users):
+            count = row.get('NoSubmissionCount') or 0
+            total_users += 1
+            if count > 0:
+                total_missing += 1
+            days_count.update(row.get('NoSubmissionDates') or [])
+            if (row.get('Comments') or "") != "":
+                if list_limit is None or len(user_error_desc) < list_limit:
+                    user_error_desc.append(row)
+                else:
+                    omitted['errors'] += 1
+            if row.get('UnderLoggedDates'):
+                if list_limit is None or len(under_logged) < list_limit:
+                    under_logged.append(row)
+                else:
+                    omitted['under_logged'] += 1
+
+            # Top 5 users with most missing submissions
+            if len(top_5_heap) < 5:
+                heapq.heappush(top_5_heap, (count, -position, row))
+            elif (count, -position) > top_5_heap[0][:2]:
+                heapq.heapreplace(top_5_heap, (count, -position, row))
+
+        top_5_no_subs = [row for _, _, row in sorted(top_5_heap, key=lambda item: item[:2], reverse=True)]
+
+        # Percentage of users with missing submissions
+        percentage_missing = round((total_missing / total_users * 100), 2) if total_users > 0 else 0
+
+        # Most frequently missed dates
+        if days_count:
+            highest_count = max(days_count.values())
+            most_frequent_day = {day: count for day, count in days_count.items() if count == highest_count}
+        else:
+            most_frequent_day = {}
+
+        return top_5_no_subs, percentage_missing, most_frequent_day, user_error_desc, under_logged, omitted
+
+    def write_summary_csv(self, users: pd.DataFrame | List[Dict] | ColumnarSpill, filename: str):
+        """
+        Write the summary report to a CSV file (rows are streamed, so a ColumnarSpill is never loaded whole).
+
+        Args:
+        - users: DataFrame, list of user rows or ColumnarSpill.
+        - filename: Path of the CSV file to write.
+        """
+        if not isinstance(users, (list, ColumnarSpill)):
+            users.to_csv(filename, index=False)
+            return
+
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(SUMMARY_COLUMNS)
+            for row in users:
+                writer.writerow([row.get(column, "") for column in SUMMARY_COLUMNS])
+
+    def build_recipients(self, to_email) -> List[Dict]:
+        """Build the Graph toRecipients list for a single address or a list of addresses."""
+        if isinstance(to_email, str):
+            return [{"emailAddress": {"address": to_email}}]
+        return [{"emailAddress":{"address":email}} for email in to_email]
+
+    def build_reminder_message(self, to_email, name, start_date, end_date, missing_dates, body=None, body_type='Text', under_logged_dates=()) -> Dict:
+        """
+        Build the Graph sendMail payload for a missing time sheet reminder.
 
         Args:
-        - token: The access token for Microsoft Graph API.
         - to_email: The recipient's email address.
         - name: The recipient's name.
-        - user_id: The recipient's user ID.
         - start_date: Start date of the work week.
         - end_date: End date of the work week.
         - missing_dates: List of dates with missing time sheet submissions.
+        - body: Pre-rendered body (see EmailTemplates.render_reminders). Rendered from the template if not given.
+        - body_type: 'Text' or 'HTML'.
+        - under_logged_dates: List of dates with fewer hours logged than expected.
 
         Returns:
-        - A tuple containing a boolean indicating success, and a message string.
+        - The sendMail request payload.
         """
+        if body is None:
+            body = self.templates.render_reminder(name, missing_dates, body_type, under_logged_dates)
 
-        body = f"Dear {name},\n\nOur records indicate that you have not submitted your time sheets for the following dates in the current work week:\n"
-        for date in missing_dates:
-            body += f"- {date}\n"
-        body += "\nPlease ensure that you submit your time sheets on TimeSolv at your earliest convenience. Otherwise, the above dates will be processed as PTO; however, if PTO was already requested for the specific dates above, please ignore this email. \n\nIf you have any questions or concerns, please don't hesitate to reach out.\n\nBest regards,\nAlexandra Hernandez"
+        return {
+            'message': {
+                'subject': self.templates.reminder_subject(start_date, end_date),
+                'body': {
+                    'contentType': body_type,
+                    'content': body
+                },
+                'toRecipients': self.build_recipients(to_email)
+            },
+            'saveToSentItems': "false"
+        }
 
-        subject = f"Missing time sheets for work week {start_date} to {end_date}"
+    def post_message(self, token, message, attachment_path=None) -> tuple[bool, str]:
+        """
+        Post a sendMail payload to Microsoft Graph API.
+
+        Args:
+        - token: The access token for Microsoft Graph API.
+        - message: The sendMail request payload.
+        - attachment_path: File streamed (base64-encoded chunk by chunk) in place of ATTACHMENT_PLACEHOLDER,
+          so a large attachment is never held in memory.
+
+        Messages with an attachment above INLINE_ATTACHMENT_LIMIT are sent as a draft instead (see _send_as_draft).
+
+        Returns:
+        - A tuple containing a boolean indicating success, and an error message (empty on success).
+        """
+        import requests
+
+        attachments = message['message'].get('attachments') or []
+        if any(self._attachment_size(attachment, attachment_path) > INLINE_ATTACHMENT_LIMIT for attachment in attachments):
+            return self._send_as_draft(token, message, attachment_path)
 
         headers = {
             'Authorization': f'Bearer {token}',
             'Content-Type': 'application/json'
         }
 
-        # For single or multiple recipients
-        if isinstance(to_email, str):
-            to_recipients = [{"emailAddress": {"address": to_email}}]
+        endpoint = f'https://graph.microsoft.com/v1.0/users/{self.sender_email}/sendMail'
+        if attachment_path is None:
+            response = requests.post(endpoint, headers=headers, json=message)
         else:
-            to_recipients = [{"emailAddress":{"address":email}} for email in to_email]
-            
-        message = {
-            'message': {
-                'subject': subject,
-                'body': {
-                    'contentType': 'Text',
-                    'content': body
-                },
-                'toRecipients': to_recipients
-            },
-            'saveToSentItems': "false"
-        }
+            response = requests.post(endpoint, headers=headers, data=self._stream_payload(message, attachment_path))
 
-        endpoint = f'https://graph.microsoft.com/v1.0/users/{SENDER_EMAIL}/sendMail'
-        response = requests.post(endpoint, headers=headers, json=message)
-        
         # If there's an error sending the email
         if response.status_code != 202:
-            status = False
-            message_str = f"Failed to send email. Status code: {response.status_code}"
-            return status, message_str
-        
-        status = True
-        message_str = f"Email sent successfully to {user_id}."
-        return status, message_str
+            return False, f"Failed to send email. Status code: {response.status_code}"
+
+        return True, ""
 
-    def summary_email(self, token, to_email, users, start_date, end_date) -> tuple[bool, str]:
+    @staticmethod
+    def _attachment_size(attachment: Dict, attachment_path: Optional[str]) -> int:
+        """Size in bytes of an attachment: the streamed file's, or the decoded size of its contentBytes."""
+        if attachment['contentBytes'] == ATTACHMENT_PLACEHOLDER:
+            return os.path.getsize(attachment_path)
+        return len(attachment['contentBytes']) * 3 // 4
+
+    def _send_as_draft(self, token, message, attachment_path) -> tuple[bool, str]:
         """
-        Send a summary email listing all users with missing time sheet submissions.
-        
+        Send a message with large attachments: create it as a draft, attach small files directly and upload
+        large ones in UPLOAD_CHUNK_BYTES pieces through an upload session, then send the draft.
+
+        NOTE: Graph saves a sent draft to Sent Items, whatever saveToSentItems says. A draft left behind by a failure is deleted.
+
         Args:
         - token: The access token for Microsoft Graph API.
-        - to_email: The recipient's email address, admins.
-        - users: Dataframe containing user data with 'NoSubmissionDates' column.
+        - message: The sendMail request payload.
+        - attachment_path: File holding the attachment whose contentBytes is ATTACHMENT_PLACEHOLDER.
+
+        Returns:
+        - A tuple containing a boolean indicating success, and an error message (empty on success).
+        """
+        import io
+        import requests
+
+        headers = {
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json'
+        }
+        messages_endpoint = f'https://graph.microsoft.com/v1.0/users/{self.sender_email}/messages'
+
+        draft = {key: value for key, value in message['message'].items() if key != 'attachments'}
+        response = requests.post(messages_endpoint, headers=headers, json=draft)
+        if response.status_code != 201:
+            return False, f"Failed to create draft email. Status code: {response.status_code}"
+        draft_endpoint = f"{messages_endpoint}/{response.json()['id']}"
+
+        for attachment in message['message'].get('attachments') or []:
+            size = self._attachment_size(attachment, attachment_path)
+            if attachment['contentBytes'] != ATTACHMENT_PLACEHOLDER and size <= INLINE_ATTACHMENT_LIMIT:
+                response = requests.post(f"{draft_endpoint}/attachments", headers=headers, json=attachment)
+                if response.status_code != 201:
+                    break
+                continue
+
+            response = requests.post(f"{draft_endpoint}/attachments/createUploadSession", headers=headers, json={
+                'AttachmentItem': {
+                    'attachmentType': 'file',
+                    'name': attachment['name'],
+                    'contentType': attachment['contentType'],
+                    'size': size
+                }
+            })
+            if response.status_code != 201:
+                break
+
+            # The upload URL is pre-authenticated (it must not get the Authorization header)
+            upload_url = response.json()['uploadUrl']
+            if attachment['contentBytes'] == ATTACHMENT_PLACEHOLDER:
+                source = open(attachment_path, 'rb')
+            else:
+                source = io.BytesIO(base64.b64decode(attachment['contentBytes']))
+            with source:
+                offset = 0
+                while chunk := source.read(UPLOAD_CHUNK_BYTES):
+                    response = requests.put(upload_url, data=chunk, headers={
+                        'Content-Length': str(len(chunk)),
+                        'Content-Range': f"bytes {offset}-{offset + len(chunk) - 1}/{size}"
+                    })
+                    if response.status_code not in (200, 201):
+                        break
+                    offset += len(chunk)
+            if response.status_code not in (200, 201):
+                break
+        else:
+            response = requests.post(f"{draft_endpoint}/send", headers=headers)
+            if response.status_code == 202:
+                return True, ""
+
+        status_code = response.status_code
+        requests.delete(draft_endpoint, headers=headers)
+        return False, f"Failed to send email. Status code: {status_code}"
+
+    def _stream_payload(self, message, attachment_path) -> Iterator[bytes]:
+        """Yield the JSON payload with the attachment file base64-encoded in place of ATTACHMENT_PLACEHOLDER."""
+        prefix, suffix = json.dumps(message).split(ATTACHMENT_PLACEHOLDER, 1)
+        yield prefix.encode('utf-8')
+        with open(attachment_path, 'rb') as f:
+            while chunk := f.read(ATTACHMENT_CHUNK_BYTES):
+                yield base64.b64encode(chunk)
+        yield suffix.encode('utf-8')
+
+    def send_email(self, token, to_email, name, user_id, start_date, end_date, missing_dates, body=None, body_type='Text', under_logged_dates=()) -> tuple[bool, str]:
+        """
+        Send an email using Microsoft Graph API.
+
+        Args:
+        - token: The access token for Microsoft Graph API.
+        - to_email: The recipient's email address.
+        - name: The recipient's name.
+        - user_id: The recipient's user ID.
         - start_date: Start date of the work week.
         - end_date: End date of the work week.
+        - missing_dates: List of dates with missing time sheet submissions.
+        - body: Pre-rendered body (see EmailTemplates.render_reminders). Rendered from the template if not given.
+        - body_type: 'Text' or 'HTML'.
+        - under_logged_dates: List of dates with fewer hours logged than expected.
 
         Returns:
         - A tuple containing a boolean indicating success, and a message string.
         """
+        message = self.build_reminder_message(to_email, name, start_date, end_date, missing_dates, body, body_type, under_logged_dates)
+        status, error_message = self.post_message(token, message)
 
-        # Summary/statistics report of all users with missing submissions
-        top_5_no_subs, percentage_missing, most_frequent_day, user_error_desc = self.statistics_generator(users)
+        if not status:
+            return status, error_message
 
-        # Format most frequently missed dates as comma-separated list
-        if len(most_frequent_day) > 0:
-            frequent_dates_str = ', '.join(most_frequent_day.index.astype(str))
-        else:
-            frequent_dates_str = "None"
+        return status, f"Email sent successfully to {user_id}."
 
-        # Format top 5 users
-        top_5_html = ""
-        if len(top_5_no_subs) > 0:
-            for index, row in top_5_no_subs.iterrows():
-                top_5_html += f"                <li><strong>{row['Name']}</strong>: {row['NoSubmissionDates']}</li>\n"
-        else:
-            top_5_html = "                <li>None</li>"
-
-        # Format users with errors
-        if len(user_error_desc) > 0:
-            errors_html = ""
-            for _, row in user_error_desc.iterrows():
-                name = row['Name']
-                comments = row['Comments']
-                errors_html += f"                <li><strong>{name}</strong>: {comments}</li>\n"
+    def render_summary_body(self, users, start_date, end_date, body_type='HTML', trends=None) -> Tuple[str, str]:
+        """
+        Compute the summary statistics and render the admin summary (no attachment, no I/O).
+
+        Args:
+        - users: DataFrame, list of user rows or ColumnarSpill containing 'NoSubmissionDates' column.
+        - start_date: Start date of the work week.
+        - end_date: End date of the work week.
+        - body_type: 'HTML' or 'Text'.
+        - trends: Optional multi-week trends (RollupStore.trends()) to include in the summary.
+
+        Returns:
+        - Tuple of (subject, body).
+        """
+        # Summary/statistics report of all users with missing submissions (pandas only for large firms)
+        omitted = None
+        if isinstance(users, (list, ColumnarSpill)):
+            # A spill's error and under-logged listings are capped, so the statistics pass stays bounded in memory
+            list_limit = SUMMARY_LIST_LIMIT if isinstance(users, ColumnarSpill) else None
+            top_5_no_subs, percentage_missing, most_frequent_day, user_error_desc, under_logged, omitted = self.records_statistics(users, list_limit)
         else:
-            errors_html = "None"
-        
-        body = f"""<html>
-        <body style="font-family: Calibri, Arial, sans-serif; font-size: 11pt; color: #333;">
-            <p>Dear Admins,</p>
-            <p>Here is a summary for the recent time sheet submissions for the work week <strong>{start_date} to {end_date}</strong>:</p>
-            
-            <ul style="line-height: 1.5;">
-                <li><strong>Top 5 Users with Most Missing Submissions:</strong>
-                    <ul>
-        {top_5_html}
-                    </ul>
-                </li>
-                <li><strong>Percentage of Users with Missing Submissions:</strong> {percentage_missing}%</li>
-                <li><strong>Most Frequently Missed Date(s):</strong> {frequent_dates_str}</li>
-                <li><strong>Users with Errors:</strong>
-                    {'<ul>' if len(user_error_desc) > 0 else ''}
-        {errors_html if len(user_error_desc) > 0 else '            None'}
-                    {'</ul>' if len(user_error_desc) > 0 else ''}
-                </li>
-            </ul>
-            
-            <p>Please refer to the attached file for the full data from the work week.</p>
-            
-            <p>Best regards,<br>Alexandra Hernandez</p>
-        </body>
-        </html>"""
-
-        subject = "Summary of Users with Missing Time Sheet Submissions for Work Week " + start_date + " to " + end_date
+            top_5_df, percentage_missing, most_frequent_series, user_error_df = self.statistics_generator(users)
+            top_5_no_subs = top_5_df.to_dict('records')
+            most_frequent_day = most_frequent_series.to_dict()
+            user_error_desc = user_error_df.to_dict('records')
+
+            # Users with days logged below their expected hours (only present when hours-based compliance is enabled)
+            if 'UnderLoggedDates' in users.columns:
+                under_logged = users[users['UnderLoggedDates'].map(lambda dates: isinstance(dates, list) and len(dates) > 0)].to_dict('records')
+            else:
+                under_logged = []
+
+        body = self.templates.render_summary(
+            start_date=start_date,
+            end_date=end_date,
+            top_5_no_subs=top_5_no_subs,
+            percentage_missing=percentage_missing,
+            most_frequent_day=most_frequent_day,
+            under_logged=under_logged,
+            user_error_desc=user_error_desc,
+            body_type=body_type,
+            extra_sections=self.templates.render_trends(trends, body_type) if trends else "",
+            omitted=omitted
+        )
+        subject = self.templates.summary_subject(start_date, end_date)
+        return subject, body
 
-        # Saving the summary report as an attachment (CSV file for simplicity)
-        filename = 'missing_time_sheets_summary.csv'
-        users.to_csv(filename, index=False)
-        with open(filename, 'rb') as f:
-            file_content = f.read()
-            encoded_content = base64.b64encode(file_content).decode('utf-8')
 
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
+    def build_summary_message(self, to_email, users, start_date, end_date, body_type='HTML', trends=None, stream_attachment=False) -> Dict:
+        """
+        Build the Graph sendMail payload for the admin summary, with the full data as a CSV attachment.
 
-        # For single or multiple recipients
-        if isinstance(to_email, str):
-            to_recipients = [{"emailAddress": {"address": to_email}}]
+        Args:
+        - to_email: The recipient's email address, admins.
+        - users: DataFrame or list of user rows containing 'NoSubmissionDates' column.
+        - start_date: Start date of the work week.
+        - end_date: End date of the work week.
+        - body_type: 'HTML' or 'Text'.
+        - trends: Optional multi-week trends (RollupStore.trends()) to include in the summary.
+        - stream_attachment: Leave the CSV on disk and put ATTACHMENT_PLACEHOLDER in the payload,
+          to be streamed by post_message(attachment_path=SUMMARY_FILENAME). The caller removes the file.
+
+        Returns:
+        - The sendMail request payload.
+        """
+
+        # Summary/statistics report of all users with missing submissions
+        mark_phase('statistics')
+        subject, body = self.render_summary_body(users, start_date, end_date, body_type, trends)
+        mark_phase('email')
+
+        # Saving the summary report as an attachment (CSV file for simplicity)
+        filename = SUMMARY_FILENAME
+        self.write_summary_csv(users, filename)
+        if stream_attachment:
+            encoded_content = ATTACHMENT_PLACEHOLDER
         else:
-            to_recipients = [{"emailAddress":{"address":email}} for email in to_email]
-            
-        message = {
+            with open(filename, 'rb') as f:
+                file_content = f.read()
+                encoded_content = base64.b64encode(file_content).decode('utf-8')
+            os.remove(filename)    # Clean up the attachment file
+
+        return {
             'message': {
                 'subject': subject,
                 'body': {
-                    'contentType': 'HTML', 
+                    'contentType': body_type,
                     'content': body
                 },
-                'toRecipients': to_recipients,
+                'toRecipients': self.build_recipients(to_email),
                 "attachments": [
                     {
                         "@odata.type": "#microsoft.graph.fileAttachment",
@@ -256,16 +496,34 @@ class EmailDraft:
             'saveToSentItems': "false"
         }
 
-        endpoint = f'https://graph.microsoft.com/v1.0/users/{SENDER_EMAIL}/sendMail'
-        response = requests.post(endpoint, headers=headers, json=message)
-        
-        # If there's an error sending the email
-        if response.status_code != 202:
-            status = False
-            message_str = f"Failed to send email. Status code: {response.status_code}"
-            return status, message_str
+    def summary_email(self, token, to_email, users, start_date, end_date, body_type='HTML', trends=None) -> tuple[bool, str]:
+        """
+        Send a summary email listing all users with missing time sheet submissions.
         
-        status = True
-        message_str = f"Email sent successfully."
-        os.remove('missing_time_sheets_summary.csv')    # Clean up the attachment file
-        return status, message_str
\ No newline at end of file
+        Args:
+        - token: The access token for Microsoft Graph API.
+        - to_email: The recipient's email address, admins.
+        - users: DataFrame, list of user rows or ColumnarSpill containing 'NoSubmissionDates' column.
+          A ColumnarSpill's attachment is streamed from disk instead of being encoded in memory.
+        - start_date: Start date of the work week.
+        - end_date: End date of the work week.
+        - body_type: 'HTML' or 'Text'.
+        - trends: Optional multi-week trends (RollupStore.trends()) to include in the summary.
+
+        Returns:
+        - A tuple containing a boolean indicating success, and a message string.
+        """
+        if isinstance(users, ColumnarSpill):
+            message = self.build_summary_message(to_email, users, start_date, end_date, body_type, trends, stream_attachment=True)
+            try:
+                status, error_message = self.post_message(token, message, attachment_path=SUMMARY_FILENAME)
+            finally:
+                os.remove(SUMMARY_FILENAME)    # Clean up the attachment file
+        else:
+            message = self.build_summary_message(to_email, users, start_date, end_date, body_type, trends)
+            status, error_message = self.post_message(token, message)
+
+        if not status:
+            return status, error_message
+
+        return status, "Email sent successfully."
@@ -0,0 +1,308 @@
+import argparse
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from typing import List, Dict, Optional, Iterable, Tuple
+from config import get_env, get_state_path
+
+logger = logging.getLogger(__name__)
+
+# Default file name of the outbound spool, inside the state directory (see config.get_state_path)
+DEFAULT_SPOOL_FILENAME = 'outbox.db'
+
+# Outbox message statuses
+STATUS_PENDING = 'pending'
+STATUS_SENDING = 'sending'
+STATUS_SENT = 'sent'
+STATUS_DEAD = 'dead'
+
+# Days a sent message's dedupe key is kept (for rerun protection); EMAIL_SPOOL_RETENTION_DAYS overrides it
+DEFAULT_RETENTION_DAYS = 28
+
+class EmailSpool:
+    """Persistent SQLite-backed outbound email queue."""
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+        - path: SQLite file for the spool. Defaults to EMAIL_SPOOL_PATH, then DEFAULT_SPOOL_FILENAME in the state directory.
+        """
+        self.path = path or get_env('EMAIL_SPOOL_PATH') or get_state_path(DEFAULT_SPOOL_FILENAME)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dedupe_key TEXT UNIQUE,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+        """)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def enqueue(self, kind: str, message: Dict, dedupe_key: Optional[str] = None) -> bool:
+        """
+        Add a Graph sendMail payload to the spool.
+
+        Args:
+        - kind: Message kind, e.g. 'reminder' or 'summary'.
+        - message: The sendMail request payload.
+        - dedupe_key: Optional key; a message with an already spooled key is not enqueued again (e.g. on reruns).
+
+        Returns:
+        - True if the message was enqueued, False if it was a duplicate.
+        """
+        return self.enqueue_many([(kind, message, dedupe_key)]) == 1
+
+    def enqueue_many(self, messages: Iterable[Tuple[str, Dict, Optional[str]]]) -> int:
+        """
+        Add several sendMail payloads to the spool in one transaction (see enqueue).
+
+        Args:
+        - messages: (kind, message, dedupe_key) tuples.
+
+        Returns:
+        - Number of messages enqueued (duplicates are skipped).
+        """
+        now = time.time()
+        before = self.connection.total_changes
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO outbox (dedupe_key, kind, payload, status, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(dedupe_key, kind, json.dumps(message), STATUS_PENDING, now, now, now) for kind, message, dedupe_key in messages]
+            )
+        return self.connection.total_changes - before
+
+    def claim_due(self, limit: int) -> List[Dict]:
+        """
+        Claim up to `limit` pending messages whose next attempt is due, marking them as sending.
+
+        Returns:
+        - List of dictionaries with 'id', 'kind', 'message' and 'attempts' keys.
+        """
+        now = time.time()
+        rows = self.connection.execute(
+            "SELECT id, kind, payload, attempts FROM outbox WHERE status = ? AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+            (STATUS_PENDING, now, limit)
+        ).fetchall()
+
+        self.connection.executemany(
+            "UPDATE outbox SET status = ?, updated_at = ? WHERE id = ?",
+            [(STATUS_SENDING, now, row[0]) for row in rows]
+        )
+        self.connection.commit()
+        return [{'id': row[0], 'kind': row[1], 'message': json.loads(row[2]), 'attempts': row[3]} for row in rows]
+
+    def mark_sent(self, message_id: int):
+        self.record_attempts([message_id], [])
+
+    def mark_failed(self, message_id: int, error: str, retry_at: Optional[float]):
+        """Record a failed attempt; the message is retried at retry_at, or dead-lettered if retry_at is None."""
+        self.record_attempts([], [(message_id, error, retry_at)])
+
+    def record_attempts(self, sent_ids: List[int], failures: List[Tuple[int, str, Optional[float]]]):
+        """
+        Record a batch of send attempts in one transaction.
+
+        Args:
+        - sent_ids: IDs of the messages that were sent.
+        - failures: (message ID, error, retry_at) per failed message; retry_at None dead-letters it.
+        """
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, last_error = NULL, updated_at = ? WHERE id = ?",
+                [(STATUS_SENT, now, message_id) for message_id in sent_ids]
+            )
+            self.connection.executemany(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, last_error = ?, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                [(STATUS_DEAD if retry_at is None else STATUS_PENDING, error, retry_at or now, now, message_id)
+                 for message_id, error, retry_at in failures]
+            )
+
+    def recover_stale(self) -> int:
+        """Put messages left as 'sending' by an interrupted worker back in the queue."""
+        cursor = self.connection.execute(
+            "UPDATE outbox SET status = ?, updated_at = ? WHERE status = ?",
+            (STATUS_PENDING, time.time(), STATUS_SENDING)
+        )
+        self.connection.commit()
+        return cursor.rowcount
+
+    def requeue_dead(self) -> int:
+        """Move every dead-lettered message back to pending with a fresh attempt budget."""
+        now = time.time()
+        cursor = self.connection.execute(
+            "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ?, updated_at = ? WHERE status = ?",
+            (STATUS_PENDING, now, now, STATUS_DEAD)
+        )
+        self.connection.commit()
+        return cursor.rowcount
+
+    def next_due_at(self) -> Optional[float]:
+        """Time of the earliest pending attempt, or None if nothing is pending."""
+        row = self.connection.execute(
+            "SELECT MIN(next_attempt_at) FROM outbox WHERE status = ?", (STATUS_PENDING,)
+        ).fetchone()
+        return row[0]
+
+    def sent_times(self, dedupe_keys: List[str]) -> Dict[str, float]:
+        """Delivery time (epoch seconds) of the messages with the given dedupe keys that were actually sent."""
+        if not dedupe_keys:
+            return {}
+        rows = self.connection.execute(
+            f"SELECT dedupe_key, updated_at FROM outbox WHERE status = ? AND dedupe_key IN ({','.join('?' * len(dedupe_keys))})",
+            (STATUS_SENT, *dedupe_keys)
+        ).fetchall()
+        return dict(rows)
+
+    def prune(self, older_than_days: Optional[float] = None) -> int:
+        """
+        Shrink the spool: sent messages keep only their dedupe key (the payload is dropped), and sent messages
+        older than older_than_days are deleted. Pending and dead-lettered messages are kept whole.
+
+        Args:
+        - older_than_days: Retention of sent dedupe keys. Defaults to EMAIL_SPOOL_RETENTION_DAYS, then DEFAULT_RETENTION_DAYS.
+
+        Returns:
+        - Number of messages deleted.
+        """
+        older_than_days = older_than_days or float(get_env('EMAIL_SPOOL_RETENTION_DAYS') or DEFAULT_RETENTION_DAYS)
+        with self.connection:
+            deleted = self.connection.execute(
+                "DELETE FROM outbox WHERE status = ? AND updated_at < ?", (STATUS_SENT, time.time() - older_than_days * 24 * 60 * 60)
+            ).rowcount
+            stripped = self.connection.execute(
+                "UPDATE outbox SET payload = '' WHERE status = ? AND payload <> ''", (STATUS_SENT,)
+            ).rowcount
+        if deleted or stripped:
+            self.connection.execute("VACUUM")
+        return deleted
+
+    def dead_letters(self) -> List[Dict]:
+        """List dead-lettered messages with their last error."""
+        rows = self.connection.execute(
+            "SELECT id, kind, dedupe_key, attempts, last_error FROM outbox WHERE status = ? ORDER BY id", (STATUS_DEAD,)
+        ).fetchall()
+        return [{'id': row[0], 'kind': row[1], 'dedupe_key': row[2], 'attempts': row[3], 'last_error': row[4]} for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of spooled messages per status."""
+        return dict(self.connection.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+class SenderWorker:
+    """Async worker that drains the spool through Microsoft Graph with bounded concurrency, backoff and dead-lettering."""
+    def __init__(self, spool: EmailSpool, email_draft, concurrency: int = 4, max_attempts: int = 5,
+                 base_backoff: float = 2.0, max_backoff: float = 300.0):
+        """
+        Args:
+        - spool: The spool to drain.
+        - email_draft: EmailDraft used for the Graph token and posting.
+        - concurrency: Maximum number of sendMail requests in flight.
+        - max_attempts: Attempts per message before it is dead-lettered.
+        - base_backoff: Delay in seconds after the first failure; doubles on each further failure.
+        - max_backoff: Upper bound for the delay between attempts, in seconds.
+        """
+        self.spool = spool
+        self.email_draft = email_draft
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+    def retry_at(self, attempts: int) -> Optional[float]:
+        """When to retry a message that has now failed `attempts` times (None means dead-letter it)."""
+        if attempts >= self.max_attempts:
+            return None
+        return time.time() + min(self.base_backoff * 2 ** (attempts - 1), self.max_backoff)
+
+    async def _send(self, semaphore: asyncio.Semaphore, token: str, item: Dict) -> Optional[Tuple[int, str, Optional[float]]]:
+        """Send one message; returns None if it was sent, else its (ID, error, retry_at) for EmailSpool.record_attempts."""
+        async with semaphore:
+            try:
+                status, error_message = await asyncio.to_thread(self.email_draft.post_message, token, item['message'])
+            except Exception as e:
+                status, error_message = False, f"Failed to send email: {e}"
+
+        if status:
+            return None
+
+        retry_at = self.retry_at(item['attempts'] + 1)
+        if retry_at is None:
+            logger.error(f"Dead-lettered {item['kind']} message {item['id']} after {item['attempts'] + 1} attempts: {error_message}")
+        else:
+            logger.warning(f"Attempt {item['attempts'] + 1} for {item['kind']} message {item['id']} failed: {error_message}. Retrying later.")
+        return item['id'], error_message, retry_at
+
+    async def drain(self, wait_for_backoff: bool = True) -> Dict[str, int]:
+        """
+        Send every due message in the spool.
+
+        Args:
+        - wait_for_backoff: Keep running until no message is pending, sleeping through backoff delays.
+          If False, only messages that are due right now are attempted.
+
+        Returns:
+        - Dictionary with 'sent' and 'failed' attempt counts for this drain, plus 'error' (1 if no Graph token).
+        """
+        status, token = await asyncio.to_thread(self.email_draft.get_access_token)
+        if not status:
+            logger.error(f"{token}. Leaving spooled messages for the next drain.")
+            return {'sent': 0, 'failed': 0, 'error': 1}
+
+        self.spool.recover_stale()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        sent = failed = 0
+
+        while True:
+            batch = self.spool.claim_due(self.concurrency * 4)
+            if batch:
+                # The batch's outcomes are written in one transaction, so no commit runs while sends are in flight
+                results = await asyncio.gather(*(self._send(semaphore, token, item) for item in batch))
+                failures = [result for result in results if result is not None]
+                self.spool.record_attempts([item['id'] for item, result in zip(batch, results) if result is None], failures)
+                sent += len(batch) - len(failures)
+                failed += len(failures)
+                continue
+
+            next_due_at = self.spool.next_due_at()
+            if not wait_for_backoff or next_due_at is None:
+                break
+            await asyncio.sleep(max(0.0, next_due_at - time.time()))
+
+        return {'sent': sent, 'failed': failed, 'error': 0}
+
+def main():
+    parser = argparse.ArgumentParser(description="Drain the outbound email spool.")
+    parser.add_argument('--spool', default=None, help="Path of the spool database.")
+    parser.add_argument('--concurrency', type=int, default=4, help="Maximum sendMail requests in flight.")
+    parser.add_argument('--retry-dead', action='store_true', help="Requeue dead-lettered messages before draining.")
+    args = parser.parse_args()
+
+    from email_draft import EmailDraft
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    spool = EmailSpool(args.spool)
+    if args.retry_dead:
+        logger.info(f"Requeued {spool.requeue_dead()} dead-lettered messages.")
+
+    result = asyncio.run(SenderWorker(spool, EmailDraft(), concurrency=args.concurrency).drain())
+    logger.info(f"Drain finished: {result['sent']} sent, {result['failed']} failed attempts. Spool: {spool.counts()}")
+    logger.info(f"Pruned {spool.prune()} sent messages past their retention.")
+    spool.close()
+
+if __name__ == "__main__":
+    main()
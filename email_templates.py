@@ -0,0 +1,260 @@
+from html import escape as html_escape
+from string import Template
+from typing import List, Dict, Optional, Iterable
+from config import get_env
+
+# Used when EMAIL_SIGNATURE is not configured
+DEFAULT_SIGNATURE = "Alexandra Hernandez"
+
+# Templates are compiled once at import; rendering is only a substitute() call
+REMINDER_SUBJECT = Template("Missing time sheets for work week $start_date to $end_date")
+
+REMINDER_TEXT = Template(
+    "Dear $name,\n\n"
+    "$sections"
+    "\nPlease ensure that you submit your time sheets on TimeSolv at your earliest convenience. "
+    "Otherwise, the above dates will be processed as PTO; however, if PTO was already requested for the specific dates above, please ignore this email. "
+    "\n\nIf you have any questions or concerns, please don't hesitate to reach out.\n\n"
+    "Best regards,\n$signature"
+)
+
+REMINDER_HTML = Template("""<html>
+        <body style="font-family: Calibri, Arial, sans-serif; font-size: 11pt; color: #333;">
+            <p>Dear $name,</p>
+$sections            <p>Please ensure that you submit your time sheets on TimeSolv at your earliest convenience. Otherwise, the above dates will be processed as PTO; however, if PTO was already requested for the specific dates above, please ignore this email.</p>
+            <p>If you have any questions or concerns, please don't hesitate to reach out.</p>
+            <p>Best regards,<br>$signature</p>
+        </body>
+        </html>""")
+
+# Reminder sections: days with no submission, and days with fewer hours logged than expected (hours-based compliance)
+MISSING_INTRO = "Our records indicate that you have not submitted your time sheets for the following dates in the current work week:"
+UNDER_LOGGED_INTRO = "Our records indicate that you have logged fewer hours than expected on the following dates in the current work week:"
+
+REMINDER_SECTION_TEXT = Template("$intro\n$dates_block")
+
+REMINDER_SECTION_HTML = Template("""            <p>$intro</p>
+            <ul>
+$dates_block            </ul>
+""")
+
+SUMMARY_SUBJECT = Template("Summary of Users with Missing Time Sheet Submissions for Work Week $start_date to $end_date")
+
+SUMMARY_HTML = Template("""<html>
+        <body style="font-family: Calibri, Arial, sans-serif; font-size: 11pt; color: #333;">
+            <p>Dear Admins,</p>
+            <p>Here is a summary for the recent time sheet submissions for the work week <strong>$start_date to $end_date</strong>:</p>
+
+            <ul style="line-height: 1.5;">
+                <li><strong>Top 5 Users with Most Missing Submissions:</strong>
+                    <ul>
+$top_5_items                    </ul>
+                </li>
+                <li><strong>Percentage of Users with Missing Submissions:</strong> $percentage_missing%</li>
+                <li><strong>Most Frequently Missed Date(s):</strong> $frequent_dates</li>
+$under_logged_section                <li><strong>Users with Errors:</strong>
+$errors_section                </li>
+            </ul>
+$extra_sections
+            <p>Please refer to the attached file for the full data from the work week.</p>
+
+            <p>Best regards,<br>$signature</p>
+        </body>
+        </html>""")
+
+SUMMARY_TEXT = Template(
+    "Dear Admins,\n\n"
+    "Here is a summary for the recent time sheet submissions for the work week $start_date to $end_date:\n\n"
+    "Top 5 Users with Most Missing Submissions:\n${top_5_items}"
+    "Percentage of Users with Missing Submissions: $percentage_missing%\n"
+    "Most Frequently Missed Date(s): $frequent_dates\n"
+    "${under_logged_section}"
+    "Users with Errors:\n${errors_section}"
+    "${extra_sections}"
+    "\nPlease refer to the attached file for the full data from the work week.\n\n"
+    "Best regards,\n$signature"
+)
+
+def escape(value: str) -> str:
+    """HTML-escape text content (quotes are left as-is since nothing is rendered inside attributes)."""
+    return html_escape(value, quote=False)
+
+class EmailTemplates:
+    """Precompiled reminder and summary email templates (compiled once at import; rendering only substitutes)."""
+    def __init__(self, signature: Optional[str] = None):
+        """
+        Args:
+        - signature: Name used to sign emails. Defaults to EMAIL_SIGNATURE, then DEFAULT_SIGNATURE.
+        """
+        self.signature = signature or get_env('EMAIL_SIGNATURE') or DEFAULT_SIGNATURE
+
+    @staticmethod
+    def _dates_block(dates: tuple, body_type: str) -> str:
+        """Render a list of dates for a reminder section."""
+        if body_type == 'HTML':
+            return ''.join(f"                <li>{escape(str(day))}</li>\n" for day in dates)
+        return ''.join(f"- {day}\n" for day in dates)
+
+    def _reminder_body(self, name: str, missing_dates: tuple, body_type: str, under_logged_dates: tuple = ()) -> str:
+        """Render one reminder body."""
+        section = REMINDER_SECTION_HTML if body_type == 'HTML' else REMINDER_SECTION_TEXT
+        sections = [section.substitute(intro=intro, dates_block=self._dates_block(dates, body_type))
+                    for intro, dates in ((MISSING_INTRO, missing_dates), (UNDER_LOGGED_INTRO, under_logged_dates)) if dates]
+
+        if body_type == 'HTML':
+            return REMINDER_HTML.substitute(
+                name=escape(name),
+                sections=''.join(sections),
+                signature=escape(self.signature)
+            )
+        return REMINDER_TEXT.substitute(
+            name=name,
+            sections='\n'.join(sections),
+            signature=self.signature
+        )
+
+    def reminder_subject(self, start_date: str, end_date: str) -> str:
+        """Subject line of the missing time sheet reminder."""
+        return REMINDER_SUBJECT.substitute(start_date=start_date, end_date=end_date)
+
+    def render_reminder(self, name: str, missing_dates: Iterable[str], body_type: str = 'Text', under_logged_dates: Iterable[str] = ()) -> str:
+        """
+        Render the time sheet reminder for one user.
+
+        Args:
+        - name: The recipient's name.
+        - missing_dates: Dates with missing time sheet submissions.
+        - body_type: 'Text' or 'HTML'.
+        - under_logged_dates: Dates with fewer hours logged than expected.
+
+        Returns:
+        - The rendered email body.
+        """
+        return self._reminder_body(name, tuple(missing_dates), body_type, tuple(under_logged_dates))
+
+    def render_reminders(self, users: Iterable[Dict], body_type: str = 'Text') -> Dict[int, str]:
+        """
+        Render reminders for many users in one pass.
+
+        Args:
+        - users: Rows with 'UserId', 'Name', 'NoSubmissionDates' and optionally 'UnderLoggedDates' keys.
+          Rows with neither missing nor under-logged dates are skipped.
+        - body_type: 'Text' or 'HTML'.
+
+        Returns:
+        - Dictionary of user ID to rendered email body.
+        """
+        return {
+            row['UserId']: self._reminder_body(row['Name'], tuple(row['NoSubmissionDates']), body_type, tuple(row.get('UnderLoggedDates') or ()))
+            for row in users
+            if len(row['NoSubmissionDates']) > 0 or row.get('UnderLoggedDates')
+        }
+
+    def summary_subject(self, start_date: str, end_date: str) -> str:
+        """Subject line of the admin summary email."""
+        return SUMMARY_SUBJECT.substitute(start_date=start_date, end_date=end_date)
+
+    def render_summary(self, start_date: str, end_date: str, top_5_no_subs: List[Dict], percentage_missing: float,
+                       most_frequent_day: Dict, under_logged: List[Dict], user_error_desc: List[Dict],
+                       body_type: str = 'HTML', extra_sections: str = "", omitted: Optional[Dict[str, int]] = None) -> str:
+        """
+        Render the admin summary email.
+
+        Args:
+        - start_date: Start date of the work week.
+        - end_date: End date of the work week.
+        - top_5_no_subs: Rows of the top 5 users by missing submission count.
+        - percentage_missing: Percentage of users with missing submissions.
+        - most_frequent_day: Dictionary of most frequently missed dates to their count.
+        - under_logged: Rows of users with under-logged days ('UnderLoggedDates').
+        - user_error_desc: Rows of users with errors ('Comments').
+        - body_type: 'HTML' or 'Text'.
+        - extra_sections: Already rendered sections (same body type) placed after the main list, e.g. render_trends().
+        - omitted: Number of users left out of the 'errors' and 'under_logged' listings (see EmailDraft.records_statistics).
+
+        Returns:
+        - The rendered email body.
+        """
+        frequent_dates = ', '.join(str(day) for day in most_frequent_day) if len(most_frequent_day) > 0 else "None"
+        omitted = omitted or {}
+        more_errors = f"... and {omitted['errors']} more (see the attached file)" if omitted.get('errors') else ""
+        more_under_logged = f"... and {omitted['under_logged']} more (see the attached file)" if omitted.get('under_logged') else ""
+
+        if body_type == 'HTML':
+            top_5_items = ''.join(f"                        <li><strong>{escape(str(row['Name']))}</strong>: {escape(str(row['NoSubmissionDates']))}</li>\n" for row in top_5_no_subs) \
+                or "                        <li>None</li>\n"
+
+            under_logged_section = ""
+            if len(under_logged) > 0:
+                under_logged_section = "                <li><strong>Users with Under-Logged Days:</strong>\n                    <ul>\n" \
+                    + ''.join(f"                        <li><strong>{escape(str(row['Name']))}</strong>: {escape(str(row['UnderLoggedDates']))}</li>\n" for row in under_logged) \
+                    + (f"                        <li>{more_under_logged}</li>\n" if more_under_logged else "") \
+                    + "                    </ul>\n                </li>\n"
+
+            if len(user_error_desc) > 0:
+                errors_section = "                    <ul>\n" \
+                    + ''.join(f"                        <li><strong>{escape(str(row['Name']))}</strong>: {escape(str(row['Comments']))}</li>\n" for row in user_error_desc) \
+                    + (f"                        <li>{more_errors}</li>\n" if more_errors else "") \
+                    + "                    </ul>\n"
+            else:
+                errors_section = "                    None\n"
+
+            return SUMMARY_HTML.substitute(
+                start_date=start_date, end_date=end_date, top_5_items=top_5_items,
+                percentage_missing=percentage_missing, frequent_dates=escape(frequent_dates),
+                under_logged_section=under_logged_section, errors_section=errors_section,
+                extra_sections=extra_sections, signature=escape(self.signature)
+            )
+
+        top_5_items = ''.join(f"- {row['Name']}: {row['NoSubmissionDates']}\n" for row in top_5_no_subs) or "- None\n"
+        under_logged_section = ""
+        if len(under_logged) > 0:
+            under_logged_section = "Users with Under-Logged Days:\n" + ''.join(f"- {row['Name']}: {row['UnderLoggedDates']}\n" for row in under_logged) \
+                + (f"- {more_under_logged}\n" if more_under_logged else "")
+        errors_section = (''.join(f"- {row['Name']}: {row['Comments']}\n" for row in user_error_desc) + (f"- {more_errors}\n" if more_errors else "")) or "- None\n"
+
+        return SUMMARY_TEXT.substitute(
+            start_date=start_date, end_date=end_date, top_5_items=top_5_items,
+            percentage_missing=percentage_missing, frequent_dates=frequent_dates,
+            under_logged_section=under_logged_section, errors_section=errors_section,
+            extra_sections=extra_sections, signature=self.signature
+        )
+
+    def render_trends(self, trends: Dict, body_type: str = 'HTML') -> str:
+        """
+        Render the multi-week trends section of the admin summary.
+
+        Args:
+        - trends: Output of RollupStore.trends().
+        - body_type: 'HTML' or 'Text'.
+
+        Returns:
+        - The rendered section, to be passed as render_summary's extra_sections.
+        """
+        week_trend = ', '.join(f"{week['WeekStart']}: {week['PercentMissing']}%" for week in trends['week_trend']) or "None"
+        weekday_pattern = ', '.join(f"{day}: {rate}%" for day, rate in trends['weekday_pattern'].items()) or "None"
+
+        if body_type == 'HTML':
+            chronic_items = ''.join(
+                f"                        <li><strong>{escape(str(row['Name']))}</strong>: missed time in {row['WeeksMissing']} of {row['WeeksTracked']} weeks ({row['MissRate']}%)</li>\n"
+                for row in trends['chronic']
+            ) or "                        <li>None</li>\n"
+            return ("            <p><strong>Trends:</strong></p>\n"
+                    "            <ul style=\"line-height: 1.5;\">\n"
+                    f"                <li><strong>Users with Missing Submissions by Week:</strong> {escape(week_trend)}</li>\n"
+                    f"                <li><strong>Missed Submissions by Weekday:</strong> {escape(weekday_pattern)}</li>\n"
+                    "                <li><strong>Chronic Late Submitters:</strong>\n"
+                    "                    <ul>\n"
+                    f"{chronic_items}"
+                    "                    </ul>\n"
+                    "                </li>\n"
+                    "            </ul>\n")
+
+        chronic_items = ''.join(
+            f"- {row['Name']}: missed time in {row['WeeksMissing']} of {row['WeeksTracked']} weeks ({row['MissRate']}%)\n"
+            for row in trends['chronic']
+        ) or "- None\n"
+        return ("\nTrends:\n"
+                f"Users with Missing Submissions by Week: {week_trend}\n"
+                f"Missed Submissions by Weekday: {weekday_pattern}\n"
+                f"Chronic Late Submitters:\n{chronic_items}")
@@ -0,0 +1,160 @@
+import json
+import os
+from bisect import bisect_right
+from datetime import date, timedelta
+from typing import List, Dict, Set, Optional, Tuple
+from config import get_env
+
+# Default location of the rules file (see exclusion_rules.json)
+DEFAULT_RULES_PATH = 'exclusion_rules.json'
+
+# Supported rule types
+RULE_USER_ID = 'user_id'
+RULE_EMAIL_DOMAIN = 'email_domain'
+RULE_EMPLOYMENT_STATUS = 'employment_status'
+RULE_DATE_WINDOW = 'date_window'
+
+class CompiledRules:
+    """Exclusion rules compiled for one tracking period into hashed sets (O(1) per user)."""
+    def __init__(self, user_ids: Dict[int, str], email_domains: Dict[str, str], employment_statuses: Dict[str, str],
+                 excluded_dates: Optional[Dict[int, Set[str]]] = None, employment_status_values: Optional[List[str]] = None):
+        self.user_ids = user_ids                        # user ID -> reason
+        self.email_domains = email_domains              # lower-cased domain -> reason
+        self.employment_statuses = employment_statuses  # lower-cased status -> reason
+        self.employment_status_values = employment_status_values or []    # As written in the rules (server-side filter)
+        self.excluded_dates = excluded_dates or {}      # user ID -> dates of the period inside a date window
+
+    def tracked_dates(self, user_id: int, dates: List[str]) -> List[str]:
+        """The dates (in order) the user is tracked on, i.e. outside their date windows."""
+        excluded = self.excluded_dates.get(user_id)
+        if not excluded:
+            return dates
+        return [d for d in dates if d not in excluded]
+
+    def exclusion_reason(self, user: Dict) -> Optional[str]:
+        """
+        Check one TimeSolv firm user against the rules.
+
+        Returns:
+        - The reason the user is excluded, or None if the user is tracked.
+        """
+        reason = self.user_ids.get(user['Id'])
+        if reason is not None:
+            return reason
+
+        email = user.get('Email') or ""
+        reason = self.email_domains.get(email.rpartition('@')[2].lower())
+        if reason is not None:
+            return reason
+
+        return self.employment_statuses.get((user.get('EmploymentStatus') or "").lower())
+
+    def partition(self, firm_users: List[Dict]) -> Tuple[List[Dict], Dict[int, str]]:
+        """
+        Evaluate every firm user in one pass, before any timecard is fetched.
+
+        Returns:
+        - Tuple of (tracked users, dictionary of excluded user ID to reason).
+        """
+        tracked, excluded = [], {}
+        for user in firm_users:
+            reason = self.exclusion_reason(user)
+            if reason is None:
+                tracked.append(user)
+            else:
+                excluded[user['Id']] = reason
+        return tracked, excluded
+
+class ExclusionRules:
+    """
+    User exclusion/policy rules loaded from config.
+
+    Rules file format (JSON):
+        {"rules": [
+            {"type": "user_id", "values": [87002], "reason": "Firm admin account"},
+            {"type": "email_domain", "values": ["contractor.com"]},
+            {"type": "employment_status", "values": ["Contractor"]},
+            {"type": "date_window", "user_ids": [93812], "start": "2025-12-22", "end": "2026-01-02", "reason": "Leave"}
+        ]}
+    A date_window rule excludes its users on the dates in [start, end]; a user whose windows cover the whole
+    tracking period is not tracked at all.
+    """
+    def __init__(self, rules: List[Dict]):
+        self.user_ids: Dict[int, str] = {}
+        self.email_domains: Dict[str, str] = {}
+        self.employment_statuses: Dict[str, str] = {}
+        self.employment_status_values: List[str] = []
+        self.windows: List[Tuple[str, str, Tuple[int, ...], str]] = []    # (start, end, user IDs, reason), sorted by start
+
+        for rule in rules:
+            rule_type = rule.get('type')
+            reason = rule.get('reason') or f"Excluded by {rule_type} rule"
+
+            if rule_type == RULE_USER_ID:
+                self.user_ids.update({int(user_id): reason for user_id in rule['values']})
+            elif rule_type == RULE_EMAIL_DOMAIN:
+                self.email_domains.update({domain.lower().lstrip('@'): reason for domain in rule['values']})
+            elif rule_type == RULE_EMPLOYMENT_STATUS:
+                self.employment_statuses.update({status.lower(): reason for status in rule['values']})
+                self.employment_status_values.extend(rule['values'])
+            elif rule_type == RULE_DATE_WINDOW:
+                self.windows.append((rule['start'], rule['end'], tuple(int(user_id) for user_id in rule['user_ids']), reason))
+            else:
+                raise ValueError(f"Unknown exclusion rule type: {rule_type}")
+
+        # Windows sorted by start date: a period lookup bisects off the windows starting after the period,
+        # then checks the end date of the remaining ones
+        self.windows.sort()
+        self.window_starts = [window[0] for window in self.windows]
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'ExclusionRules':
+        """
+        Load rules from a JSON file.
+
+        Args:
+        - path: Rules file. Defaults to EXCLUSION_RULES_PATH, then DEFAULT_RULES_PATH. A missing file means no rules.
+        """
+        path = path or get_env('EXCLUSION_RULES_PATH') or DEFAULT_RULES_PATH
+        if not os.path.exists(path):
+            return cls([])
+
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f).get('rules', []))
+
+    def windows_overlapping(self, period_start: str, period_end: str) -> List[Tuple[str, str, Tuple[int, ...], str]]:
+        """Date-window rules overlapping [period_start, period_end] (YYYY-MM-DD)."""
+        candidates = self.windows[:bisect_right(self.window_starts, period_end)]
+        return [window for window in candidates if window[1] >= period_start]
+
+    def compile(self, period_start: str, period_end: str) -> CompiledRules:
+        """
+        Compile the rules for one tracking period.
+
+        Args:
+        - period_start: Start date of the tracked period (YYYY-MM-DD).
+        - period_end: End date of the tracked period (YYYY-MM-DD).
+
+        Returns:
+        - CompiledRules with the date windows' users folded into the per-user set when their windows cover
+          the whole period, and into the per-user excluded dates otherwise.
+        """
+        first, last = date.fromisoformat(period_start), date.fromisoformat(period_end)
+        period_dates = [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+
+        user_ids = dict(self.user_ids)
+        excluded_dates: Dict[int, Set[str]] = {}
+        window_reasons: Dict[int, str] = {}
+        for window_start, window_end, window_user_ids, reason in self.windows_overlapping(period_start, period_end):
+            dates = {d for d in period_dates if window_start <= d <= window_end}
+            for user_id in window_user_ids:
+                excluded_dates.setdefault(user_id, set()).update(dates)
+                window_reasons.setdefault(user_id, reason)
+
+        for user_id in list(excluded_dates):
+            if len(excluded_dates[user_id]) == len(period_dates):
+                user_ids.setdefault(user_id, window_reasons[user_id])
+                del excluded_dates[user_id]
+
+        return CompiledRules(user_ids, dict(self.email_domains), dict(self.employment_statuses), excluded_dates,
+                             list(self.employment_status_values))
@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+import tempfile
+from typing import List, Dict
+
+from exclusion_rules import ExclusionRules
+from timesolv_api import TimeSolvAPI
+
+WORK_DATES = ['2026-10-12', '2026-10-13', '2026-10-14', '2026-10-15', '2026-10-16']
+
+RULES = [
+    {"type": "user_id", "values": [1], "reason": "Firm admin account"},
+    {"type": "email_domain", "values": ["@Contractor.com"]},
+    {"type": "employment_status", "values": ["Contractor", "Intern"]},
+    {"type": "date_window", "user_ids": [2], "start": "2026-10-13", "end": "2026-10-14", "reason": "Leave"},
+    {"type": "date_window", "user_ids": [3], "start": "2026-10-09", "end": "2026-10-19", "reason": "Sabbatical"},
+    {"type": "date_window", "user_ids": [4], "start": "2026-10-19", "end": "2026-10-23"}
+]
+
+def make_user(user_id: int, email: str = "", employment_status: str = "Employee") -> Dict:
+    return {'Id': user_id, 'Email': email or f"user{user_id}@example.com", 'EmploymentStatus': employment_status}
+
+def check(failures: List[str], condition: bool, description: str):
+    print(f"{'ok  ' if condition else 'FAIL'} {description}")
+    if not condition:
+        failures.append(description)
+
+def check_date_windows(failures: List[str], rules: ExclusionRules):
+    compiled = rules.compile(WORK_DATES[0], WORK_DATES[-1])
+    check(failures, compiled.tracked_dates(2, WORK_DATES) == [WORK_DATES[0], WORK_DATES[3], WORK_DATES[4]],
+          "a window inside the week excludes only its own dates")
+    check(failures, compiled.exclusion_reason(make_user(2)) is None, "a user with a partial window is still tracked")
+    check(failures, compiled.exclusion_reason(make_user(3)) == "Sabbatical", "a window covering the whole week excludes the user")
+    check(failures, compiled.tracked_dates(4, WORK_DATES) == WORK_DATES and compiled.exclusion_reason(make_user(4)) is None,
+          "a window outside the week has no effect")
+    check(failures, [window[2] for window in rules.windows_overlapping('2026-10-19', '2026-10-23')] == [(3,), (4,)],
+          "overlapping windows are found for another period")
+
+def check_user_filters(failures: List[str], rules: ExclusionRules):
+    compiled = rules.compile(WORK_DATES[0], WORK_DATES[-1])
+    users = [make_user(1), make_user(5, email="someone@CONTRACTOR.com"), make_user(6, employment_status="intern"),
+             make_user(7, employment_status=None), make_user(8)]
+    tracked, excluded = compiled.partition(users)
+    check(failures, [user['Id'] for user in tracked] == [7, 8], "excluded IDs, domains and employment statuses are filtered out")
+    check(failures, excluded[1] == "Firm admin account", "a rule's reason is reported")
+    check(failures, excluded[6] == "Excluded by employment_status rule", "employment statuses match regardless of case")
+
+    # The statuses as written in the rules are also filtered out server-side, with the excluded IDs
+    criteria = TimeSolvAPI('token')._firm_user_criteria(compiled.user_ids, None, compiled.employment_status_values)
+    check(failures, {'FieldName': 'EmploymentStatus', 'Operator': '<>', 'Value': 'Contractor'} in criteria and
+          {'FieldName': 'EmploymentStatus', 'Operator': '<>', 'Value': 'Intern'} in criteria, "employment statuses are excluded server-side")
+    check(failures, {'FieldName': 'Id', 'Operator': '<>', 'Value': 3} in criteria, "users excluded for the whole week are excluded server-side")
+
+def check_load(failures: List[str], directory: str):
+    path = os.path.join(directory, 'rules.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'rules': RULES}, f)
+    check(failures, len(ExclusionRules.load(path).windows) == 3, "rules are loaded from a JSON file")
+    check(failures, ExclusionRules.load(os.path.join(directory, 'missing.json')).compile(WORK_DATES[0], WORK_DATES[-1]).user_ids == {},
+          "a missing rules file means no rules")
+
+    try:
+        ExclusionRules([{"type": "team"}])
+        check(failures, False, "an unknown rule type is rejected")
+    except ValueError:
+        check(failures, True, "an unknown rule type is rejected")
+
+def main():
+    failures = []
+    rules = ExclusionRules(RULES)
+    with tempfile.TemporaryDirectory() as directory:
+        check_date_windows(failures, rules)
+        check_user_filters(failures, rules)
+        check_load(failures, directory)
+
+    if failures:
+        print(f"Exclusion rule checks FAILED ({len(failures)})")
+        sys.exit(1)
+    print("Exclusion rule checks passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import subprocess
+import sys
+from typing import Dict
+
+# Startup budget for `import main`, in microseconds (cumulative, as reported by -X importtime)
+IMPORT_TIME_BUDGET_US = 150_000
+
+# Heavy dependencies that must not be pulled in just by importing the entry point
+HEAVY_MODULES = ['pandas', 'numpy', 'msal', 'requests', 'dotenv', 'matplotlib']
+
+def measure_import_times(module: str) -> Dict[str, int]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+    - module: Name of the module to import.
+
+    Returns:
+    - Dictionary of imported module name to cumulative import time in microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    import_times = {}
+    for line in result.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        import_times[name.strip()] = int(cumulative)
+
+    return import_times
+
+def main():
+    import_times = measure_import_times('main')
+    total_us = import_times.get('main', 0)
+    heavy_loaded = [name for name in import_times if name.split('.')[0] in HEAVY_MODULES]
+
+    print(f"import main: {total_us / 1000:.1f} ms (budget {IMPORT_TIME_BUDGET_US / 1000:.1f} ms)")
+    if heavy_loaded:
+        print(f"Heavy modules imported at startup: {sorted(set(name.split('.')[0] for name in heavy_loaded))}")
+
+    if total_us > IMPORT_TIME_BUDGET_US or heavy_loaded:
+        print("Startup latency check FAILED")
+        sys.exit(1)
+
+    print("Startup latency check passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import List, Dict
+
+from main import MAX_RETRIES
+from timesolv_api import TimeSolvAPI, TimeSolveAuth, TIMECARD_FIELDS
+from timesolv_emulator import TimeSolvEmulator, EmulatorConfig, generate_firm_users, generate_timecards
+
+# Drives TimeSolvAPI against the local emulator (timesolv_emulator.py) the way main.py does:
+# one firm user search, then one timecard search per user, and reports throughput and tail latency.
+
+def percentile(sorted_values: List[float], share: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(share * len(sorted_values)) - 1))]
+
+def latency_report(name: str, latencies: List[float]) -> str:
+    values = sorted(latencies)
+    return (f"{name:<16}{len(values):>8}{statistics.fmean(values) * 1000 if values else 0:>10.1f}"
+            f"{percentile(values, 0.5) * 1000:>10.1f}{percentile(values, 0.95) * 1000:>10.1f}"
+            f"{percentile(values, 0.99) * 1000:>10.1f}{(values[-1] if values else 0) * 1000:>10.1f}")
+
+def run_load_test(users: int, concurrency: int, config: EmulatorConfig, seed: int = 0, max_page_size: int = 1000) -> Dict:
+    """
+    Run one load test against a fresh emulator.
+
+    Args:
+    - users: Number of synthetic firm users.
+    - concurrency: Number of threads issuing timecard searches.
+    - config: Emulator latency and fault injection settings.
+    - seed: Random seed for the synthetic firm.
+    - max_page_size: Page size cap for the clients (the emulator accepts any page size).
+
+    Returns:
+    - Dictionary with the run's counts, latencies (seconds) and wall time.
+    """
+    today = date.today()
+    start_date = (today - timedelta(days=today.weekday())).isoformat()
+    end_date = (today - timedelta(days=today.weekday()) + timedelta(days=4)).isoformat()
+
+    firm_users = generate_firm_users(users, seed)
+    timecards = generate_timecards(firm_users, start_date, end_date, seed)
+
+    with TimeSolvEmulator(firm_users, timecards, config) as emulator:
+        # The emulator accepts any authorization code, so no TimeSolv credentials are needed
+        timesolv_auth = TimeSolveAuth(base_url=emulator.base_url)
+        timesolv_auth.auth_code = timesolv_auth.auth_code or 'load-test'
+        status, access_token = timesolv_auth.get_access_token()
+        if not status:
+            raise RuntimeError(access_token)
+
+        # Firm user search is retried like in main.py (a whole paginated search fails on any injected error)
+        started = time.perf_counter()
+        api = TimeSolvAPI(access_token, base_url=emulator.base_url, max_page_size=max_page_size)
+        for _ in range(MAX_RETRIES):
+            fetched_users = api.get_all_firm_users(fields=['Id'])
+            if not isinstance(fetched_users, str):
+                break
+        firm_user_latency = time.perf_counter() - started
+        if isinstance(fetched_users, str):
+            raise RuntimeError(f"Firm user search failed: {fetched_users}")
+
+        # One client per worker thread, like separate tracker processes (each keeps its own page size tuner)
+        local = threading.local()
+        def search_user(user_id: int):
+            if not hasattr(local, 'api'):
+                local.api = TimeSolvAPI(access_token, base_url=emulator.base_url, max_page_size=max_page_size)
+            request_started = time.perf_counter()
+            result = local.api.search_timecards(start_date, end_date, firm_user_id=user_id, fields=TIMECARD_FIELDS)
+            return time.perf_counter() - request_started, result
+
+        timecard_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(search_user, (user['Id'] for user in fetched_users)))
+        timecard_seconds = time.perf_counter() - timecard_started
+
+        request_counts = dict(emulator.request_counts)
+
+    ok_latencies = [elapsed for elapsed, result in results if not isinstance(result, str)]
+    errors = [result for _, result in results if isinstance(result, str)]
+    return {
+        'users': len(fetched_users),
+        'timecards': sum(len(result) for _, result in results if not isinstance(result, str)),
+        'firm_user_latency': firm_user_latency,
+        'timecard_latencies': ok_latencies,
+        'error_latencies': [elapsed for elapsed, result in results if isinstance(result, str)],
+        'throttled': sum(1 for error in errors if 'HTTP 429' in error),
+        'errors': len(errors),
+        'timecard_seconds': timecard_seconds,
+        'total_seconds': time.perf_counter() - started,
+        'request_counts': request_counts,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test TimeSolvAPI against the local TimeSolv emulator.")
+    parser.add_argument('--users', type=int, default=10_000, help="Number of synthetic firm users.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Threads issuing timecard searches.")
+    parser.add_argument('--latency', type=float, default=0.005, help="Emulated base delay per search request, in seconds.")
+    parser.add_argument('--latency-jitter', type=float, default=0.01, help="Emulated extra random delay, in seconds.")
+    parser.add_argument('--max-rps', type=float, default=None, help="Emulated rate limit (search requests per second).")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Share of search requests randomly answered with 429.")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of search requests answered with an error ResponseCode.")
+    parser.add_argument('--max-page-size', type=int, default=1000, help="Page size cap for the adaptive page size tuner.")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = EmulatorConfig(args.latency, args.latency_jitter, max_requests_per_second=args.max_rps,
+                            throttle_rate=args.throttle_rate, error_rate=args.error_rate, seed=args.seed)
+    result = run_load_test(args.users, args.concurrency, config, args.seed, args.max_page_size)
+
+    print(f"Users: {result['users']}, timecards: {result['timecards']}, concurrency: {args.concurrency}")
+    print(f"Firm user search: {result['firm_user_latency']:.2f} s")
+    print(f"Timecard searches: {result['timecard_seconds']:.2f} s, "
+          f"{result['users'] / result['timecard_seconds']:.1f} users/s, "
+          f"{result['request_counts'].get('timecardSearch', 0) / result['timecard_seconds']:.1f} requests/s")
+    print(f"Failed searches: {result['errors']} ({result['throttled']} throttled with HTTP 429)")
+    print(f"{'latency (ms)':<16}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    print(latency_report('timecard ok', result['timecard_latencies']))
+    print(latency_report('timecard failed', result['error_latencies']))
+    print(f"Emulator requests: {result['request_counts']}")
+    print(f"Total: {result['total_seconds']:.2f} s")
+
+if __name__ == "__main__":
+    main()
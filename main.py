@@ -1,38 +1,59 @@
-from timesolv_api import TimeSolvAPI, TimeSolveAuth
+from timesolv_api import TimeSolvAPI, TimeSolveAuth, TIMECARD_FIELDS
 import logging
 import logging.handlers
 from datetime import date, timedelta, datetime
 from zoneinfo import ZoneInfo
-from typing import List, Dict, Set, Optional
+from typing import List, Dict, Set, Optional, Tuple, Iterable, Iterator, Callable
+from itertools import islice
 import time
-import os
-import json
-import pandas as pd
 from email_draft import EmailDraft
-from dotenv import load_dotenv
-import ast
+from config import get_env, get_admin_emails, get_expected_hours
+from submission_index import SubmissionIndex
+from exclusion_rules import ExclusionRules
+from profiling import mark_phase
+from spill import ColumnarSpill
 
-load_dotenv()
-ADMIN_EMAILS = ast.literal_eval(os.getenv('ADMIN_EMAILS'))
+# NOTE: pandas is only imported for large firms (see SMALL_FIRM_THRESHOLD), and
+# configuration (.env, ADMIN_EMAILS) is only parsed once main() actually needs it
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-logger_file_handler = logging.handlers.RotatingFileHandler(
-    "status.log",
-    maxBytes=1024 * 1024,
-    backupCount=1,
-    encoding="utf8",
-)
-formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-logger_file_handler.setFormatter(formatter)
-logger.addHandler(logger_file_handler)
-
-# List of user IDs to exclude from email notifications -> see if could implement this dynamically later
-exclude_user_ids = [87002]
+
+# Helper modules whose loggers also write to status.log
+HELPER_LOGGERS = ['email_queue', 'reports']
+
+def setup_logging():
+    """Attach the rotating status.log handler (once) to this module's and the helper modules' loggers."""
+    if logger.handlers:
+        return
+
+    logger_file_handler = logging.handlers.RotatingFileHandler(
+        "status.log",
+        maxBytes=1024 * 1024,
+        backupCount=1,
+        encoding="utf8",
+    )
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    logger_file_handler.setFormatter(formatter)
+
+    for module_logger in [logger] + [logging.getLogger(name) for name in HELPER_LOGGERS]:
+        module_logger.setLevel(logging.DEBUG)
+        module_logger.addHandler(logger_file_handler)
 
 # Retry number for attempted API calls and such
 MAX_RETRIES = 3
 
+# Firms with at most this many tracked users skip pandas entirely (plain lists of rows)
+SMALL_FIRM_THRESHOLD = 200
+
+# Reminder bodies rendered per batch (see remind_users)
+REMINDER_BATCH_SIZE = 500
+
+# Firm user fields kept in memory-bounded mode (see spill_firm_users)
+FIRM_USER_COLUMNS = ['Id', 'Email', 'FirstName', 'LastName']
+
+# Columns of the tracker rows (one row per user with the dates with no submission)
+LISTED_DATES_COLUMNS = ['UserId', 'Email', 'Name', 'NoSubmissionDates', 'NoSubmissionCount', 'UnderLoggedDates', 'lastEmailSentDate', 'lastUpdateDate', 'Comments']
+
 def get_start_and_end_week_dates():
     """Get the start (Monday) and end (Friday) dates of the current work week.
     
@@ -65,115 +86,394 @@ def get_work_week_dates():
     
     return [day.strftime('%Y-%m-%d') for day in work_week]
 
-def main():
-    logger.info("Starting main process...")
+def build_summary_users(rows: List[Dict] | ColumnarSpill, columns: List[str]):
+    """Large firms get a DataFrame for the summary statistics; small firms and spilled rows stay on plain rows."""
+    if not isinstance(rows, ColumnarSpill) and len(rows) > SMALL_FIRM_THRESHOLD:
+        import pandas as pd
+        return pd.DataFrame(rows, columns=columns)
+    return rows
 
-    # Obtain access token
-    timesolv_auth = TimeSolveAuth()
+def store_rows(rows: Iterable[Dict], spill: bool) -> List[Dict] | ColumnarSpill:
+    """Collect rows in memory, or in an on-disk ColumnarSpill in memory-bounded mode."""
+    if not spill:
+        return list(rows)
+
+    spilled_rows = ColumnarSpill(LISTED_DATES_COLUMNS)
+    spilled_rows.append_rows(rows)
+    return spilled_rows
+
+def spill_firm_users(timesolv_api: TimeSolvAPI, exclusion_rules) -> ColumnarSpill | str:
+    """
+    Memory-bounded firm user fetch: stream the users page by page through the exclusion rules into a ColumnarSpill.
+
+    Args:
+    - timesolv_api: Authenticated TimeSolv API client.
+    - exclusion_rules: CompiledRules for the tracked period.
+
+    Returns:
+    - ColumnarSpill of the tracked users (FIRM_USER_COLUMNS).
+    - Error code as string if the fetch still fails after MAX_RETRIES attempts.
+    """
     for attempt in range(1, MAX_RETRIES + 1):
-        status, access_token = timesolv_auth.get_access_token()
+        firm_users = ColumnarSpill(FIRM_USER_COLUMNS)
+        error = None
+        for page in timesolv_api.iter_firm_user_pages(exclude_user_ids=exclusion_rules.user_ids,
+                                                      exclude_employment_statuses=exclusion_rules.employment_status_values,
+                                                      fields=FIRM_USER_COLUMNS + ['EmploymentStatus']):
+            if isinstance(page, str):
+                error = page
+                break
 
-        # Breaking with successful access token retrieval
-        if status:
-            logger.info(f"Successfully obtained TimeSolv access token on attempt {attempt}.")
-            break
+            tracked_users, excluded_users = exclusion_rules.partition(page)
+            for user_id, reason in excluded_users.items():
+                logger.info(f"Excluding user {user_id} from tracking: {reason}.")
+            firm_users.append_rows(tracked_users)
 
+        if error is None:
+            logger.info(f"Successfully obtained firm users on attempt {attempt}.")
+            return firm_users
+
+        firm_users.close()
         if attempt < MAX_RETRIES:
-            logger.warning(f"Attempt {attempt} to get TimeSolv access token failed. Retrying...")
-            time.sleep(2)  
-    if not status:
-        logger.error(f"{access_token}. Exceeded maximum retries. Now exiting process.")
-        return
+            logger.warning(f"Attempt {attempt} to get firm users failed. Retrying...")
+            time.sleep(2)
 
-    # Initialize TimeSolv API
-    timesolv_api = TimeSolvAPI(access_token=access_token)
-    
-    # Fetch firm users
+    return error
+
+def fetch_user_timecards(timesolv_api: TimeSolvAPI, user_id: int, start_date: str, end_date: str) -> List[Dict] | str:
+    """Fetch one user's timecards for the week, retrying up to MAX_RETRIES times (error code as string if it fails)."""
     for attempt in range(1, MAX_RETRIES + 1):
-        firm_users = timesolv_api.get_all_firm_users()
+        timecards = timesolv_api.search_timecards(
+            start_date=start_date,
+            end_date=end_date,
+            firm_user_id=user_id,
+            fields=TIMECARD_FIELDS
+        )
 
-        # Breaking with successful firm users retrieval
-        if isinstance(firm_users, List) and isinstance(firm_users[0], Dict):
-            logger.info(f"Successfully obtained firm users on attempt {attempt}.")
+        if isinstance(timecards, List) and (len(timecards) == 0 or isinstance(timecards[0], Dict)):
+            logger.info(f"Successfully obtained timecards for user {user_id} on attempt {attempt}.")
             break
 
         if attempt < MAX_RETRIES:
-            logger.warning(f"Attempt {attempt} to get firm users failed. Retrying...")
-            time.sleep(2)  
-    if isinstance(firm_users, str):
-        logger.error(f"{firm_users}. Exceeded maximum retries. Now exiting process.")
-        return
+            logger.warning(f"Attempt {attempt} to get timecards for user {user_id} failed. Retrying...")
+            time.sleep(2)
+    return timecards
 
-    # Get dates for range (current work week)
-    start_date, end_date = get_start_and_end_week_dates()
-    logger.info(f"Fetching timecards from {start_date} to {end_date}...")
+def track_users(timesolv_api: TimeSolvAPI, users: List[Dict], start_date: str, end_date: str, work_week_dates: List[str],
+                exclusion_rules=None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Fetch the week's timecards of the users (one paginated search for all of them) and build their tracker rows.
 
-    # Create dataframe that contains user ID and dates with submission of timecard for each day
-    basic_columns = ['UserId', 'Email', 'Name']
-    work_week_dates = get_work_week_dates()
-    column_list = basic_columns + work_week_dates
-    listed_dates_columns = basic_columns + ['NoSubmissionDates', 'NoSubmissionCount', 'lastEmailSentDate', 'lastUpdateDate', 'Comments']
+    If the combined search keeps failing, each user's timecards are fetched separately, so an error is
+    reported only for the users it actually affects.
 
-    timecard_tracker_df = pd.DataFrame(columns=column_list)
-    timecard_listed_dates_df = pd.DataFrame(columns=listed_dates_columns)
+    Args:
+    - timesolv_api: Authenticated TimeSolv API client.
+    - users: Firm users to track.
+    - start_date: Start date of the work week.
+    - end_date: End date of the work week.
+    - work_week_dates: Work days of the week.
+    - exclusion_rules: CompiledRules for the week; users are not reminded about dates inside their date windows.
 
-    # Iterate through firm users and populate dataframe
-    failed_users = 0            # Tracking how many users failed to get timecards retrieved
-    for user in firm_users:
-        if user['Id'] in exclude_user_ids:
-            logger.info(f"Excluding user {user['Id']} from tracking as per exclusion list.")
-            continue
+    Returns:
+    - Tuple of (tracker rows, all of the users' timecards for the hours-based compliance check).
+    """
+    rows = []
+    week_timecards = []
+    submission_index = SubmissionIndex()
 
-        timecard_row = {'UserId': user['Id'], 'Email': user['Email'], 'Name': f"{user['FirstName'].strip()} {user['LastName'].strip()}"}
-        timecard_listed_dates_row = {'UserId': user['Id'], 'Email': user['Email'], 'Name': f"{user['FirstName'].strip()} {user['LastName'].strip()}", 'Comments': ""}
-        timecard_missing_dates = []
+    for attempt in range(1, MAX_RETRIES + 1):
+        timecards_by_user = timesolv_api.search_timecards_by_user(start_date, end_date, [user['Id'] for user in users], fields=TIMECARD_FIELDS)
 
-        for attempt in range(1, MAX_RETRIES + 1):
-            timecards = timesolv_api.search_timecards(
-                start_date=start_date,
-                end_date=end_date,
-                firm_user_id=user['Id']
-            )
+        if isinstance(timecards_by_user, Dict):
+            logger.info(f"Successfully obtained timecards for {len(users)} users on attempt {attempt}.")
+            break
 
-            if isinstance(timecards, List) and (len(timecards) == 0 or isinstance(timecards[0], Dict)):
-                logger.info(f"Successfully obtained timecards for user {user['Id']} on attempt {attempt}.")
-                break
+        if attempt < MAX_RETRIES:
+            logger.warning(f"Attempt {attempt} to get timecards for {len(users)} users failed. Retrying...")
+            time.sleep(2)
+    if isinstance(timecards_by_user, str):
+        logger.warning(f"{timecards_by_user}. Fetching each user's timecards separately.")
+        timecards_by_user = {}
 
-            if attempt < MAX_RETRIES:
-                logger.warning(f"Attempt {attempt} to get timecards for user {user['Id']} failed. Retrying...")
-                time.sleep(2)
+    for user in users:
+        name = f"{user['FirstName'].strip()} {user['LastName'].strip()}"
+        timecard_listed_dates_row = {'UserId': user['Id'], 'Email': user['Email'], 'Name': name, 'UnderLoggedDates': [], 'Comments': ""}
+
+        timecards = timecards_by_user.get(user['Id'])
+        if timecards is None:
+            timecards = fetch_user_timecards(timesolv_api, user['Id'], start_date, end_date)
 
         if isinstance(timecards, str):
             logger.error(f"Error fetching timecards for user {user['Id']}: {timecards}")
             timecard_listed_dates_row['NoSubmissionDates'] = []
             timecard_listed_dates_row['NoSubmissionCount'] = 0
             timecard_listed_dates_row['Comments'] = timecards
-            timecard_listed_dates_df = pd.concat([timecard_listed_dates_df, pd.DataFrame([timecard_listed_dates_row])], ignore_index=True)
+            rows.append(timecard_listed_dates_row)
             continue
 
-        # Initialize all dates to 0 (no submission)
-        for date_str in work_week_dates:
-            timecard_row[date_str] = 0
-
-        # Mark dates with submissions as 1
-        if not isinstance(timecards, str):
-            for tc in timecards:
-                tc_date = tc.get('Date')
-                if tc_date in timecard_row:
-                    timecard_row[tc_date] = 1
+        # Index submitted days, then list the work days with no submission
+        submission_index.add_user(user['Id'], user['Email'], name)
+        submission_index.replace_timecards(user['Id'], start_date, end_date, timecards)
+        tracked_dates = exclusion_rules.tracked_dates(user['Id'], work_week_dates) if exclusion_rules else work_week_dates
+        timecard_missing_dates = submission_index.missing_dates(user['Id'], tracked_dates)
 
-        timecard_missing_dates = [date_str for date_str in work_week_dates if timecard_row[date_str] == 0]
         timecard_listed_dates_row['NoSubmissionDates'] = timecard_missing_dates
         timecard_listed_dates_row['NoSubmissionCount'] = len(timecard_missing_dates)
 
-        # Append row to dataframe - convert dict to DataFrame first
-        timecard_tracker_df = pd.concat([timecard_tracker_df, pd.DataFrame([timecard_row])], ignore_index=True)
-        timecard_listed_dates_df = pd.concat([timecard_listed_dates_df, pd.DataFrame([timecard_listed_dates_row])], ignore_index=True)
+        for tc in timecards:
+            tc['FirmUserId'] = user['Id']
+        week_timecards.extend(timecards)
 
-    logger.info(f"Processed {len(firm_users)} users. {failed_users} failed.")
+        rows.append(timecard_listed_dates_row)
 
-    # Draft up email content for users with no submissions 
+    return rows, week_timecards
+
+def apply_compliance(compliance_engine, rows: List[Dict], week_timecards: List[Dict], work_week_dates: List[str], exclusion_rules=None) -> int:
+    """
+    Hours-based compliance: flag days with some, but fewer than expected, hours logged (they are reminded
+    along with the missing days). Days logged with 0 hours are already in NoSubmissionDates (see SubmissionIndex).
+
+    Returns:
+    - Number of users with under-logged days.
+    """
+    from compliance import STATUS_UNDER_LOGGED
+
+    tracked_user_ids = [row['UserId'] for row in rows if row['Comments'] == ""]
+    evaluation = compliance_engine.evaluate(week_timecards, tracked_user_ids, work_week_dates)
+    under_logged = compliance_engine.dates_by_status(evaluation, STATUS_UNDER_LOGGED)
+
+    flagged_users = 0
+    for row in rows:
+        row['UnderLoggedDates'] = under_logged.get(row['UserId'], [])
+        if exclusion_rules and row['UnderLoggedDates']:
+            row['UnderLoggedDates'] = exclusion_rules.tracked_dates(row['UserId'], row['UnderLoggedDates'])
+        flagged_users += bool(row['UnderLoggedDates'])
+    return flagged_users
+
+def remind_users(email_draft: EmailDraft, rows: Iterable[Dict], deliver: Callable[[Dict, str], bool]) -> Iterator[Dict]:
+    """
+    Hand a reminder for every user with missing dates to `deliver` and yield the rows with updated dates.
+
+    Reminder bodies are rendered in batches of REMINDER_BATCH_SIZE rows from the precompiled templates,
+    so rows can be streamed from a ColumnarSpill.
+
+    Args:
+    - email_draft: EmailDraft used to render the reminders.
+    - rows: Tracker rows.
+    - deliver: Called with (row, body); returns True if the reminder was sent (or spooled).
+    """
+    rows = iter(rows)
+    while batch := list(islice(rows, REMINDER_BATCH_SIZE)):
+        reminder_bodies = email_draft.templates.render_reminders(row for row in batch if row['Comments'] == "")
+
+        for row in batch:
+            # Skips users with no missing or under-logged dates, or with comments (indicates prior error)
+            if row['UserId'] in reminder_bodies and deliver(row, reminder_bodies[row['UserId']]):
+                row['lastEmailSentDate'] = datetime.now(ZoneInfo('America/New_York')).strftime('%Y-%m-%d %H:%M:%S')
+
+            row['lastUpdateDate'] = datetime.now(ZoneInfo('America/New_York')).strftime('%Y-%m-%d %H:%M:%S')
+            yield row
+
+def send_reminder(email_draft: EmailDraft, access_token: str, row: Dict, start_date: str, end_date: str, body: str) -> bool:
+    """Send one reminder inline, retrying up to MAX_RETRIES times."""
+    user_id = row['UserId']
+    for attempt in range(1, MAX_RETRIES + 1):
+        status, message = email_draft.send_email(
+            token=access_token,
+            to_email=row['Email'],
+            name=row['Name'],
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+            missing_dates=row['NoSubmissionDates'],
+            body=body,
+            under_logged_dates=row.get('UnderLoggedDates') or ()
+        )
+
+        if status:
+            logger.info(f"Successfully sent email to user {user_id} on attempt {attempt}.")
+            return True
+
+        if attempt < MAX_RETRIES:
+            logger.warning(f"Attempt {attempt} to send email to user {user_id} failed. Retrying...")
+            time.sleep(2)
+
+    logger.error(f"Failed to send email to user {user_id}: {message}. Exceeded maximum retries.")
+    return False
+
+def send_report(email_draft: EmailDraft, access_token: str, report: Dict) -> bool:
+    """Send one generated summary report, retrying up to MAX_RETRIES times."""
+    name = report['report'].name
+    for attempt in range(1, MAX_RETRIES + 1):
+        status, message = email_draft.post_message(access_token, report['message'], attachment_path=report.get('attachment_path'))
+
+        if status:
+            logger.info(f"Successfully sent report {name} on attempt {attempt}.")
+            return True
+
+        if attempt < MAX_RETRIES:
+            logger.warning(f"Attempt {attempt} to send report {name} failed. Retrying...")
+            time.sleep(2)
+    logger.error(f"Failed to send report {name}: {message}. Exceeded maximum retries.")
+    return False
+
+def send_reports(email_draft: EmailDraft, rows: List[Dict] | ColumnarSpill, start_date: str, end_date: str,
+                 trends: Optional[Dict], deliver: Callable[[Dict], bool], stream_attachment: bool = False,
+                 confirm: Optional[Callable[[List[Dict]], List[Dict]]] = None) -> bool:
+    """
+    Render the summary reports in parallel (see reports.py) and deliver each one that was not already sent.
+
+    Args:
+    - rows: Tracker rows with updated lastEmailSentDate/lastUpdateDate (a ColumnarSpill is streamed, never loaded).
+    - deliver: Called with each generated report (from ReportGenerator.generate); returns True once it was sent or spooled.
+    - stream_attachment: Stream the csv attachment from disk when posting (inline delivery of a ColumnarSpill).
+    - confirm: For asynchronous delivery (the spool), called with the spooled reports once they were all handed over;
+      returns the ones actually delivered. Only delivered reports are recorded as sent.
+
+    Returns:
+    - True if every report was delivered or had already been sent with the same content.
+    """
+    from reports import ReportGenerator, ReportCache, plan_reports
+
+    mark_phase('reports')
+    started = time.perf_counter()
+    report_cache = ReportCache()
+    generated = ReportGenerator(email_draft, cache=report_cache).generate(plan_reports(rows), start_date, end_date, trends=trends,
+                                                                        stream_attachment=stream_attachment)
+    logger.info(f"Generated {len(generated)} summary reports in {time.perf_counter() - started:.3f} s ({report_cache.stats()}).")
+
+    mark_phase('email')
+    unchanged, accepted = 0, []
+    for report in generated:
+        if report_cache.was_sent(report['content_hash'], report['report'].recipients):
+            logger.info(f"Report {report['report'].name} is unchanged since it was last sent. Skipping.")
+            unchanged += 1
+        elif deliver(report):
+            accepted.append(report)
+    delivered = confirm(accepted) if confirm is not None else accepted
+
+    for report in delivered:
+        report_cache.mark_sent(report['content_hash'], report['report'].recipients)
+    pruned = report_cache.prune()
+    if pruned:
+        logger.info(f"Pruned {pruned} report cache entries unused for {report_cache.max_age_days:g} days.")
+    report_cache.close()
+    return unchanged + len(delivered) == len(generated)
+
+def stamp_delivered(spool, rows: Iterable[Dict], reminder_key: Callable[[Dict], str]) -> Iterator[Dict]:
+    """Set lastEmailSentDate from the spool: the time each user's reminder was actually delivered by the sender worker."""
+    rows = iter(rows)
+    while batch := list(islice(rows, REMINDER_BATCH_SIZE)):
+        sent_times = spool.sent_times([reminder_key(row) for row in batch])
+        for row in batch:
+            sent_at = sent_times.get(reminder_key(row))
+            if sent_at is not None:
+                row['lastEmailSentDate'] = datetime.fromtimestamp(sent_at, ZoneInfo('America/New_York')).strftime('%Y-%m-%d %H:%M:%S')
+            yield row
+
+def queue_emails(email_draft: EmailDraft, rows: List[Dict] | ColumnarSpill, columns: List[str], start_date: str, end_date: str, trends: Optional[Dict] = None) -> List[Dict] | ColumnarSpill:
+    """
+    Enqueue the reminders into the outbound spool and drain it with the sender worker, then do the same for the admin summary.
+
+    The summary is built after the reminders were drained, so lastEmailSentDate (in the summary and the returned rows)
+    only records reminders the worker actually delivered. Messages that still fail after the worker's retries stay
+    in the spool (pending or dead-lettered) and can be resumed with `python email_queue.py`.
+
+    Returns:
+    - The rows with updated lastEmailSentDate/lastUpdateDate (a new ColumnarSpill if rows was one).
+    """
+    import asyncio
+    from email_queue import EmailSpool, SenderWorker
+    from reports import reports_enabled
+
+    spool = EmailSpool()
+    worker = SenderWorker(spool, email_draft)
+    run_date = datetime.now(ZoneInfo('America/New_York')).strftime('%Y-%m-%d')
+    spill = isinstance(rows, ColumnarSpill)
+    queued = 0
+    pending = []
+
+    def flush_reminders():
+        # Reminders are spooled REMINDER_BATCH_SIZE at a time, one transaction per batch
+        nonlocal queued
+        queued += spool.enqueue_many(pending)
+        pending.clear()
+
+    def reminder_key(row: Dict) -> str:
+        # One reminder per user per day, even if the tracker is rerun
+        return f"reminder:{row['UserId']}:{start_date}:{end_date}:{run_date}"
+
+    def enqueue_reminder(row: Dict, body: str) -> bool:
+        message = email_draft.build_reminder_message(
+            to_email=row['Email'],
+            name=row['Name'],
+            start_date=start_date,
+            end_date=end_date,
+            missing_dates=row['NoSubmissionDates'],
+            body=body,
+            under_logged_dates=row.get('UnderLoggedDates') or ()
+        )
+        pending.append(('reminder', message, reminder_key(row)))
+        if len(pending) >= REMINDER_BATCH_SIZE:
+            flush_reminders()
+        return False            # lastEmailSentDate is stamped from the spool once the worker has delivered it
+
+    reminded_rows = store_rows(remind_users(email_draft, rows, enqueue_reminder), spill)
+    flush_reminders()
+    logger.info(f"Queued {queued} reminder emails.")
+    result = asyncio.run(worker.drain())
+    logger.info(f"Sender worker finished the reminders: {result['sent']} sent, {result['failed']} failed attempts.")
+
+    updated_rows = store_rows(stamp_delivered(spool, reminded_rows, reminder_key), spill)
+    if spill:
+        reminded_rows.close()
+
+    # NOTE: the spooled summary payload always carries its encoded attachment, since the worker may send it in a later process
+    def drain_summary():
+        result = asyncio.run(worker.drain())
+        logger.info(f"Sender worker finished the summary: {result['sent']} sent, {result['failed']} failed attempts. Spool: {spool.counts()}")
+
+    if reports_enabled():
+        def enqueue_report(report: Dict) -> bool:
+            # An already spooled report (same content and recipients) is left to the spool's own dedupe
+            spool.enqueue('summary', report['message'], dedupe_key=f"report:{report['content_hash']}")
+            return True
+
+        def confirm_reports(reports: List[Dict]) -> List[Dict]:
+            # Reports are recorded as sent only once the worker has delivered them
+            logger.info(f"Queued {len(reports)} summary reports.")
+            drain_summary()
+            sent = spool.sent_times([f"report:{report['content_hash']}" for report in reports])
+            return [report for report in reports if f"report:{report['content_hash']}" in sent]
+
+        send_reports(email_draft, updated_rows, start_date, end_date, trends, enqueue_report, confirm=confirm_reports)
+    else:
+        summary_message = email_draft.build_summary_message(get_admin_emails(), build_summary_users(updated_rows, columns), start_date, end_date, trends=trends)
+        spool.enqueue('summary', summary_message, dedupe_key=f"summary:{start_date}:{end_date}:{run_date}")
+        logger.info("Queued the admin summary.")
+        drain_summary()
+
+    for dead_letter in spool.dead_letters():
+        logger.error(f"Dead-lettered {dead_letter['kind']} message {dead_letter['dedupe_key']}: {dead_letter['last_error']}")
+    logger.info(f"Pruned {spool.prune()} sent messages past their retention.")
+    spool.close()
+    return updated_rows
+
+def send_emails(rows: List[Dict] | ColumnarSpill, columns: List[str], start_date: str, end_date: str, trends: Optional[Dict] = None) -> Tuple[bool, List[Dict] | ColumnarSpill]:
+    """
+    Send the reminders and the admin summary (inline, or through the outbound spool when EMAIL_DELIVERY=queue).
+
+    Returns:
+    - Tuple of (True if the run's emails were sent or spooled, False if sending was abandoned,
+      rows with updated lastEmailSentDate/lastUpdateDate). The caller closes a returned ColumnarSpill.
+    """
     email_draft = EmailDraft()
+
+    # Queue mode: spool every message and let the sender worker deliver them, instead of sending inline
+    if get_env('EMAIL_DELIVERY', 'inline') == 'queue':
+        return True, queue_emails(email_draft, rows, columns, start_date, end_date, trends)
+
     for attempt in range(1, MAX_RETRIES + 1):
         status, access_token = email_draft.get_access_token()
 
@@ -185,51 +485,30 @@ def main():
             time.sleep(2)
     if not status:
         logger.error(f"{access_token}. Exceeded maximum retries. Now exiting process.")      
-        return
+        return False, rows
 
-    for index, row in timecard_listed_dates_df.iterrows():
-        user_id, email, sender_name, dates = row['UserId'], row['Email'], row['Name'], row['NoSubmissionDates']
-        
-        # Skips sending email if no missing dates or comments exist (indicates prior error)
-        if len(dates) == 0 or row['Comments'] != "":
-            timecard_listed_dates_df.at[index, 'lastUpdateDate'] = datetime.now(ZoneInfo('America/New_York')).strftime('%Y-%m-%d %H:%M:%S')
-            continue
-
-        for attempt in range(1, MAX_RETRIES + 1):
-            status, message = email_draft.send_email(
-                token=access_token,
-                to_email=email,                                         
-                name=sender_name,                                       
-                user_id=user_id,
-                start_date=start_date,
-                end_date=end_date,
-                missing_dates=dates
-            )
-
-            if status:
-                logger.info(f"Successfully sent email to user {user_id} on attempt {attempt}.")
-                break
+    updated_rows = store_rows(
+        remind_users(email_draft, rows, lambda row, body: send_reminder(email_draft, access_token, row, start_date, end_date, body)),
+        isinstance(rows, ColumnarSpill)
+    )
 
-            if attempt < MAX_RETRIES:
-                logger.warning(f"Attempt {attempt} to send email to user {user_id} failed. Retrying...")
-                time.sleep(2)
-        if not status:
-            logger.error(f"Failed to send email to user {user_id}: {message}. Exceeded maximum retries.")
-            timecard_listed_dates_df.at[index, 'lastUpdateDate'] = datetime.now(ZoneInfo('America/New_York')).strftime('%Y-%m-%d %H:%M:%S')
-            continue
+    from reports import reports_enabled
 
-        # Updating the last email sent and update date columns
-        timecard_listed_dates_df.at[index, 'lastEmailSentDate'] = datetime.now(ZoneInfo('America/New_York')).strftime('%Y-%m-%d %H:%M:%S')
-        timecard_listed_dates_df.at[index, 'lastUpdateDate'] = datetime.now(ZoneInfo('America/New_York')).strftime('%Y-%m-%d %H:%M:%S')
+    # Sending the summary reports (multiple formats, per-admin or per-manager reports) when configured
+    if reports_enabled():
+        return send_reports(email_draft, updated_rows, start_date, end_date, trends,
+                            lambda report: send_report(email_draft, access_token, report),
+                            stream_attachment=isinstance(updated_rows, ColumnarSpill)), updated_rows
 
     # Sending summary email to admins
     for attempt in range(1, MAX_RETRIES + 1):
         status, message = email_draft.summary_email(
             token=access_token,
-            to_email=ADMIN_EMAILS,
-            users=timecard_listed_dates_df,
+            to_email=get_admin_emails(),
+            users=build_summary_users(updated_rows, columns),
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            trends=trends
         )
 
         if status:
@@ -241,11 +520,199 @@ def main():
             time.sleep(2)
     if not status:
         logger.error(f"Failed to send summary email to admins: {message}. Exceeded maximum retries.")
-        return  
-        
+    return status, updated_rows
+
+def record_rollups(start_date: str, end_date: str, work_week_dates: List[str], rows: List[Dict] | ColumnarSpill) -> Optional[Dict]:
+    """
+    Materialize the week into the trend rollups (see rollups.py).
+
+    A rollup store failure is logged and the run continues without trends, so it never holds back the reminders.
+
+    Returns:
+    - The trends once at least two weeks are recorded, else None.
+    """
+    import sqlite3
+    from rollups import RollupStore
+
+    trends = None
+    try:
+        rollup_store = RollupStore()
+        try:
+            rollup_store.record_week(start_date, end_date, work_week_dates, rows)
+            if rollup_store.weeks_recorded() >= 2:
+                trends = rollup_store.trends()
+        finally:
+            rollup_store.close()
+    except sqlite3.Error as e:
+        logger.error(f"Failed to record week {start_date} in trend rollups: {e}")
+        return None
+
+    logger.info(f"Recorded week {start_date} in trend rollups.")
+    return trends
+
+def persist_results(start_date: str, end_date: str, rows: List[Dict] | ColumnarSpill):
+    """Bulk-upsert the week's tracker rows into the results database (see results_store.py); a failure is logged."""
+    import sqlite3
+    from results_store import ResultsStore
+
+    mark_phase('persistence')
+    started = time.perf_counter()
+    try:
+        results_store = ResultsStore()
+        try:
+            written = results_store.upsert_week(start_date, end_date, rows)
+        finally:
+            results_store.close()
+    except sqlite3.Error as e:
+        logger.error(f"Failed to persist tracker results for week {start_date}: {e}")
+        return
+    logger.info(f"Persisted {written} tracker results for week {start_date} in {time.perf_counter() - started:.3f} s.")
+
+def main():
+    setup_logging()
+    logger.info("Starting main process...")
+
+    # Obtain access token
+    mark_phase('auth')
+    timesolv_auth = TimeSolveAuth()
+    for attempt in range(1, MAX_RETRIES + 1):
+        status, access_token = timesolv_auth.get_access_token()
+
+        # Breaking with successful access token retrieval
+        if status:
+            logger.info(f"Successfully obtained TimeSolv access token on attempt {attempt}.")
+            break
+
+        if attempt < MAX_RETRIES:
+            logger.warning(f"Attempt {attempt} to get TimeSolv access token failed. Retrying...")
+            time.sleep(2)  
+    if not status:
+        logger.error(f"{access_token}. Exceeded maximum retries. Now exiting process.")
+        return
+
+    # Initialize TimeSolv API
+    timesolv_api = TimeSolvAPI(access_token=access_token)
+
+    # The API is closed on every exit path, so the response cache's pending (batched) writes are committed
+    try:
+        # Get dates for range (current work week) and compile the exclusion rules for it
+        start_date, end_date = get_start_and_end_week_dates()
+        exclusion_rules = ExclusionRules.load().compile(start_date, end_date)
+
+        # Memory-bounded mode: process users chunk by chunk and spill users and rows to disk, so memory doesn't grow with the firm
+        chunk_size = int(get_env('MEMORY_BOUNDED_CHUNK_SIZE') or 0)
+        memory_bounded = chunk_size > 0
+
+        # Fetch firm users (excluded user IDs and employment statuses are filtered out server-side)
+        mark_phase('firm_users')
+        if memory_bounded:
+            firm_users = spill_firm_users(timesolv_api, exclusion_rules)
+            if isinstance(firm_users, str):
+                logger.error(f"{firm_users}. Exceeded maximum retries. Now exiting process.")
+                return
+        else:
+            for attempt in range(1, MAX_RETRIES + 1):
+                firm_users = timesolv_api.get_all_firm_users(exclude_user_ids=exclusion_rules.user_ids,
+                                                              exclude_employment_statuses=exclusion_rules.employment_status_values)
+
+                # Breaking with successful firm users retrieval (every user may have been excluded server-side)
+                if isinstance(firm_users, List) and (len(firm_users) == 0 or isinstance(firm_users[0], Dict)):
+                    logger.info(f"Successfully obtained firm users on attempt {attempt}.")
+                    break
+
+                if attempt < MAX_RETRIES:
+                    logger.warning(f"Attempt {attempt} to get firm users failed. Retrying...")
+                    time.sleep(2)  
+            if isinstance(firm_users, str):
+                logger.error(f"{firm_users}. Exceeded maximum retries. Now exiting process.")
+                return
+
+            # Evaluate every user against the remaining rules (email domains; statuses differing only in case) before any timecard is fetched
+            firm_users, excluded_users = exclusion_rules.partition(firm_users)
+            for user_id, reason in excluded_users.items():
+                logger.info(f"Excluding user {user_id} from tracking: {reason}.")
+            chunk_size = max(len(firm_users), 1)
+
+        logger.info(f"Fetching timecards from {start_date} to {end_date}...")
+        work_week_dates = get_work_week_dates()
+
+        # Hours-based compliance is enabled by EXPECTED_HOURS / EXPECTED_HOURS_BY_USER
+        compliance_engine = None
+        expected_hours = get_expected_hours()
+        if expected_hours is not None:
+            from compliance import ComplianceEngine
+
+            default_hours, hours_by_user = expected_hours
+            compliance_engine = ComplianceEngine(default_hours=default_hours, expected_hours=hours_by_user)
+
+        timecard_listed_dates_rows = ColumnarSpill(LISTED_DATES_COLUMNS) if memory_bounded else []
+        failed_users = 0            # Tracking how many users failed to get timecards retrieved
+        flagged_users = 0
+
+        users = iter(firm_users)
+        while chunk := list(islice(users, chunk_size)):
+            mark_phase('timecards')
+            rows, week_timecards = track_users(timesolv_api, chunk, start_date, end_date, work_week_dates, exclusion_rules)
+            failed_users += sum(1 for row in rows if row['Comments'] != "")
+
+            mark_phase('aggregation')
+            if compliance_engine is not None:
+                flagged_users += apply_compliance(compliance_engine, rows, week_timecards, work_week_dates, exclusion_rules)
+
+            if memory_bounded:
+                timecard_listed_dates_rows.append_rows(rows)
+            else:
+                timecard_listed_dates_rows.extend(rows)
+
+        logger.info(f"Processed {len(firm_users)} users. {failed_users} failed.")
+    finally:
+        if timesolv_api.cache is not None:
+            logger.info(f"TimeSolv response cache: {timesolv_api.cache.stats()}.")
+        timesolv_api.close()
+    if memory_bounded:
+        firm_users.close()
+    if compliance_engine is not None:
+        logger.info(f"Hours compliance check flagged {flagged_users} users with under-logged days.")
+
+    # Materialize this week into the trend rollups (enabled by ROLLUPS_ENABLED)
+    from rollups import rollups_enabled
+    trends = None
+    if rollups_enabled():
+        trends = record_rollups(start_date, end_date, work_week_dates, timecard_listed_dates_rows)
+
+    # Draft up email content for users with no submissions 
+    mark_phase('email')
+    updated_rows = timecard_listed_dates_rows
+    try:
+        status, updated_rows = send_emails(timecard_listed_dates_rows, LISTED_DATES_COLUMNS, start_date, end_date, trends)
+
+        # Persist this week's results, including who was emailed, for tracking (enabled by RESULTS_ENABLED)
+        from results_store import results_enabled
+        if results_enabled():
+            persist_results(start_date, end_date, updated_rows)
+    finally:
+        if memory_bounded:
+            timecard_listed_dates_rows.close()
+            updated_rows.close()
+
+    if not status:
+        return
     logger.info("Main process completed successfully. Successfully exiting.")
 
-    # NOTE: Will need to add to database in future for tracking purposes
+def cli():
+    """Command-line entry point: `python main.py [--profile] [--profile-dir DIR]`."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="TimeSolv timesheet tracker.")
+    parser.add_argument('--profile', action='store_true', help="Profile the run (pstats + collapsed stacks, summary in status.log).")
+    parser.add_argument('--profile-dir', default='profiles', help="Directory for profile output files.")
+    args = parser.parse_args()
+
+    if args.profile:
+        from profiling import profile_run
+        profile_run(main, args.profile_dir, logger)
+    else:
+        main()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    cli()
\ No newline at end of file
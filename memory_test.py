@@ -0,0 +1,117 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict
+
+# Firm sizes (number of tracked users) to benchmark. All are well above one page and one chunk,
+# so the bounded peak has reached its plateau
+FIRM_SIZES = [10_000, 25_000, 50_000]
+
+# Chunk size used for the memory-bounded runs (MEMORY_BOUNDED_CHUNK_SIZE)
+CHUNK_SIZE = 500
+
+# Memory-bounded peak at the largest firm may be at most this multiple of the peak at the smallest firm
+MAX_PEAK_GROWTH = 1.5
+
+# Runs main.main() against an in-process synthetic TimeSolv/Graph, then prints the peak memory as JSON
+CHILD_SCRIPT = """
+import json, os, resource, sys, tracemalloc
+sys.path.insert(0, os.environ['TRACKER_DIR'])
+tracemalloc.start()
+
+import main, email_draft
+
+USERS = int(os.environ['BENCH_USERS'])
+PAGE_SIZE = 1000
+WORK_DATES = main.get_work_week_dates()
+
+class FakeAuth:
+    def get_access_token(self):
+        return True, 'token'
+
+class FakeAPI:
+    cache = None
+
+    def __init__(self, access_token=None):
+        pass
+
+    def close(self):
+        pass
+
+    def iter_firm_user_pages(self, exclude_user_ids=None, fields=None, **kwargs):
+        for page_start in range(1, USERS + 1, PAGE_SIZE):
+            yield [{'Id': user_id, 'Email': f'user{user_id}@example.com', 'FirstName': f'First{user_id}', 'LastName': 'Last',
+                    'EmploymentStatus': 'Employee', 'UserStatus': 'Active'} for user_id in range(page_start, min(page_start + PAGE_SIZE, USERS + 1))]
+
+    def get_all_firm_users(self, exclude_user_ids=None, **kwargs):
+        return [user for page in self.iter_firm_user_pages() for user in page]
+
+    def search_timecards(self, start_date, end_date, firm_user_id=None, fields=None):
+        timecards = [{'FirmUserId': firm_user_id, 'Date': day, 'Hours': 8, 'Description': 'x' * 200, 'ProjectId': 1}
+                     for day in WORK_DATES[:firm_user_id % 6]]
+        return [{field: tc[field] for field in fields} for tc in timecards] if fields else timecards
+
+def fake_post(self, token, message, attachment_path=None):
+    if attachment_path is not None:
+        for _ in self._stream_payload(message, attachment_path):
+            pass
+    return True, ''
+
+main.TimeSolveAuth = FakeAuth
+main.TimeSolvAPI = FakeAPI
+main.time.sleep = lambda seconds: None
+email_draft.EmailDraft.get_access_token = lambda self: (True, 'token')
+email_draft.EmailDraft.post_message = fake_post
+
+main.main()
+print(json.dumps({
+    'tracemalloc_peak': tracemalloc.get_traced_memory()[1],
+    'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+}))
+"""
+
+def measure_run(users: int, chunk_size: int = 0) -> Dict[str, int]:
+    """
+    Run the tracker once in a fresh interpreter against the synthetic firm.
+
+    Args:
+    - users: Number of firm users.
+    - chunk_size: MEMORY_BOUNDED_CHUNK_SIZE (0 for the normal in-memory mode).
+
+    Returns:
+    - Dictionary with 'tracemalloc_peak' (Python heap) and 'max_rss' (process), both in bytes.
+    """
+    env = dict(os.environ,
+               TRACKER_DIR=os.path.dirname(os.path.abspath(__file__)),
+               BENCH_USERS=str(users),
+               MEMORY_BOUNDED_CHUNK_SIZE=str(chunk_size),
+               ADMIN_EMAILS="['admin@example.com']")
+
+    # Run in a scratch directory so status.log and the summary attachment don't land in the repo
+    with tempfile.TemporaryDirectory() as scratch:
+        result = subprocess.run([sys.executable, '-c', CHILD_SCRIPT], cwd=scratch, env=env,
+                                capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    bounded_peaks = []
+    print(f"{'users':>8}{'mode':>10}{'heap peak MB':>14}{'max RSS MB':>12}")
+    for users in FIRM_SIZES:
+        for mode, chunk_size in [('normal', 0), ('bounded', CHUNK_SIZE)]:
+            result = measure_run(users, chunk_size)
+            print(f"{users:>8}{mode:>10}{result['tracemalloc_peak'] / 2**20:>14.1f}{result['max_rss'] / 2**20:>12.1f}")
+            if mode == 'bounded':
+                bounded_peaks.append(result['tracemalloc_peak'])
+
+    growth = bounded_peaks[-1] / bounded_peaks[0]
+    print(f"Memory-bounded heap peak grew {growth:.2f}x from {FIRM_SIZES[0]} to {FIRM_SIZES[-1]} users (limit {MAX_PEAK_GROWTH}x)")
+    if growth > MAX_PEAK_GROWTH:
+        print("Memory benchmark FAILED")
+        sys.exit(1)
+
+    print("Memory benchmark passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, List, Dict, Optional, Tuple
+
+# NOTE: cProfile and pstats are imported only when profiling is actually used, since main imports mark_phase
+
+# Profiler of the current run, if any (phase marks are no-ops otherwise)
+_active_profiler: Optional['RunProfiler'] = None
+
+def mark_phase(name: str):
+    """Mark the start of a run phase (auth, firm users, timecards, aggregation, statistics, email)."""
+    if _active_profiler is not None:
+        _active_profiler.mark(name)
+
+class StackSampler(threading.Thread):
+    """Samples a thread's Python stack at a fixed interval into collapsed-stack counts (flamegraph/py-spy format)."""
+    def __init__(self, thread_id: int, profiler: 'RunProfiler', interval: float = 0.005):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.profiler = profiler
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(f"phase:{self.profiler.current_phase}")
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+class RunProfiler:
+    """Wraps one tracker run in cProfile plus a stack sampler, and tracks wall time per phase."""
+    def __init__(self, output_dir: str = 'profiles', sample_interval: float = 0.005):
+        import cProfile
+
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.profile = cProfile.Profile()
+        self.current_phase = 'startup'
+        self.phase_times: Dict[str, float] = {}
+        self._phase_started = time.perf_counter()
+        self.sampler: Optional[StackSampler] = None
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        self.phase_times[self.current_phase] = self.phase_times.get(self.current_phase, 0.0) + now - self._phase_started
+        self.current_phase = name
+        self._phase_started = now
+
+    def run(self, func: Callable, *args, **kwargs):
+        """Run func under the profilers and return its result."""
+        global _active_profiler
+        _active_profiler = self
+        self.sampler = StackSampler(threading.get_ident(), self, self.sample_interval)
+        self.sampler.start()
+        self._phase_started = time.perf_counter()
+
+        try:
+            return self.profile.runcall(func, *args, **kwargs)
+        finally:
+            self.mark('done')
+            self.sampler.stop()
+            _active_profiler = None
+
+    def save(self) -> Tuple[str, str]:
+        """
+        Write the pstats file and the collapsed-stack file.
+
+        Returns:
+        - Tuple of (pstats path, collapsed-stack path).
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        pstats_path = os.path.join(self.output_dir, f'run_{stamp}.pstats')
+        collapsed_path = os.path.join(self.output_dir, f'run_{stamp}.collapsed')
+
+        self.profile.dump_stats(pstats_path)
+        with open(collapsed_path, 'w', encoding='utf8') as f:
+            for stack, count in sorted(self.sampler.samples.items()):
+                f.write(f"{stack} {count}\n")
+
+        return pstats_path, collapsed_path
+
+    def phase_table(self) -> List[str]:
+        """Wall time per phase, in run order."""
+        total = sum(self.phase_times.values()) or 1.0
+        lines = [f"{'phase':<14}{'seconds':>10}{'share':>9}"]
+        for phase, seconds in self.phase_times.items():
+            lines.append(f"{phase:<14}{seconds:>10.3f}{seconds / total * 100:>8.1f}%")
+        return lines
+
+    def hot_functions_table(self, limit: int = 15) -> List[str]:
+        """Top functions by own (tottime) time, from the cProfile stats."""
+        import io
+        import pstats
+
+        stats = pstats.Stats(self.profile, stream=io.StringIO())
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+
+        lines = [f"{'calls':>9}{'tottime':>10}{'cumtime':>10}  function"]
+        for (filename, line, name), (_, ncalls, tottime, cumtime, _) in rows:
+            lines.append(f"{ncalls:>9}{tottime:>10.3f}{cumtime:>10.3f}  {name} ({os.path.basename(filename)}:{line})")
+        return lines
+
+def profile_run(func: Callable, output_dir: str, logger: logging.Logger):
+    """
+    Run func (the tracker's main) in profiling mode and append the results to the run log.
+
+    Args:
+    - func: Function to profile.
+    - output_dir: Directory for the .pstats and .collapsed files.
+    - logger: Logger of the run (status.log).
+    """
+    profiler = RunProfiler(output_dir)
+    try:
+        profiler.run(func)
+    finally:
+        pstats_path, collapsed_path = profiler.save()
+        logger.info(f"Profile written to {pstats_path} (pstats) and {collapsed_path} (collapsed stacks).")
+        for line in profiler.phase_table():
+            logger.info(f"[profile] {line}")
+        for line in profiler.hot_functions_table():
+            logger.info(f"[profile] {line}")
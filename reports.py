@@ -0,0 +1,412 @@
+from __future__ import annotations
+import base64
+import csv
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Dict, Iterable, Optional, Tuple, TYPE_CHECKING
+from config import get_env, get_admin_emails, get_manager_reports, get_report_formats, get_state_path
+from email_draft import SUMMARY_COLUMNS, ATTACHMENT_PLACEHOLDER
+from spill import ColumnarSpill
+
+# NOTE: pandas (xlsx/parquet attachments) is imported inside the renderer that needs it, like in email_draft.py
+if TYPE_CHECKING:
+    from email_draft import EmailDraft
+
+logger = logging.getLogger(__name__)
+
+# Default directory name of the rendered report cache (rendered outputs plus the sent log), inside the state directory
+DEFAULT_REPORT_CACHE_DIRNAME = 'report_cache'
+
+# Days a rendered output or sent-log entry is kept after its last use; REPORT_CACHE_MAX_AGE_DAYS overrides it.
+# Reports are weekly, so older entries would only be hit by a rerun of a past week
+DEFAULT_REPORT_CACHE_MAX_AGE_DAYS = 28
+
+# Attachment name (without extension) and Graph contentType per supported format
+REPORT_BASENAME = 'missing_time_sheets_summary'
+ATTACHMENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# Run bookkeeping timestamps, left out of the content hash so a rerun over unchanged data hits the cache
+VOLATILE_COLUMNS = ('lastUpdateDate', 'lastEmailSentDate')
+
+@dataclass
+class Report:
+    """One summary report: the rows it covers and who receives it."""
+    name: str                   # 'admins', 'admin:<email>' or 'manager:<email>'
+    recipients: List[str]
+    rows: List[Dict] | ColumnarSpill
+    label: str = ""             # Appended to the subject of sub-reports
+
+def reports_enabled() -> bool:
+    """True when any report option (REPORT_FORMATS, MANAGER_REPORTS, ADMIN_REPORT_SPLIT) is configured."""
+    return bool(get_env('REPORT_FORMATS') or get_env('MANAGER_REPORTS') or get_env('ADMIN_REPORT_SPLIT'))
+
+def plan_reports(rows: List[Dict] | ColumnarSpill, admin_emails: Optional[List[str]] = None,
+                 manager_reports: Optional[Dict[str, List[int]]] = None, split_admins: Optional[bool] = None) -> List[Report]:
+    """
+    Decide which reports to generate for the run.
+
+    Args:
+    - rows: Tracker rows of every user (a ColumnarSpill is passed through to the admin reports, not loaded).
+    - admin_emails: Recipients of the full summary. Defaults to ADMIN_EMAILS.
+    - manager_reports: Manager email to the user IDs on their team. Defaults to MANAGER_REPORTS.
+    - split_admins: Send each admin their own message instead of one message to all admins. Defaults to ADMIN_REPORT_SPLIT.
+
+    Returns:
+    - List of reports: the admin summary (one per admin when split), then one sub-report per manager.
+    """
+    admin_emails = get_admin_emails() if admin_emails is None else admin_emails
+    manager_reports = get_manager_reports() if manager_reports is None else manager_reports
+    if split_admins is None:
+        split_admins = get_env('ADMIN_REPORT_SPLIT', 'false').lower() in ('1', 'true', 'yes')
+
+    if split_admins:
+        reports = [Report(f"admin:{email}", [email], rows) for email in admin_emails]
+    else:
+        reports = [Report('admins', list(admin_emails), rows)]
+
+    # Team rows for every manager in one pass over the rows (teams are small, so they are kept in memory)
+    managers_by_user: Dict[int, List[str]] = {}
+    for manager_email, user_ids in manager_reports.items():
+        for user_id in user_ids:
+            managers_by_user.setdefault(user_id, []).append(manager_email)
+    team_rows: Dict[str, List[Dict]] = {manager_email: [] for manager_email in manager_reports}
+    if managers_by_user:
+        for row in rows:
+            for manager_email in managers_by_user.get(row.get('UserId'), ()):
+                team_rows[manager_email].append(row)
+
+    for manager_email, manager_rows in team_rows.items():
+        reports.append(Report(f"manager:{manager_email}", [manager_email], manager_rows, label=f" - Team of {manager_email}"))
+    return reports
+
+class ReportCache:
+    """
+    Content-addressed cache of rendered report outputs (one file per hash), plus a SQLite log of
+    which report content was already sent to which recipient. Entries unused for max_age_days are pruned.
+    """
+    def __init__(self, directory: Optional[str] = None, max_age_days: Optional[float] = None):
+        """
+        Args:
+        - directory: Cache directory. Defaults to REPORT_CACHE_DIR, then DEFAULT_REPORT_CACHE_DIRNAME in the state directory.
+        - max_age_days: See prune(). Defaults to REPORT_CACHE_MAX_AGE_DAYS, then DEFAULT_REPORT_CACHE_MAX_AGE_DAYS.
+        """
+        self.directory = directory or get_env('REPORT_CACHE_DIR') or get_state_path(DEFAULT_REPORT_CACHE_DIRNAME)
+        self.max_age_days = max_age_days or float(get_env('REPORT_CACHE_MAX_AGE_DAYS') or DEFAULT_REPORT_CACHE_MAX_AGE_DAYS)
+        os.makedirs(self.directory, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(self.directory, 'sent.db'))
+        self.connection.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS sent_reports (
+                content_hash TEXT NOT NULL,
+                recipient TEXT NOT NULL,
+                sent_at REAL NOT NULL,
+                PRIMARY KEY (content_hash, recipient)
+            );
+        """)
+        self.connection.commit()
+        self.counters = {'hits': 0, 'rendered': 0, 'pruned': 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _hit(self, path: str):
+        self.counters['hits'] += 1
+        os.utime(path)          # Keeps a reused output from being pruned
+
+    def get(self, key: str) -> Optional[str]:
+        """Rendered text output (a report body) for a key, or None."""
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                content = f.read()
+        except FileNotFoundError:
+            self.counters['rendered'] += 1
+            return None
+        self._hit(self._path(key))
+        return content
+
+    def put(self, key: str, content: str):
+        """Store a rendered text output (written to a temporary file first, so readers never see a partial file)."""
+        temporary_path = self.temporary_path(key)
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.store_file(key, temporary_path)
+
+    def get_file(self, key: str) -> Optional[str]:
+        """Path of a cached file output (an attachment), or None if it must be rendered (see temporary_path)."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            self.counters['rendered'] += 1
+            return None
+        self._hit(path)
+        return path
+
+    def temporary_path(self, key: str) -> str:
+        """Where to render an output before store_file() moves it in place (keeps the extension, e.g. for to_excel)."""
+        root, extension = os.path.splitext(self._path(key))
+        return f"{root}.{os.getpid()}.tmp{extension}"
+
+    def store_file(self, key: str, temporary_path: str) -> str:
+        """Move a rendered output in place and return its path."""
+        os.replace(temporary_path, self._path(key))
+        return self._path(key)
+
+    def prune(self) -> int:
+        """
+        Delete rendered outputs and sent-log entries unused for max_age_days.
+
+        Returns:
+        - Number of outputs deleted.
+        """
+        cutoff = time.time() - self.max_age_days * 24 * 60 * 60
+        pruned = 0
+        for name in os.listdir(self.directory):
+            path = self._path(name)
+            if not name.startswith('sent.db') and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                pruned += 1
+        with self.connection:
+            self.connection.execute("DELETE FROM sent_reports WHERE sent_at < ?", (cutoff,))
+        self.counters['pruned'] += pruned
+        return pruned
+
+    def was_sent(self, content_hash: str, recipients: List[str]) -> bool:
+        """True if this exact report content was already sent to every one of the recipients."""
+        sent = {recipient for (recipient,) in self.connection.execute(
+            f"SELECT recipient FROM sent_reports WHERE content_hash = ? AND recipient IN ({','.join('?' * len(recipients))})",
+            (content_hash, *recipients)
+        )}
+        return bool(recipients) and sent == set(recipients)
+
+    def mark_sent(self, content_hash: str, recipients: List[str]):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO sent_reports (content_hash, recipient, sent_at) VALUES (?, ?, ?)",
+                [(content_hash, recipient, time.time()) for recipient in recipients]
+            )
+
+    def close(self):
+        self.connection.close()
+
+    def stats(self) -> str:
+        """Counters for the run log."""
+        return (f"{self.counters['hits']} outputs served from cache, {self.counters['rendered']} rendered, "
+                f"{self.counters['pruned']} pruned")
+
+def _hash(*parts) -> str:
+    canonical = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def _rows_hash(rows: Iterable[Dict]) -> str:
+    """Hash of the rows' report content (without VOLATILE_COLUMNS), computed row by row so a spill is never loaded."""
+    digest = hashlib.sha256()
+    for row in rows:
+        stable = [row.get(column) for column in SUMMARY_COLUMNS if column not in VOLATILE_COLUMNS]
+        digest.update(json.dumps(stable, separators=(',', ':'), default=str).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+def render_csv(rows: Iterable[Dict], path: str):
+    """Write the summary rows as CSV (same layout as EmailDraft.write_summary_csv, streamed row by row)."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_COLUMNS)
+        for row in rows:
+            writer.writerow([row.get(column, "") for column in SUMMARY_COLUMNS])
+
+def render_xlsx(rows: Iterable[Dict], path: str):
+    """Write the summary rows as an Excel workbook (needs pandas and openpyxl); date lists are joined into one cell."""
+    import pandas as pd
+
+    frame = pd.DataFrame([{column: ", ".join(map(str, row.get(column) or [])) if isinstance(row.get(column), list) else row.get(column, "")
+                           for column in SUMMARY_COLUMNS} for row in rows], columns=SUMMARY_COLUMNS)
+    frame.to_excel(path, index=False, sheet_name='Missing time sheets')
+
+def render_parquet(rows: Iterable[Dict], path: str):
+    """Write the summary rows as Parquet (needs pandas and pyarrow); date lists stay list columns."""
+    import pandas as pd
+
+    frame = pd.DataFrame([{column: row.get(column) for column in SUMMARY_COLUMNS} for row in rows], columns=SUMMARY_COLUMNS)
+    frame.to_parquet(path, index=False)
+
+RENDERERS = {'csv': render_csv, 'xlsx': render_xlsx, 'parquet': render_parquet}
+
+def supported_formats(formats: List[str]) -> List[str]:
+    """Drop (and log) attachment formats without a renderer; ['csv'] if none is left."""
+    unknown_formats = [fmt for fmt in formats if fmt not in RENDERERS]
+    if unknown_formats:
+        logger.error(f"Unsupported report formats {unknown_formats} (supported: {list(RENDERERS)}). Skipping them.")
+    return [fmt for fmt in formats if fmt in RENDERERS] or ['csv']
+
+def _render_body(email_draft: EmailDraft, rows: List[Dict] | ColumnarSpill, start_date: str, end_date: str,
+                 body_type: str, trends: Optional[Dict]) -> Tuple[str, str]:
+    """Render one report body (module-level, so it can run in a worker process)."""
+    return email_draft.render_summary_body(rows, start_date, end_date, body_type, trends)
+
+def _run_inline(function, *args) -> Future:
+    """Run a task in the calling process, as a completed Future (no pool, or rows that can't be sent to a worker)."""
+    future = Future()
+    try:
+        future.set_result(function(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+class ReportGenerator:
+    """
+    Renders the summary reports (HTML/text body plus one attachment per format) in a process pool.
+
+    Rendering is CPU-bound Python (templates, csv/openpyxl writers), so threads would serialize on the GIL; with
+    one worker, or for rows spilled to disk (a ColumnarSpill stays in this process), tasks run inline.
+    Every output is cached by a hash of its inputs, so an unchanged report is neither re-rendered nor,
+    through ReportCache.was_sent, sent again.
+    """
+    def __init__(self, email_draft: EmailDraft, formats: Optional[List[str]] = None, max_workers: Optional[int] = None,
+                 cache: Optional[ReportCache] = None):
+        """
+        Args:
+        - email_draft: EmailDraft used to render the summary body and build recipients.
+        - formats: Attachment formats. Defaults to REPORT_FORMATS, then ['csv']. Unsupported formats are logged and
+          skipped (csv is used if none is left), so a typo never stops the summary.
+        - max_workers: Number of worker processes. Defaults to REPORT_WORKERS, then the number of CPUs.
+        - cache: Report cache. Defaults to a ReportCache in REPORT_CACHE_DIR.
+        """
+        self.email_draft = email_draft
+        self.formats = supported_formats(formats or get_report_formats())
+        workers = get_env('REPORT_WORKERS')
+        self.max_workers = max_workers or (int(workers) if workers else os.cpu_count() or 1)
+        self.cache = cache or ReportCache()
+
+    def generate(self, reports: List[Report], start_date: str, end_date: str, body_type: str = 'HTML',
+                 trends: Optional[Dict] = None, stream_attachment: bool = False) -> List[Dict]:
+        """
+        Render every report's body and attachments, in parallel across worker processes.
+
+        Args:
+        - reports: Reports from plan_reports().
+        - start_date: Start date of the work week.
+        - end_date: End date of the work week.
+        - body_type: 'HTML' or 'Text'.
+        - trends: Optional multi-week trends (RollupStore.trends()) to include in the summaries.
+        - stream_attachment: Put ATTACHMENT_PLACEHOLDER in the payload and return the attachment's path, to be streamed
+          by EmailDraft.post_message (memory-bounded mode). Only the csv format can be streamed; other formats are skipped.
+
+        Returns:
+        - One dictionary per report with 'report', 'message' (sendMail payload), 'content_hash' and 'attachment_path'
+          (the file to stream, or None). Reports without recipients are dropped; formats whose optional dependency
+          is missing are skipped.
+        """
+        formats = self.formats
+        if stream_attachment:
+            formats = ['csv']
+            if self.formats != formats:
+                logger.warning(f"Memory-bounded mode only streams the csv attachment. Skipping {[fmt for fmt in self.formats if fmt != 'csv']}.")
+
+        for report in reports:
+            if not report.recipients:
+                logger.warning(f"Report {report.name} has no recipients. Skipping.")
+        reports = [report for report in reports if report.recipients]
+        rows_hashes = {report.name: _rows_hash(report.rows) for report in reports}
+
+        # Only outputs missing from the cache are rendered; reports covering the same rows (e.g. split admin reports)
+        # share their attachment renders
+        bodies, body_tasks, attachment_tasks = {}, {}, {}
+        for report in reports:
+            key = _hash('body', report.label, start_date, end_date, body_type, trends, rows_hashes[report.name])
+            cached = self.cache.get(key)
+            bodies[report.name] = json.loads(cached) if cached is not None else None
+            if cached is None:
+                body_tasks[report.name] = (key, report)
+            for fmt in formats:
+                key = _hash('attachment', fmt, rows_hashes[report.name])
+                if key not in attachment_tasks:
+                    attachment_tasks[key] = (fmt, report.rows, self.cache.get_file(f"{key}.{fmt}"))
+
+        tasks = len(body_tasks) + sum(1 for _, _, path in attachment_tasks.values() if path is None)
+        executor = ProcessPoolExecutor(max_workers=min(self.max_workers, tasks)) if self.max_workers > 1 and tasks > 1 else None
+
+        def submit(rows, function, *args) -> Future:
+            if executor is None or isinstance(rows, ColumnarSpill):
+                return _run_inline(function, *args)
+            return executor.submit(function, *args)
+
+        try:
+            body_futures = {name: submit(report.rows, _render_body, self.email_draft, report.rows, start_date, end_date, body_type, trends)
+                            for name, (_, report) in body_tasks.items()}
+            attachment_futures = {key: submit(rows, RENDERERS[fmt], rows, self.cache.temporary_path(f"{key}.{fmt}"))
+                                  for key, (fmt, rows, path) in attachment_tasks.items() if path is None}
+
+            for name, (key, report) in body_tasks.items():
+                subject, body = body_futures[name].result()
+                bodies[name] = {'subject': subject + report.label, 'body': body, 'hash': key}
+                self.cache.put(key, json.dumps(bodies[name]))
+
+            attachments = {}
+            for key, (fmt, rows, path) in attachment_tasks.items():
+                try:
+                    if path is None:
+                        attachment_futures[key].result()
+                        path = self.cache.store_file(f"{key}.{fmt}", self.cache.temporary_path(f"{key}.{fmt}"))
+                    attachments[key] = {
+                        "@odata.type": "#microsoft.graph.fileAttachment",
+                        "name": f"{REPORT_BASENAME}.{fmt}",
+                        "contentType": ATTACHMENT_TYPES[fmt],
+                        'path': path,
+                        'hash': key
+                    }
+                except ImportError as e:
+                    logger.warning(f"Skipping {fmt} attachments: {e}")
+                    if os.path.exists(self.cache.temporary_path(f"{key}.{fmt}")):
+                        os.remove(self.cache.temporary_path(f"{key}.{fmt}"))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        generated = []
+        for report in reports:
+            rendered = bodies[report.name]
+            files = [attachments[key] for fmt in formats if (key := _hash('attachment', fmt, rows_hashes[report.name])) in attachments]
+            attachment_path = files[0]['path'] if stream_attachment and files else None
+            content_hash = _hash(rendered['hash'], [attachment['hash'] for attachment in files], sorted(report.recipients))
+            generated.append({
+                'report': report,
+                'content_hash': content_hash,
+                'attachment_path': attachment_path,
+                'message': {
+                    'message': {
+                        'subject': rendered['subject'],
+                        'body': {
+                            'contentType': body_type,
+                            'content': rendered['body']
+                        },
+                        'toRecipients': self.email_draft.build_recipients(report.recipients),
+                        'attachments': [self._file_attachment(attachment, attachment_path is not None) for attachment in files]
+                    },
+                    'saveToSentItems': "false"
+                }
+            })
+        return generated
+
+    @staticmethod
+    def _file_attachment(attachment: Dict, streamed: bool) -> Dict:
+        """Graph fileAttachment for a rendered file: the placeholder when streamed, else the base64-encoded file."""
+        if streamed:
+            encoded = ATTACHMENT_PLACEHOLDER
+        else:
+            with open(attachment['path'], 'rb') as f:
+                encoded = base64.b64encode(f.read()).decode('utf-8')
+        return {
+            "@odata.type": attachment["@odata.type"],
+            "name": attachment["name"],
+            "contentType": attachment["contentType"],
+            "contentBytes": encoded
+        }
@@ -0,0 +1,108 @@
+import os
+import sys
+import tempfile
+import time
+from typing import List, Dict
+
+from email_draft import EmailDraft
+from main import LISTED_DATES_COLUMNS
+from reports import ReportCache, ReportGenerator, plan_reports, supported_formats
+from spill import ColumnarSpill
+
+WORK_DATES = ['2026-10-12', '2026-10-13', '2026-10-14', '2026-10-15', '2026-10-16']
+
+def make_rows(count: int) -> List[Dict]:
+    """Tracker rows where user i misses the first i % 6 days of the week."""
+    return [{'UserId': user_id, 'Email': f"user{user_id}@example.com", 'Name': f"User {user_id}",
+             'NoSubmissionDates': WORK_DATES[:user_id % 6], 'NoSubmissionCount': user_id % 6, 'UnderLoggedDates': [],
+             'Comments': "", 'lastEmailSentDate': "", 'lastUpdateDate': ""} for user_id in range(count)]
+
+def check(failures: List[str], condition: bool, description: str):
+    print(f"{'ok  ' if condition else 'FAIL'} {description}")
+    if not condition:
+        failures.append(description)
+
+def check_plan_reports(failures: List[str]):
+    rows = make_rows(20)
+    managers = {'lead@example.com': [1, 2, 99]}
+
+    reports = plan_reports(rows, ['a@example.com', 'b@example.com'], managers, split_admins=False)
+    check(failures, [report.name for report in reports] == ['admins', 'manager:lead@example.com'], "one admin report plus one per manager")
+    check(failures, [row['UserId'] for row in reports[1].rows] == [1, 2], "manager report holds only their team's rows")
+
+    reports = plan_reports(rows, ['a@example.com', 'b@example.com'], {}, split_admins=True)
+    check(failures, [report.recipients for report in reports] == [['a@example.com'], ['b@example.com']], "split admin reports get one recipient each")
+
+    spill = ColumnarSpill(LISTED_DATES_COLUMNS)
+    spill.append_rows(rows)
+    reports = plan_reports(spill, ['a@example.com'], managers, split_admins=False)
+    check(failures, reports[0].rows is spill, "a spill is passed through to the admin report, not loaded")
+    check(failures, [row['UserId'] for row in reports[1].rows] == [1, 2], "manager rows are collected from a spill")
+    spill.close()
+
+def check_cache(failures: List[str], directory: str):
+    cache = ReportCache(os.path.join(directory, 'cache'), max_age_days=1)
+    check(failures, cache.get('body') is None, "missing output is a cache miss")
+    cache.put('body', 'rendered')
+    check(failures, cache.get('body') == 'rendered', "stored output is served from the cache")
+
+    check(failures, not cache.was_sent('hash', ['a@example.com']), "unsent content is not reported as sent")
+    cache.mark_sent('hash', ['a@example.com'])
+    check(failures, cache.was_sent('hash', ['a@example.com']), "sent content is reported as sent")
+    check(failures, not cache.was_sent('hash', ['a@example.com', 'b@example.com']), "content is only sent once every recipient got it")
+    check(failures, not cache.was_sent('hash', []), "a report without recipients is never sent")
+
+    # Age the output and the sent-log entry past max_age_days
+    two_days_ago = time.time() - 2 * 24 * 60 * 60
+    os.utime(os.path.join(cache.directory, 'body'), (two_days_ago, two_days_ago))
+    cache.connection.execute("UPDATE sent_reports SET sent_at = ?", (two_days_ago,))
+    cache.connection.commit()
+    check(failures, cache.prune() == 1 and cache.get('body') is None, "outputs unused for max_age_days are pruned")
+    check(failures, not cache.was_sent('hash', ['a@example.com']), "old sent-log entries are pruned")
+    cache.close()
+
+def check_generator(failures: List[str], directory: str):
+    check(failures, supported_formats(['csv', 'xslx']) == ['csv'], "unsupported formats are skipped")
+    check(failures, supported_formats(['pdf']) == ['csv'], "csv is used when no format is supported")
+
+    cache = ReportCache(os.path.join(directory, 'generator'))
+    reports = plan_reports(make_rows(50), ['a@example.com'], {'lead@example.com': [1, 2]}, split_admins=False)
+    first = ReportGenerator(EmailDraft(), formats=['csv'], max_workers=2, cache=cache).generate(reports, WORK_DATES[0], WORK_DATES[-1])
+    rendered = cache.counters['rendered']
+    second = ReportGenerator(EmailDraft(), formats=['csv'], max_workers=2, cache=cache).generate(reports, WORK_DATES[0], WORK_DATES[-1])
+    check(failures, len(first) == 2 and all(report['message']['message']['attachments'] for report in first), "every report gets its attachment")
+    check(failures, cache.counters['rendered'] == rendered, "an unchanged rerun renders nothing")
+    check(failures, [report['content_hash'] for report in first] == [report['content_hash'] for report in second], "content hashes are stable across runs")
+    cache.close()
+
+def benchmark(directory: str, reports_count: int = 12, team_size: int = 2000):
+    """Time rendering many manager reports inline and across worker processes (fresh cache each time)."""
+    rows = make_rows(reports_count * team_size)
+    managers = {f"lead{i}@example.com": list(range(i * team_size, (i + 1) * team_size)) for i in range(reports_count)}
+    reports = plan_reports(rows, [], managers, split_admins=True)
+
+    for workers in (1, os.cpu_count() or 1):
+        cache = ReportCache(tempfile.mkdtemp(dir=directory))
+        started = time.perf_counter()
+        ReportGenerator(EmailDraft(), formats=['csv'], max_workers=workers, cache=cache).generate(reports, WORK_DATES[0], WORK_DATES[-1])
+        print(f"     {reports_count} reports x {team_size} rows, {workers} worker(s): {time.perf_counter() - started:.3f} s")
+        cache.close()
+        if workers == os.cpu_count():
+            break
+
+def main():
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        check_plan_reports(failures)
+        check_cache(failures, directory)
+        check_generator(failures, directory)
+        if '--benchmark' in sys.argv:
+            benchmark(directory)
+
+    if failures:
+        print(f"Report checks FAILED ({len(failures)})")
+        sys.exit(1)
+    print("Report checks passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+from config import get_env
+
+# Default limits; TIMESOLV_CACHE_MAX_MB, TIMESOLV_CACHE_TTL and TIMESOLV_CACHE_CLOSED_TTL override them
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+DEFAULT_CURRENT_TTL = 5 * 60                    # Current week: short, since a user may have just submitted
+DEFAULT_CLOSED_TTL = 365 * 24 * 60 * 60         # Closed past weeks: effectively immutable
+
+# Cache writes are committed in batches (a lost batch only costs refetches)
+COMMIT_EVERY = 200
+
+class ResponseCache:
+    """
+    On-disk (SQLite) cache of TimeSolv search responses, keyed by endpoint plus canonicalized payload.
+
+    Entries expire after a per-entry TTL (a few minutes for the current week); expired entries that carry an ETag/Last-Modified
+    are revalidated with a conditional request instead of being refetched. Total size is bounded with LRU eviction.
+    """
+    def __init__(self, path: str, max_bytes: Optional[int] = None, current_ttl: Optional[float] = None,
+                 closed_ttl: Optional[float] = None):
+        """
+        Args:
+        - path: SQLite file for the cache.
+        - max_bytes: Size bound for the cached bodies. Defaults to TIMESOLV_CACHE_MAX_MB, then DEFAULT_MAX_BYTES.
+        - current_ttl: TTL in seconds for data that can still change. Defaults to TIMESOLV_CACHE_TTL, then DEFAULT_CURRENT_TTL.
+        - closed_ttl: TTL in seconds for closed past weeks. Defaults to TIMESOLV_CACHE_CLOSED_TTL, then DEFAULT_CLOSED_TTL.
+        """
+        max_mb = get_env('TIMESOLV_CACHE_MAX_MB')
+        self.max_bytes = max_bytes or (int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES)
+        self.current_ttl = current_ttl if current_ttl is not None else float(get_env('TIMESOLV_CACHE_TTL') or DEFAULT_CURRENT_TTL)
+        self.closed_ttl = closed_ttl or float(get_env('TIMESOLV_CACHE_CLOSED_TTL') or DEFAULT_CLOSED_TTL)
+
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                body TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                elapsed REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_used);
+        """)
+        self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.pending_writes = 0
+        self.counters = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stored': 0, 'evicted': 0}
+
+    @staticmethod
+    def key(url: str, payload: Dict, fields: Optional[List[str]] = None) -> str:
+        """Cache key: endpoint (case-insensitive) plus the payload with sorted keys and no whitespace, plus the kept fields."""
+        canonical = json.dumps([payload, sorted(fields) if fields is not None else None], sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(f"{url.lower()}\n{canonical}".encode('utf-8')).hexdigest()
+
+    def ttl_for_period(self, end_date: Optional[str]) -> float:
+        """TTL for a search over a period ending on end_date (YYYY-MM-DD): long once its week has closed, else current_ttl."""
+        if end_date is None:
+            return self.current_ttl
+
+        today = datetime.now(ZoneInfo('America/New_York')).date()
+        current_week_start = today - timedelta(days=today.weekday())
+        return self.closed_ttl if date.fromisoformat(end_date[:10]) < current_week_start else self.current_ttl
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up an entry (fresh or expired).
+
+        Returns:
+        - None if nothing is cached, otherwise a dictionary with 'body' (parsed JSON), 'etag', 'last_modified',
+          'elapsed' (latency of the original request) and 'fresh'.
+        """
+        row = self.connection.execute(
+            "SELECT body, etag, last_modified, elapsed, expires_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'body': json.loads(row[0]), 'etag': row[1], 'last_modified': row[2], 'elapsed': row[3], 'fresh': row[4] > time.time()}
+
+    def touch(self, key: str, ttl: Optional[float] = None):
+        """Mark an entry as used (for LRU), and extend its expiry by ttl after a successful revalidation."""
+        if ttl is None:
+            self.connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        else:
+            self.connection.execute("UPDATE responses SET last_used = ?, expires_at = ? WHERE key = ?", (time.time(), time.time() + ttl, key))
+        self._written()
+
+    def put(self, key: str, url: str, body: Dict, ttl: float, elapsed: float, etag: Optional[str] = None,
+            last_modified: Optional[str] = None):
+        """Store a successful response, then evict least recently used entries beyond max_bytes."""
+        text = json.dumps(body, separators=(',', ':'))
+        old_size = self.connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO responses (key, url, body, size, etag, last_modified, elapsed, expires_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, url, text, len(text), etag, last_modified, elapsed, now + ttl, now)
+        )
+        self.total_bytes += len(text) - (old_size[0] if old_size else 0)
+        self.counters['stored'] += 1
+
+        while self.total_bytes > self.max_bytes:
+            victims = self.connection.execute(
+                "SELECT key, size FROM responses WHERE key <> ? ORDER BY last_used LIMIT 100", (key,)
+            ).fetchall()
+            if not victims:
+                break
+            for victim_key, size in victims:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                self.connection.execute("DELETE FROM responses WHERE key = ?", (victim_key,))
+                self.total_bytes -= size
+                self.counters['evicted'] += 1
+        self._written()
+
+    def _written(self):
+        self.pending_writes += 1
+        if self.pending_writes >= COMMIT_EVERY:
+            self.connection.commit()
+            self.pending_writes = 0
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def stats(self) -> str:
+        """Counters for the run log."""
+        lookups = self.counters['hits'] + self.counters['misses'] + self.counters['revalidated']
+        hit_rate = (self.counters['hits'] + self.counters['revalidated']) / lookups * 100 if lookups else 0
+        return (f"{self.counters['hits']} hits, {self.counters['revalidated']} revalidated, {self.counters['misses']} misses "
+                f"({hit_rate:.1f}% served from cache), {self.counters['stored']} stored, {self.counters['evicted']} evicted, "
+                f"{self.total_bytes / 1024 / 1024:.1f} MB cached")
@@ -0,0 +1,108 @@
+import json
+import sqlite3
+from itertools import islice
+from typing import List, Dict, Iterable, Optional
+from config import get_env, get_flag, get_state_file
+
+# Default file name of the results database, inside the state directory
+DEFAULT_RESULTS_FILENAME = 'results.db'
+
+# Tracker rows written per executemany batch
+UPSERT_BATCH_SIZE = 5000
+
+def results_enabled() -> bool:
+    """Results persistence is enabled by RESULTS_ENABLED (or by naming its file in RESULTS_DB_PATH)."""
+    return get_flag('RESULTS_ENABLED') or bool(get_env('RESULTS_DB_PATH'))
+
+class ResultsStore:
+    """
+    Per-user, per-week tracker results (the rows emailed in the summary CSV), persisted in SQLite.
+
+    A week's rows are bulk-upserted in one transaction, so rerunning the tracker for the same week
+    updates the existing rows (e.g. lastEmailSentDate) instead of duplicating them.
+    """
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+        - path: SQLite file for the results. Defaults to RESULTS_DB_PATH (a file name in the state directory, or an absolute path),
+          then DEFAULT_RESULTS_FILENAME in the state directory.
+        """
+        self.path = path or get_state_file('RESULTS_DB_PATH', DEFAULT_RESULTS_FILENAME)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS tracker_results (
+                user_id INTEGER NOT NULL,
+                week_start TEXT NOT NULL,
+                week_end TEXT NOT NULL,
+                email TEXT,
+                name TEXT,
+                no_submission_dates TEXT NOT NULL,
+                no_submission_count INTEGER NOT NULL,
+                under_logged_dates TEXT NOT NULL,
+                last_email_sent_date TEXT,
+                last_update_date TEXT,
+                comments TEXT NOT NULL,
+                PRIMARY KEY (user_id, week_start)
+            );
+            CREATE INDEX IF NOT EXISTS tracker_results_week ON tracker_results (week_start, no_submission_count);
+        """)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def upsert_week(self, week_start: str, week_end: str, rows: Iterable[Dict]) -> int:
+        """
+        Bulk-upsert one week's tracker rows in a single transaction.
+
+        Args:
+        - week_start: Monday of the week (YYYY-MM-DD).
+        - week_end: Friday of the week (YYYY-MM-DD).
+        - rows: Tracker rows (a list or a ColumnarSpill), consumed in batches of UPSERT_BATCH_SIZE.
+
+        Returns:
+        - Number of rows written.
+        """
+        rows = iter(rows)
+        written = 0
+        with self.connection:
+            while batch := list(islice(rows, UPSERT_BATCH_SIZE)):
+                self.connection.executemany(
+                    "INSERT INTO tracker_results (user_id, week_start, week_end, email, name, no_submission_dates, "
+                    "no_submission_count, under_logged_dates, last_email_sent_date, last_update_date, comments) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (user_id, week_start) DO UPDATE SET week_end = excluded.week_end, email = excluded.email, "
+                    "name = excluded.name, no_submission_dates = excluded.no_submission_dates, "
+                    "no_submission_count = excluded.no_submission_count, under_logged_dates = excluded.under_logged_dates, "
+                    "last_email_sent_date = COALESCE(excluded.last_email_sent_date, last_email_sent_date), "
+                    "last_update_date = excluded.last_update_date, comments = excluded.comments",
+                    [(row['UserId'], week_start, week_end, row.get('Email'), row.get('Name'),
+                      json.dumps(row.get('NoSubmissionDates') or []), row.get('NoSubmissionCount') or 0,
+                      json.dumps(row.get('UnderLoggedDates') or []), row.get('lastEmailSentDate') or None,
+                      row.get('lastUpdateDate') or None, row.get('Comments') or "") for row in batch]
+                )
+                written += len(batch)
+        return written
+
+    def _to_row(self, record: tuple) -> Dict:
+        return {'UserId': record[0], 'WeekStart': record[1], 'WeekEnd': record[2], 'Email': record[3], 'Name': record[4],
+                'NoSubmissionDates': json.loads(record[5]), 'NoSubmissionCount': record[6],
+                'UnderLoggedDates': json.loads(record[7]), 'lastEmailSentDate': record[8] or "",
+                'lastUpdateDate': record[9] or "", 'Comments': record[10]}
+
+    def week_results(self, week_start: str) -> List[Dict]:
+        """Every user's tracker row for one week, ordered by user ID."""
+        records = self.connection.execute(
+            "SELECT * FROM tracker_results WHERE week_start = ? ORDER BY user_id", (week_start,)
+        ).fetchall()
+        return [self._to_row(record) for record in records]
+
+    def user_history(self, user_id: int, start_week: str = '', end_week: str = '9999-12-31') -> List[Dict]:
+        """One user's tracker rows for the weeks in [start_week, end_week], oldest first."""
+        records = self.connection.execute(
+            "SELECT * FROM tracker_results WHERE user_id = ? AND week_start BETWEEN ? AND ? ORDER BY week_start",
+            (user_id, start_week, end_week)
+        ).fetchall()
+        return [self._to_row(record) for record in records]
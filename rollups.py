@@ -0,0 +1,228 @@
+import sqlite3
+from datetime import date
+from typing import List, Dict, Iterable, Optional
+from config import get_env, get_flag, get_state_file
+
+# Default file name of the rollup store, inside the state directory
+DEFAULT_ROLLUP_FILENAME = 'rollups.db'
+
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+
+# User rows inserted per executemany batch while recording a week
+RECORD_BATCH_SIZE = 1000
+
+def rollups_enabled() -> bool:
+    """Trend rollups are enabled by ROLLUPS_ENABLED (or by naming their file in ROLLUP_DB_PATH)."""
+    return get_flag('ROLLUPS_ENABLED') or bool(get_env('ROLLUP_DB_PATH'))
+
+class RollupStore:
+    """
+    Incrementally maintained per-user, per-week and per-weekday submission aggregates.
+
+    Every run calls record_week() with the week's rows. Running totals (user_totals, weekday_totals) are
+    adjusted in place, so trend queries never rescan the history or call TimeSolv.
+    """
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+        - path: SQLite file for the rollups. Defaults to ROLLUP_DB_PATH (a file name in the state directory, or an absolute path),
+          then DEFAULT_ROLLUP_FILENAME in the state directory.
+        """
+        self.path = path or get_state_file('ROLLUP_DB_PATH', DEFAULT_ROLLUP_FILENAME)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS user_week (
+                user_id INTEGER NOT NULL,
+                week_start TEXT NOT NULL,
+                name TEXT,
+                missed_days INTEGER NOT NULL,
+                PRIMARY KEY (user_id, week_start)
+            );
+            CREATE TABLE IF NOT EXISTS weekday_week (
+                week_start TEXT NOT NULL,
+                weekday INTEGER NOT NULL,
+                missed_count INTEGER NOT NULL,
+                tracked_count INTEGER NOT NULL,
+                PRIMARY KEY (week_start, weekday)
+            );
+            CREATE TABLE IF NOT EXISTS week (
+                week_start TEXT PRIMARY KEY,
+                week_end TEXT NOT NULL,
+                tracked_users INTEGER NOT NULL,
+                users_missing INTEGER NOT NULL,
+                missed_days INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS user_totals (
+                user_id INTEGER PRIMARY KEY,
+                name TEXT,
+                weeks_tracked INTEGER NOT NULL,
+                weeks_missing INTEGER NOT NULL,
+                missed_days INTEGER NOT NULL,
+                last_week_start TEXT
+            );
+            CREATE TABLE IF NOT EXISTS weekday_totals (
+                weekday INTEGER PRIMARY KEY,
+                missed_count INTEGER NOT NULL,
+                tracked_count INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS user_totals_rate ON user_totals (weeks_missing, weeks_tracked);
+        """)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def _unapply_week(self, week_start: str):
+        """Remove a previously recorded week's contribution from the running totals."""
+        cursor = self.connection.cursor()
+        old_user_rows = cursor.execute(
+            "SELECT user_id, missed_days FROM user_week WHERE week_start = ?", (week_start,)
+        ).fetchall()
+        cursor.executemany(
+            "UPDATE user_totals SET weeks_tracked = weeks_tracked - 1, weeks_missing = weeks_missing - ?, "
+            "missed_days = missed_days - ? WHERE user_id = ?",
+            [(1 if missed > 0 else 0, missed, user_id) for user_id, missed in old_user_rows]
+        )
+
+        old_weekday_rows = cursor.execute(
+            "SELECT weekday, missed_count, tracked_count FROM weekday_week WHERE week_start = ?", (week_start,)
+        ).fetchall()
+        cursor.executemany(
+            "UPDATE weekday_totals SET missed_count = missed_count - ?, tracked_count = tracked_count - ? WHERE weekday = ?",
+            [(missed, tracked, weekday) for weekday, missed, tracked in old_weekday_rows]
+        )
+
+        cursor.execute("DELETE FROM user_week WHERE week_start = ?", (week_start,))
+        cursor.execute("DELETE FROM weekday_week WHERE week_start = ?", (week_start,))
+        cursor.execute("DELETE FROM week WHERE week_start = ?", (week_start,))
+
+    def record_week(self, week_start: str, week_end: str, work_dates: List[str], rows: Iterable[Dict]):
+        """
+        Materialize one week's results into the rollups. Recording the same week again replaces it.
+
+        Args:
+        - week_start: Monday of the week (YYYY-MM-DD).
+        - week_end: Friday of the week (YYYY-MM-DD).
+        - work_dates: Work days of the week that were tracked.
+        - rows: Tracker rows (a list or a ColumnarSpill) with 'UserId', 'Name', 'NoSubmissionDates' and 'Comments' keys.
+          Rows are consumed in a single pass, in batches of RECORD_BATCH_SIZE. Rows with comments (fetch errors) are not counted.
+        """
+        missed_by_weekday = [0] * len(WEEKDAY_NAMES)
+        tracked_weekdays = {date.fromisoformat(day).weekday() for day in work_dates}
+        tracked_users = users_missing = missed_days = 0
+
+        with self.connection:
+            self._unapply_week(week_start)
+            cursor = self.connection.cursor()
+
+            user_rows = []
+            for row in rows:
+                if row.get('Comments', "") != "":
+                    continue
+
+                for day in row['NoSubmissionDates']:
+                    weekday = date.fromisoformat(day).weekday()
+                    if weekday < len(WEEKDAY_NAMES):
+                        missed_by_weekday[weekday] += 1
+
+                missed = len(row['NoSubmissionDates'])
+                tracked_users += 1
+                users_missing += 1 if missed > 0 else 0
+                missed_days += missed
+                user_rows.append((row['UserId'], week_start, row['Name'], missed))
+                if len(user_rows) >= RECORD_BATCH_SIZE:
+                    self._insert_user_rows(cursor, week_start, user_rows)
+                    user_rows = []
+            self._insert_user_rows(cursor, week_start, user_rows)
+
+            weekday_rows = [(week_start, weekday, missed_by_weekday[weekday], tracked_users) for weekday in sorted(tracked_weekdays) if weekday < len(WEEKDAY_NAMES)]
+            cursor.executemany("INSERT INTO weekday_week (week_start, weekday, missed_count, tracked_count) VALUES (?, ?, ?, ?)", weekday_rows)
+            cursor.executemany(
+                "INSERT INTO weekday_totals (weekday, missed_count, tracked_count) VALUES (?, ?, ?) "
+                "ON CONFLICT (weekday) DO UPDATE SET missed_count = missed_count + excluded.missed_count, "
+                "tracked_count = tracked_count + excluded.tracked_count",
+                [(weekday, missed, tracked_count) for _, weekday, missed, tracked_count in weekday_rows]
+            )
+
+            cursor.execute(
+                "INSERT INTO week (week_start, week_end, tracked_users, users_missing, missed_days) VALUES (?, ?, ?, ?, ?)",
+                (week_start, week_end, tracked_users, users_missing, missed_days)
+            )
+
+    def _insert_user_rows(self, cursor: sqlite3.Cursor, week_start: str, user_rows: List[tuple]):
+        """Insert a batch of (user ID, week start, name, missed days) rows and add them to the user totals."""
+        cursor.executemany("INSERT INTO user_week (user_id, week_start, name, missed_days) VALUES (?, ?, ?, ?)", user_rows)
+        cursor.executemany(
+            "INSERT INTO user_totals (user_id, name, weeks_tracked, weeks_missing, missed_days, last_week_start) "
+            "VALUES (?, ?, 1, ?, ?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET name = excluded.name, weeks_tracked = weeks_tracked + 1, "
+            "weeks_missing = weeks_missing + excluded.weeks_missing, missed_days = missed_days + excluded.missed_days, "
+            "last_week_start = MAX(COALESCE(last_week_start, ''), excluded.last_week_start)",
+            [(user_id, name, 1 if missed > 0 else 0, missed, week_start) for user_id, _, name, missed in user_rows]
+        )
+
+    def weeks_recorded(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM week").fetchone()[0]
+
+    def chronic_late_submitters(self, min_weeks: int = 4, min_rate: float = 0.5, limit: int = 10) -> List[Dict]:
+        """
+        Users who missed at least one day in a large share of their tracked weeks.
+
+        Args:
+        - min_weeks: Minimum number of tracked weeks for a user to be considered.
+        - min_rate: Minimum share (0-1) of tracked weeks with a missed day.
+        - limit: Maximum number of users returned.
+
+        Returns:
+        - List of dictionaries with 'UserId', 'Name', 'WeeksTracked', 'WeeksMissing', 'MissedDays' and 'MissRate',
+          worst first.
+        """
+        rows = self.connection.execute(
+            "SELECT user_id, name, weeks_tracked, weeks_missing, missed_days, "
+            "CAST(weeks_missing AS REAL) / weeks_tracked AS miss_rate FROM user_totals "
+            "WHERE weeks_tracked >= ? AND CAST(weeks_missing AS REAL) / weeks_tracked >= ? "
+            "ORDER BY miss_rate DESC, missed_days DESC LIMIT ?",
+            (min_weeks, min_rate, limit)
+        ).fetchall()
+        return [{'UserId': row[0], 'Name': row[1], 'WeeksTracked': row[2], 'WeeksMissing': row[3],
+                 'MissedDays': row[4], 'MissRate': round(row[5] * 100, 2)} for row in rows]
+
+    def weekday_pattern(self) -> Dict[str, float]:
+        """
+        Share of tracked user-days missed, per weekday, over all recorded weeks.
+
+        Returns:
+        - Dictionary of weekday name to percentage of missed submissions.
+        """
+        rows = self.connection.execute("SELECT weekday, missed_count, tracked_count FROM weekday_totals ORDER BY weekday").fetchall()
+        return {WEEKDAY_NAMES[weekday]: round(missed / tracked * 100, 2) if tracked > 0 else 0
+                for weekday, missed, tracked in rows}
+
+    def week_trend(self, last_n: int = 12) -> List[Dict]:
+        """
+        Percentage of users with missing submissions for the most recent weeks, oldest first.
+
+        Returns:
+        - List of dictionaries with 'WeekStart', 'WeekEnd', 'TrackedUsers', 'UsersMissing' and 'PercentMissing'.
+        """
+        rows = self.connection.execute(
+            "SELECT week_start, week_end, tracked_users, users_missing FROM week ORDER BY week_start DESC LIMIT ?", (last_n,)
+        ).fetchall()
+        return [{'WeekStart': row[0], 'WeekEnd': row[1], 'TrackedUsers': row[2], 'UsersMissing': row[3],
+                 'PercentMissing': round(row[3] / row[2] * 100, 2) if row[2] > 0 else 0} for row in reversed(rows)]
+
+    def user_history(self, user_id: int, start_week: str = '', end_week: str = '9999-12-31') -> List[Dict]:
+        """Missed days per recorded week for one user in [start_week, end_week], oldest first."""
+        rows = self.connection.execute(
+            "SELECT week_start, missed_days FROM user_week WHERE user_id = ? AND week_start BETWEEN ? AND ? ORDER BY week_start",
+            (user_id, start_week, end_week)
+        ).fetchall()
+        return [{'WeekStart': row[0], 'MissedDays': row[1]} for row in rows]
+
+    def trends(self, last_n: int = 12) -> Dict:
+        """Trend summary for the admin email (see EmailTemplates.render_trends)."""
+        return {
+            'chronic': self.chronic_late_submitters(),
+            'weekday_pattern': self.weekday_pattern(),
+            'week_trend': self.week_trend(last_n),
+        }
@@ -0,0 +1,63 @@
+import json
+import os
+import shutil
+import tempfile
+from typing import List, Dict, Iterable, Iterator, Optional
+
+class ColumnarSpill:
+    """
+    On-disk columnar store for tracker rows: one newline-delimited JSON file per column.
+
+    Rows are appended chunk by chunk and read back lazily, so memory use does not grow with the number of rows.
+    Reading a single column (e.g. for statistics) never touches the other columns' files.
+    """
+    def __init__(self, columns: List[str], directory: Optional[str] = None):
+        """
+        Args:
+        - columns: Column names, in output order.
+        - directory: Parent directory for the spill files. Defaults to the system temp directory.
+        """
+        self.columns = list(columns)
+        self.path = tempfile.mkdtemp(prefix='tracker_spill_', dir=directory)
+        self.files = {column: open(self._column_path(column), 'w', encoding='utf8') for column in self.columns}
+        self.count = 0
+
+    def _column_path(self, column: str) -> str:
+        return os.path.join(self.path, f"{self.columns.index(column)}.jsonl")
+
+    def append_rows(self, rows: Iterable[Dict]):
+        """Append rows (missing keys are stored as None)."""
+        for row in rows:
+            for column in self.columns:
+                self.files[column].write(json.dumps(row.get(column)))
+                self.files[column].write('\n')
+            self.count += 1
+
+    def column(self, name: str) -> Iterator:
+        """Lazily iterate over one column's values."""
+        self.files[name].flush()
+        with open(self._column_path(name), encoding='utf8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Lazily iterate over the rows as dictionaries."""
+        for f in self.files.values():
+            f.flush()
+
+        readers = [open(self._column_path(column), encoding='utf8') for column in self.columns]
+        try:
+            for lines in zip(*readers):
+                yield {column: json.loads(line) for column, line in zip(self.columns, lines)}
+        finally:
+            for reader in readers:
+                reader.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        """Close and delete the spill files."""
+        for f in self.files.values():
+            f.close()
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,192 @@
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Set, Optional, Iterable
+from timesolv_api import TimeSolvAPI
+
+def get_week_start(date_str: str) -> str:
+    """Get the Monday of the week containing the given 'YYYY-MM-DD' date."""
+    day = date.fromisoformat(date_str[:10])
+    return (day - timedelta(days=day.weekday())).strftime('%Y-%m-%d')
+
+def get_work_dates(start_date: str, end_date: str) -> List[str]:
+    """
+    Get all work days (Monday to Friday) between two dates, inclusive.
+
+    Returns:
+    - List of dates as strings in 'YYYY-MM-DD' format.
+    """
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    return [(start + timedelta(days=i)).strftime('%Y-%m-%d')
+            for i in range((end - start).days + 1)
+            if (start + timedelta(days=i)).weekday() < 5]
+
+def has_hours(timecard: Dict) -> bool:
+    """True unless the timecard logs 0 hours (timecards fetched without the 'Hours' field always count)."""
+    hours = timecard.get('Hours')
+    if hours is None:
+        return True
+    try:
+        return float(hours) > 0
+    except (TypeError, ValueError):
+        return True
+
+class SubmissionIndex:
+    """
+    In-memory user -> week -> submitted days index, fed by incremental TimeSolv syncs.
+
+    Alongside it, a date -> users-with-no-submission index is kept for the synced dates only,
+    so "who is missing" queries cost the size of the answer rather than the size of the firm.
+    """
+    def __init__(self):
+        self.users: Dict[int, Dict] = {}                    # user ID -> {'Email', 'Name'}
+        self.submissions: Dict[int, Dict[str, Set[str]]] = {}   # user ID -> week start -> submitted dates
+        self.synced_dates: Dict[int, Set[str]] = {}         # user ID -> work dates already synced
+        self.missing_by_date: Dict[str, Set[int]] = {}      # work date -> synced users with no timecard on it
+        self.errors: Dict[int, str] = {}                    # user ID -> last sync error message
+        self.last_sync: Optional[datetime] = None
+
+    def add_user(self, user_id: int, email: str, name: str):
+        """Register (or update) a tracked user."""
+        self.users[user_id] = {'Email': email, 'Name': name}
+        self.submissions.setdefault(user_id, {})
+        self.synced_dates.setdefault(user_id, set())
+
+    def add_firm_users(self, firm_users: Iterable[Dict]):
+        """Register users from TimeSolvAPI.get_all_firm_users payloads."""
+        for user in firm_users:
+            self.add_user(user['Id'], user['Email'], f"{user['FirstName'].strip()} {user['LastName'].strip()}")
+
+    def remove_user(self, user_id: int):
+        """Stop tracking a user."""
+        for synced_date in self.synced_dates.pop(user_id, ()):
+            self.missing_by_date.get(synced_date, set()).discard(user_id)
+        self.users.pop(user_id, None)
+        self.submissions.pop(user_id, None)
+        self.errors.pop(user_id, None)
+
+    def add_timecards(self, user_id: int, timecards: List[Dict]):
+        """
+        Mark the dates of the given timecards as submitted for the user.
+
+        Timecards logging 0 hours are not a submission, matching the compliance engine (a 0h day is missing).
+        """
+        weeks = self.submissions.setdefault(user_id, {})
+        for tc in timecards:
+            tc_date = tc.get('Date')
+            if not tc_date or not has_hours(tc):
+                continue
+            tc_date = tc_date[:10]
+            weeks.setdefault(get_week_start(tc_date), set()).add(tc_date)
+            self.missing_by_date.get(tc_date, set()).discard(user_id)
+
+    def replace_timecards(self, user_id: int, start_date: str, end_date: str, timecards: List[Dict]):
+        """
+        Replace the user's submitted dates in [start_date, end_date] with the given timecards
+        (the full result of a search over that range), and mark the range's work dates as synced.
+        """
+        work_dates = get_work_dates(start_date, end_date)
+        weeks = self.submissions.setdefault(user_id, {})
+        for week_start in {get_week_start(d) for d in work_dates}:
+            kept = {d for d in weeks.get(week_start, set()) if not (start_date <= d <= end_date)}
+            if kept:
+                weeks[week_start] = kept
+            else:
+                weeks.pop(week_start, None)
+
+        self.add_timecards(user_id, timecards)
+
+        self.synced_dates.setdefault(user_id, set()).update(work_dates)
+        for work_date in work_dates:
+            if work_date in weeks.get(get_week_start(work_date), ()):
+                self.missing_by_date.get(work_date, set()).discard(user_id)
+            else:
+                self.missing_by_date.setdefault(work_date, set()).add(user_id)
+
+    def sync(self, timesolv_api: TimeSolvAPI, start_date: str, end_date: str,
+             user_ids: Optional[Iterable[int]] = None, force: bool = False) -> Dict[int, str]:
+        """
+        Incrementally sync timecards for a date range from TimeSolv.
+
+        Only the part of the range a user has not been synced for yet is fetched (from their first to
+        their last unsynced work date), unless force is set, so repeated calls only fetch what is new.
+        Users with the same unsynced subrange share one paginated search.
+
+        Args:
+        - timesolv_api: Authenticated TimeSolvAPI instance.
+        - start_date: Start date of the range (YYYY-MM-DD).
+        - end_date: End date of the range (YYYY-MM-DD).
+        - user_ids: Users to sync. Defaults to all registered users.
+        - force: Refetch even if the dates were already synced (e.g. the current week).
+
+        Returns:
+        - Dictionary of user ID to error message for users whose sync failed.
+        """
+        work_dates = get_work_dates(start_date, end_date)
+        failed = {}
+
+        # Users needing the same subrange are fetched together with one paginated search
+        ranges: Dict[tuple, List[int]] = {}
+        for user_id in list(user_ids if user_ids is not None else self.users):
+            synced = self.synced_dates.setdefault(user_id, set())
+            unsynced = work_dates if force else [d for d in work_dates if d not in synced]
+            if unsynced:
+                ranges.setdefault((unsynced[0], unsynced[-1]), []).append(user_id)
+
+        for (fetch_start, fetch_end), range_user_ids in ranges.items():
+            timecards_by_user = timesolv_api.search_timecards_by_user(fetch_start, fetch_end, range_user_ids)
+            if isinstance(timecards_by_user, str):
+                # Fall back to one search per user, so only the users whose fetch fails are reported
+                timecards_by_user = {user_id: timesolv_api.search_timecards(start_date=fetch_start, end_date=fetch_end, firm_user_id=user_id)
+                                     for user_id in range_user_ids}
+
+            for user_id, timecards in timecards_by_user.items():
+                if isinstance(timecards, str):
+                    self.errors[user_id] = timecards
+                    failed[user_id] = timecards
+                    continue
+
+                self.replace_timecards(user_id, fetch_start, fetch_end, timecards)
+                self.errors.pop(user_id, None)
+
+        self.last_sync = datetime.now()
+        return failed
+
+    def submitted_dates(self, user_id: int, start_date: str, end_date: str) -> Set[str]:
+        """Get the dates in the range on which the user has any timecard."""
+        weeks = self.submissions.get(user_id, {})
+        submitted = set()
+        for week_start in {get_week_start(d) for d in get_work_dates(start_date, end_date)}:
+            submitted.update(d for d in weeks.get(week_start, ()) if start_date <= d <= end_date)
+        return submitted
+
+    def missing_dates(self, user_id: int, work_dates: List[str]) -> List[str]:
+        """Get the work dates (in order) on which the user has no timecard."""
+        weeks = self.submissions.get(user_id, {})
+        return [d for d in work_dates if d not in weeks.get(get_week_start(d), ())]
+
+    def is_synced(self, user_id: int, start_date: str, end_date: str) -> bool:
+        """True if every work date in the range has been synced for the user."""
+        synced = self.synced_dates.get(user_id, set())
+        return all(d in synced for d in get_work_dates(start_date, end_date))
+
+    def who_is_missing(self, start_date: str, end_date: str) -> Dict[int, List[str]]:
+        """
+        Answer "who is missing what" for a date range from the in-memory index.
+
+        Args:
+        - start_date: Start date of the range (YYYY-MM-DD).
+        - end_date: End date of the range (YYYY-MM-DD).
+
+        Returns:
+        - Dictionary of user ID to list of missing work dates, only for users missing at least one day.
+          Only users synced for the whole range are reported; users whose last sync failed are left
+          out (see self.errors).
+        """
+        work_dates = get_work_dates(start_date, end_date)
+        missing: Dict[int, List[str]] = {}
+        for work_date in work_dates:
+            for user_id in self.missing_by_date.get(work_date, ()):
+                missing.setdefault(user_id, []).append(work_date)
+
+        synced = set(work_dates)
+        return {user_id: dates for user_id, dates in missing.items()
+                if user_id not in self.errors and synced <= self.synced_dates.get(user_id, set())}
@@ -0,0 +1,98 @@
+import sys
+from typing import List, Dict, Optional
+
+from submission_index import SubmissionIndex
+
+WEEK_1 = ['2026-10-05', '2026-10-06', '2026-10-07', '2026-10-08', '2026-10-09']
+WEEK_2 = ['2026-10-12', '2026-10-13', '2026-10-14', '2026-10-15', '2026-10-16']
+
+class FakeAPI:
+    """In-memory TimeSolv timecard searches, recording the (start, end, user IDs) of every call."""
+    def __init__(self, timecards: List[Dict]):
+        self.timecards = timecards
+        self.calls = []
+        self.fail_by_user = False
+        self.failing_user_ids = set()
+
+    def search_timecards_by_user(self, start_date: str, end_date: str, firm_user_ids: List[int], fields=None) -> Dict[int, List[Dict]] | str:
+        self.calls.append((start_date, end_date, sorted(firm_user_ids)))
+        if self.fail_by_user:
+            return "Error: HTTP 500"
+        return {user_id: self._select(start_date, end_date, user_id) for user_id in firm_user_ids}
+
+    def search_timecards(self, start_date: str, end_date: str, firm_user_id: Optional[int] = None, fields=None) -> List[Dict] | str:
+        self.calls.append((start_date, end_date, [firm_user_id]))
+        if firm_user_id in self.failing_user_ids:
+            return "Error: HTTP 500"
+        return self._select(start_date, end_date, firm_user_id)
+
+    def _select(self, start_date: str, end_date: str, user_id: int) -> List[Dict]:
+        return [tc for tc in self.timecards if tc['FirmUserId'] == user_id and start_date <= tc['Date'][:10] <= end_date]
+
+def timecard(user_id: int, day: str, hours: float = 8) -> Dict:
+    return {'FirmUserId': user_id, 'Date': f"{day}T00:00:00", 'Hours': hours}
+
+def check(failures: List[str], condition: bool, description: str):
+    print(f"{'ok  ' if condition else 'FAIL'} {description}")
+    if not condition:
+        failures.append(description)
+
+def make_index(api: FakeAPI) -> SubmissionIndex:
+    index = SubmissionIndex()
+    index.add_firm_users({'Id': user_id, 'Email': f"user{user_id}@example.com", 'FirstName': f"First{user_id}", 'LastName': "Last"}
+                         for user_id in (1, 2, 3))
+    return index
+
+def check_sync(failures: List[str]):
+    # User 1 logs every day, user 2 logs 0h on Wednesday, user 3 logs nothing
+    api = FakeAPI([timecard(1, day) for day in WEEK_1 + WEEK_2] +
+                  [timecard(2, day, 0 if day == WEEK_1[2] else 8) for day in WEEK_1])
+    index = make_index(api)
+
+    check(failures, index.sync(api, WEEK_1[0], WEEK_1[-1]) == {}, "the first sync succeeds")
+    check(failures, len(api.calls) == 1, "users with the same unsynced range share one search")
+    check(failures, index.who_is_missing(WEEK_1[0], WEEK_1[-1]) == {2: [WEEK_1[2]], 3: WEEK_1}, "a 0h day is missing, like a day without timecards")
+
+    index.sync(api, WEEK_1[0], WEEK_1[-1])
+    check(failures, len(api.calls) == 1, "a synced range is not fetched again")
+
+    index.sync(api, WEEK_1[0], WEEK_2[-1])
+    check(failures, api.calls[-1] == (WEEK_2[0], WEEK_2[-1], [1, 2, 3]), "extending the range fetches only the new dates")
+    check(failures, index.who_is_missing(WEEK_2[0], WEEK_2[-1]) == {2: WEEK_2, 3: WEEK_2}, "the new week is indexed")
+
+    # User 1's Tuesday timecard is removed and user 2's 0h Wednesday is corrected
+    api.timecards = [tc for tc in api.timecards if not (tc['FirmUserId'] == 1 and tc['Date'].startswith(WEEK_1[1]))]
+    api.timecards.append(timecard(2, WEEK_1[2]))
+    index.sync(api, WEEK_1[0], WEEK_1[-1], force=True)
+    check(failures, index.who_is_missing(WEEK_1[0], WEEK_1[-1]) == {1: [WEEK_1[1]], 3: WEEK_1}, "a forced resync drops removed timecards and picks up edits")
+
+    index.remove_user(3)
+    check(failures, 3 not in index.who_is_missing(WEEK_1[0], WEEK_2[-1]), "a removed user is no longer reported")
+
+def check_fallback(failures: List[str]):
+    api = FakeAPI([timecard(1, day) for day in WEEK_2])
+    api.fail_by_user = True
+    api.failing_user_ids = {2}
+    index = make_index(api)
+
+    failed = index.sync(api, WEEK_2[0], WEEK_2[-1])
+    check(failures, list(failed) == [2], "a failed chunk search falls back to per-user searches, reporting only the failing user")
+    check(failures, index.who_is_missing(WEEK_2[0], WEEK_2[-1]) == {3: WEEK_2}, "a user whose sync failed is left out of who_is_missing")
+
+    api.fail_by_user = False
+    api.failing_user_ids = set()
+    index.sync(api, WEEK_2[0], WEEK_2[-1])
+    check(failures, api.calls[-1] == (WEEK_2[0], WEEK_2[-1], [2]) and not index.errors, "the next sync retries only the failed user")
+
+def main():
+    failures = []
+    check_sync(failures)
+    check_fallback(failures)
+
+    if failures:
+        print(f"Submission index checks FAILED ({len(failures)})")
+        sys.exit(1)
+    print("Submission index checks passed")
+
+if __name__ == "__main__":
+    main()
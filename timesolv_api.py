@@ -1,25 +1,33 @@
-import requests
-import os
-import sys
+import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Set, Optional
-import json
-from urllib.parse import urlencode
-from dotenv import load_dotenv
+from typing import List, Dict, Set, Optional, Iterable, Iterator, Tuple
+from config import get_env
 
-load_dotenv()
-CLIENT_ID = os.getenv('TIMESOLV_CLIENT_ID')
-CLIENT_SECRET = os.getenv('TIMESOLV_CLIENT_SECRET')
-AUTH_CODE = os.getenv('TIMESOLV_AUTH_CODE')
-REDIRECT_URI = os.getenv('REDIRECT_URI')
+# NOTE: requests is imported inside the methods that need it so importing this module stays cheap
+
+# TimeSolv REST root; TIMESOLV_BASE_URL overrides it (e.g. to point at timesolv_emulator.py)
+DEFAULT_BASE_URL = 'https://apps.timesolv.com/Services/rest'
+
+# Page size of the first request of a search, and the largest the adaptive tuner may grow it to while pages
+# come back fast; TIMESOLV_MAX_PAGE_SIZE overrides the maximum (e.g. lower it if TimeSolv rejects large pages)
+INITIAL_PAGE_SIZE = 100
+DEFAULT_MAX_PAGE_SIZE = 500
+
+# Timecard fields the tracker actually uses (submission dates and hours-based compliance). TimeSolv has no field
+# projection, so records are trimmed after download: this bounds memory and the response cache, not transfer size
+TIMECARD_FIELDS = ['FirmUserId', 'Date', 'Hours']
+
+# Last-modified timestamp (UTC, YYYY-MM-DDTHH:MM:SS) of firm users and timecards
+UPDATED_FIELD = 'LastUpdatedDate'
 
 class TimeSolveAuth:
     """Handles OAuth2 authentication for TimeSolv API."""
-    def __init__(self):
-        self.client_id = CLIENT_ID
-        self.client_secret = CLIENT_SECRET
-        self.auth_code = AUTH_CODE
-        self.redirect_uri = REDIRECT_URI
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url or get_env('TIMESOLV_BASE_URL') or DEFAULT_BASE_URL
+        self.client_id = get_env('TIMESOLV_CLIENT_ID')
+        self.client_secret = get_env('TIMESOLV_CLIENT_SECRET')
+        self.auth_code = get_env('TIMESOLV_AUTH_CODE')
+        self.redirect_uri = get_env('REDIRECT_URI')
 
     def get_access_token(self) -> tuple[bool, str]:
         """
@@ -37,7 +45,8 @@ class TimeSolveAuth:
             "redirect_uri": self.redirect_uri
         }
 
-        response = requests.post('https://apps.timesolv.com/Services/rest/oAuth2V1/Token', data=access_data)
+        import requests
+        response = requests.post(f'{self.base_url}/oAuth2V1/Token', data=access_data)
         token_data = response.json()
 
         if token_data.get("error"):
@@ -47,136 +56,346 @@ class TimeSolveAuth:
         access_token = token_data["access_token"]
         return True, access_token
 
+class CriteriaBuilder:
+    """Builds the Criteria list of a TimeSolv search payload, so filters run server-side."""
+    def __init__(self):
+        self.criteria = []
+
+    def where(self, field_name: str, operator: str, value) -> 'CriteriaBuilder':
+        """Add a raw criterion, e.g. where("UserStatus", "=", "Active")."""
+        self.criteria.append({"FieldName": field_name, "Operator": operator, "Value": value})
+        return self
+
+    def equals(self, field_name: str, value) -> 'CriteriaBuilder':
+        return self.where(field_name, "=", value)
+
+    def exclude(self, field_name: str, values: Iterable) -> 'CriteriaBuilder':
+        """Exclude every given value of a field (one "<>" criterion per value)."""
+        for value in values:
+            self.where(field_name, "<>", value)
+        return self
+
+    def date_between(self, field_name: str, start_date: str, end_date: str) -> 'CriteriaBuilder':
+        """Bound a date field to [start_date, end_date] (YYYY-MM-DD)."""
+        return self.where(field_name, ">=", start_date).where(field_name, "<=", end_date)
+
+    def build(self) -> List[Dict]:
+        return list(self.criteria)
+
+class PageSizeTuner:
+    """
+    Adapts the search page size to observed latency: grows while pages come back fast, shrinks when they are slow.
+
+    Page sizes only change at offsets divisible by the new size, so PageNumber stays consistent mid-pagination.
+    """
+    def __init__(self, initial: int = INITIAL_PAGE_SIZE, minimum: int = 25, maximum: int = DEFAULT_MAX_PAGE_SIZE, target_seconds: float = 2.0):
+        self.size = min(initial, maximum)
+        self.minimum = min(minimum, maximum)
+        self.maximum = maximum
+        self.target_seconds = target_seconds
+
+    def observe(self, elapsed: float, offset: int):
+        """
+        Record how long the last page took and pick the size for the page starting at `offset`.
+
+        Args:
+        - elapsed: Seconds the last page request took.
+        - offset: Number of records already fetched in the current search.
+        """
+        if elapsed > self.target_seconds and self.size > self.minimum:
+            new_size = max(self.minimum, self.size // 2)
+        elif elapsed < self.target_seconds / 4 and self.size < self.maximum:
+            new_size = min(self.maximum, self.size * 2)
+        else:
+            return
+
+        if offset % new_size == 0:
+            self.size = new_size
+
 class TimeSolvAPI:
     """API for retrieving necessary TimeSolv timesheet data."""
-    def __init__(self, access_token: str):
+    def __init__(self, access_token: str, base_url: Optional[str] = None, cache=None, max_page_size: Optional[int] = None):
+        """
+        Args:
+        - access_token: TimeSolv bearer token.
+        - base_url: REST root. Defaults to TIMESOLV_BASE_URL, then DEFAULT_BASE_URL.
+        - cache: Optional ResponseCache for search responses. Defaults to one at TIMESOLV_CACHE_PATH, if set.
+        - max_page_size: Largest page size requested. Defaults to TIMESOLV_MAX_PAGE_SIZE, then DEFAULT_MAX_PAGE_SIZE.
+        """
+        self.base_url = base_url or get_env('TIMESOLV_BASE_URL') or DEFAULT_BASE_URL
         self.headers = {
             "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json"
         }
 
-    def get_all_firm_users(self) -> List[Dict] | str:
+        self.cache = cache
+        if self.cache is None and get_env('TIMESOLV_CACHE_PATH'):
+            from response_cache import ResponseCache
+            self.cache = ResponseCache(get_env('TIMESOLV_CACHE_PATH'))
+
+        # Page sizes are learned per endpoint and kept across calls (e.g. across the per-user timecard loop)
+        max_page_size = max_page_size or int(get_env('TIMESOLV_MAX_PAGE_SIZE') or DEFAULT_MAX_PAGE_SIZE)
+        self.firm_user_pages = PageSizeTuner(maximum=max_page_size)
+        self.timecard_pages = PageSizeTuner(maximum=max_page_size)
+
+    def close(self):
+        """Flush the response cache, if any."""
+        if self.cache is not None:
+            self.cache.close()
+
+    def _post_search(self, url: str, payload: Dict, result_key: Optional[str] = None,
+                     fields: Optional[List[str]] = None) -> Tuple[Dict | str, float]:
         """
-        Fetch all users associated with the firm.
-        
+        Post one search page, through the response cache when there is one.
+
+        Args:
+        - url: Search endpoint.
+        - payload: Search payload (one page).
+        - result_key: Key of the result list in the response, e.g. "FirmUsers".
+        - fields: If given, only these keys of each record are kept (before the page is cached).
+
+        A fresh cached page (within the cache's TTL: minutes for the current week) is returned without a request.
+        An expired one is revalidated with a conditional request (HTTP 304 reuses it) if the server sent an
+        ETag/Last-Modified, else refetched. Cached pages report the latency of the original request, so the
+        page size tuner makes the same choices (and cache keys) on reruns.
+
         Returns:
-        - A list of dictionaries containing user details.
-        - Error code as string if the request fails.
+        - Tuple of (response JSON, or error code as string, request latency in seconds).
         """
+        import requests
+
+        headers = self.headers
+        cache_key = entry = None
+        if self.cache is not None:
+            cache_key = self.cache.key(url, payload, fields)
+            entry = self.cache.get(cache_key)
+            if entry is not None and entry['fresh']:
+                self.cache.counters['hits'] += 1
+                self.cache.touch(cache_key)
+                return entry['body'], entry['elapsed']
+
+            if entry is not None and (entry['etag'] or entry['last_modified']):
+                headers = dict(self.headers)
+                if entry['etag']:
+                    headers['If-None-Match'] = entry['etag']
+                if entry['last_modified']:
+                    headers['If-Modified-Since'] = entry['last_modified']
+
+        # Make the request
+        started = time.perf_counter()
+        response = requests.post(url, headers=headers, json=payload)
+        elapsed = time.perf_counter() - started
+
+        # Search periods that ended before the current week get the cache's long TTL; current-week pages get its short TTL,
+        # and so do searches for recent edits (UPDATED_FIELD), whatever their period
+        ttl = None
+        if self.cache is not None:
+            end_dates = [c['Value'] for c in payload['Criteria'] if c['FieldName'] == 'Date' and c['Operator'] == '<=']
+            if any(c['FieldName'] == UPDATED_FIELD for c in payload['Criteria']):
+                end_dates = []
+            ttl = self.cache.ttl_for_period(min(end_dates) if end_dates else None)
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.counters['revalidated'] += 1
+            self.cache.touch(cache_key, ttl)
+            return entry['body'], entry['elapsed']
+        if self.cache is not None:
+            self.cache.counters['misses'] += 1
+
+        # Check HTTP errors
+        if response.status_code != 200:
+            return f"Error: HTTP {response.status_code} - {response.text}", elapsed
+
+        response_data = response.json()
 
-        url = 'https://apps.timesolv.com/Services/rest/oauth2v1/firmUserSearch'
+        # Check API response status
+        if response_data.get("Status", {}).get("ResponseCode") != 200:
+            error_message = response_data.get("Status", {}).get("Message", "Unknown error")
+            return f"Error: {response_data['Status']['ResponseCode']} - {error_message}", elapsed
 
-        firm_list = []
-        page_size = 100
-        page_number = 1
+        # Drop unused fields right away so large searches don't hold (or cache) full records
+        if fields is not None and result_key is not None:
+            response_data[result_key] = [{field: record.get(field) for field in fields} for record in response_data.get(result_key, [])]
 
-        # Loop to go thru pages
+        if self.cache is not None:
+            self.cache.put(cache_key, url, response_data, ttl, elapsed, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return response_data, elapsed
+
+    def _search_pages(self, url: str, criteria: List[Dict], order_by: str, ascending: int, result_key: str,
+                      tuner: PageSizeTuner, fields: Optional[List[str]] = None) -> Iterator[List[Dict] | str]:
+        """
+        Run a paginated TimeSolv search, yielding one page of records at a time.
+
+        Args:
+        - url: Search endpoint.
+        - criteria: Criteria list (see CriteriaBuilder).
+        - order_by: Field to order by.
+        - ascending: 1 for ascending, 0 for descending.
+        - result_key: Key of the result list in the response, e.g. "FirmUsers".
+        - tuner: Page size tuner for the endpoint.
+        - fields: If given, only these keys of each record are kept (trimmed client-side after download).
+
+        Yields:
+        - Lists of dictionaries containing the records, one per page.
+        - Error code as string if a request fails (the search stops there).
+        """
+        fetched = 0
         while True:
-            # Payload to fetch active users
+            page_size = tuner.size
             payload = {
-                "OrderBy": "Id",
-                "SortOrderAscending": 0,
+                "OrderBy": order_by,
+                "SortOrderAscending": ascending,
                 "PageSize": page_size,
-                "PageNumber": page_number,
-                "Criteria": [
-                    {
-                        "FieldName": "UserStatus",
-                        "Operator": "=",
-                        "Value": "Active"
-                    }
-                ]
+                "PageNumber": fetched // page_size + 1,
+                "Criteria": criteria
             }
 
-            # Make the request
-            response = requests.post(url, headers=self.headers, json=payload)
+            response_data, elapsed = self._post_search(url, payload, result_key, fields)
+            if isinstance(response_data, str):
+                yield response_data
+                return
+
+            records = response_data.get(result_key, [])
+            if not records:
+                return
+
+            fetched += len(records)
+            yield records
+
+            if len(records) < page_size:
+                return
+
+            tuner.observe(elapsed, fetched)
 
-            # Check HTTP errors
-            if response.status_code != 200:
-                return f"Error: HTTP {response.status_code} - {response.text}"
-            
-            response_data = response.json()
+    def _search(self, url: str, criteria: List[Dict], order_by: str, ascending: int, result_key: str,
+                tuner: PageSizeTuner, fields: Optional[List[str]] = None) -> List[Dict] | str:
+        """
+        Run a paginated TimeSolv search and collect every page (see _search_pages for the arguments).
+
+        Returns:
+        - A list of dictionaries containing the records.
+        - Error code as string if the request fails.
+        """
+        results = []
+        for page in self._search_pages(url, criteria, order_by, ascending, result_key, tuner, fields):
+            if isinstance(page, str):
+                return page
+            results.extend(page)
 
-            # Check API response status
-            if response_data.get("Status", {}).get("ResponseCode") != 200:
-                error_message = response_data.get("Status", {}).get("Message", "Unknown error")
-                return f"Error: {response_data['Status']['ResponseCode']} - {error_message}"
+        return results
 
-            # Extract user information
-            users = response_data.get("FirmUsers", [])
-            if not users:
-                break
+    def _firm_user_criteria(self, exclude_user_ids: Optional[Iterable[int]], employment_status: Optional[str],
+                            exclude_employment_statuses: Optional[Iterable[str]], include_inactive: bool = False) -> List[Dict]:
+        criteria = CriteriaBuilder()
+        if not include_inactive:
+            criteria.equals("UserStatus", "Active")
+        criteria.exclude("Id", exclude_user_ids or [])
+        criteria.exclude("EmploymentStatus", exclude_employment_statuses or [])
+        if employment_status:
+            criteria.equals("EmploymentStatus", employment_status)
+        return criteria.build()
 
-            # Append users to firm list
-            firm_list.extend(users)
+    def get_all_firm_users(self, exclude_user_ids: Optional[Iterable[int]] = None,
+                           employment_status: Optional[str] = None,
+                           exclude_employment_statuses: Optional[Iterable[str]] = None,
+                           fields: Optional[List[str]] = None, include_inactive: bool = False) -> List[Dict] | str:
+        """
+        Fetch all active users associated with the firm.
 
-            if len(users) < page_size:
-                break
-            
-            page_number += 1
-            
-        return firm_list
+        Args:
+        - exclude_user_ids: User IDs filtered out server-side.
+        - employment_status: Only fetch users with this EmploymentStatus (e.g. "Employee").
+        - exclude_employment_statuses: EmploymentStatus values filtered out server-side.
+        - fields: If given, only these keys of each user are kept.
+        - include_inactive: Also fetch inactive (e.g. departed) users, for past weeks.
 
-    def search_timecards(self, start_date: str, end_date: str, firm_user_id: int) -> List[Dict] | str:
+        Returns:
+        - A list of dictionaries containing user details.
+        - Error code as string if the request fails.
+        """
+        return self._search(
+            f'{self.base_url}/oauth2v1/firmUserSearch',
+            self._firm_user_criteria(exclude_user_ids, employment_status, exclude_employment_statuses, include_inactive),
+            order_by="Id", ascending=0, result_key="FirmUsers", tuner=self.firm_user_pages, fields=fields
+        )
+
+    def iter_firm_user_pages(self, exclude_user_ids: Optional[Iterable[int]] = None,
+                             employment_status: Optional[str] = None,
+                             exclude_employment_statuses: Optional[Iterable[str]] = None,
+                             fields: Optional[List[str]] = None) -> Iterator[List[Dict] | str]:
+        """
+        Like get_all_firm_users, but yields the users one page at a time so the full list is never held in memory.
+
+        Yields:
+        - Lists of dictionaries containing user details, one per page.
+        - Error code as string if a request fails (the search stops there).
+        """
+        return self._search_pages(
+            f'{self.base_url}/oauth2v1/firmUserSearch',
+            self._firm_user_criteria(exclude_user_ids, employment_status, exclude_employment_statuses),
+            order_by="Id", ascending=0, result_key="FirmUsers", tuner=self.firm_user_pages, fields=fields
+        )
+
+    def search_timecards(self, start_date: str, end_date: str, firm_user_id: Optional[int] = None,
+                         fields: Optional[List[str]] = None, updated_since: Optional[str] = None) -> List[Dict] | str:
         """Search for timecards within the specified date range.
 
         Args:
         - start_date (str): The start date for the search (YYYY-MM-DD).
         - end_date (str): The end date for the search (YYYY-MM-DD).
-        - firm_user_id (int): The ID of the firm user whose timecards are to be searched.
+        - firm_user_id (int): The ID of the firm user whose timecards are to be searched. All users if None.
+        - fields (list): If given, only these keys of each timecard are kept (e.g. TIMECARD_FIELDS).
+        - updated_since (str): If given, only timecards added or edited since this UTC time (YYYY-MM-DDTHH:MM:SS).
 
         Returns:
         - A list of dictionaries containing timecard details.
         """
+        criteria = CriteriaBuilder()
+        if firm_user_id is not None:
+            criteria.equals("FirmUserId", firm_user_id)
+        criteria.date_between("Date", start_date, end_date)
+        if updated_since is not None:
+            criteria.where(UPDATED_FIELD, ">=", updated_since)
 
-        url = 'https://apps.timesolv.com/Services/rest/oauth2v1/timecardSearch'
-        page_size = 100
-        page_number = 1
-        timecard_list = []
+        return self._search(
+            f'{self.base_url}/oauth2v1/timecardSearch',
+            criteria.build(), order_by="Date", ascending=1, result_key="TimeCards",
+            tuner=self.timecard_pages, fields=fields
+        )
 
-        while True:
-            payload = {
-                "Criteria": [
-                    {
-                        "FieldName": "FirmUserId",
-                        "Operator": "=",
-                        "Value": firm_user_id
-                    },
-                    {
-                        "FieldName": "Date",
-                        "Operator": ">=",
-                        "Value": start_date
-                    },
-                    {
-                        "FieldName": "Date",
-                        "Operator": "<=",
-                        "Value": end_date
-                    }
-                ],
-                "OrderBy": "Date",
-                "SortOrderAscending": 1,
-                "PageSize": page_size,
-                "PageNumber": page_number
-            }
-
-            response = requests.post(url, headers=self.headers, json=payload)
-
-            if response.status_code != 200:
-                return f"Error: HTTP {response.status_code} - {response.text}"
+    def search_timecards_by_user(self, start_date: str, end_date: str, firm_user_ids: Iterable[int],
+                                 fields: Optional[List[str]] = None) -> Dict[int, List[Dict]] | str:
+        """
+        Fetch several users' timecards with one paginated search instead of one search per user.
 
-            response_data = response.json()
-            
-            if response_data.get("Status", {}).get("ResponseCode") != 200:
-                error_message = response_data.get("Status", {}).get("Message", "Unknown error")
-                return f"Error: {response_data['Status']['ResponseCode']} - {error_message}"
+        The search is bounded to the users' FirmUserId range; timecards of other users in that range
+        (e.g. excluded users) are dropped.
 
-            timecards = response_data.get("TimeCards", [])
-            if not timecards:
-                break
+        Args:
+        - start_date (str): The start date for the search (YYYY-MM-DD).
+        - end_date (str): The end date for the search (YYYY-MM-DD).
+        - firm_user_ids: IDs of the users.
+        - fields (list): If given, only these keys of each timecard are kept ('FirmUserId' always is).
 
-            timecard_list.extend(timecards)
-            if len(timecards) < page_size:
-                break
+        Returns:
+        - Dictionary of user ID to the user's timecards (an empty list for users without any).
+        - Error code as string if the request fails.
+        """
+        timecards_by_user = {user_id: [] for user_id in firm_user_ids}
+        if not timecards_by_user:
+            return timecards_by_user
 
-            page_number += 1
+        criteria = CriteriaBuilder().where("FirmUserId", ">=", min(timecards_by_user)).where("FirmUserId", "<=", max(timecards_by_user))
+        criteria.date_between("Date", start_date, end_date)
+        if fields is not None and 'FirmUserId' not in fields:
+            fields = ['FirmUserId', *fields]
 
-        return timecard_list
\ No newline at end of file
+        # Ordered by Id, so pagination is stable while the page size changes
+        for page in self._search_pages(f'{self.base_url}/oauth2v1/timecardSearch', criteria.build(), order_by="Id", ascending=1,
+                                       result_key="TimeCards", tuner=self.timecard_pages, fields=fields):
+            if isinstance(page, str):
+                return page
+            for timecard in page:
+                if timecard.get('FirmUserId') in timecards_by_user:
+                    timecards_by_user[timecard['FirmUserId']].append(timecard)
+        return timecards_by_user
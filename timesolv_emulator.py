@@ -0,0 +1,381 @@
+import argparse
+import hashlib
+import json
+import random
+import secrets
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+# Local stand-in for the TimeSolv REST API (oAuth2V1/Token, firmUserSearch, timecardSearch), for load testing.
+# Point the tracker at it with TIMESOLV_BASE_URL=http://127.0.0.1:<port> (see TimeSolvEmulator.base_url).
+
+FIRST_NAMES = ['Blythe', 'Rafaella', 'Mateo', 'Priya', 'Jonah', 'Amara', 'Felix', 'Ines', 'Kenji', 'Lucia', 'Omar', 'Sofia']
+LAST_NAMES = ['Kirkland', 'Tarasova', 'Okafor', 'Lindqvist', 'Moreau', 'Castillo', 'Nakamura', 'Brennan', 'Haddad', 'Volkova']
+EMAIL_DOMAIN = 'example.cpa'
+
+# Synthetic firm shape (see firm_users.csv): most users are active employees
+INACTIVE_SHARE = 0.05
+CONTRACTOR_SHARE = 0.1
+
+# Synthetic timesheet habits: share of work days with a timecard, and share of those logged below a full day
+SUBMISSION_RATE = 0.85
+PARTIAL_DAY_RATE = 0.1
+
+# Operators supported in search Criteria
+OPERATORS = {
+    '=': lambda field, value: field == value,
+    '<>': lambda field, value: field != value,
+    '>': lambda field, value: field > value,
+    '>=': lambda field, value: field >= value,
+    '<': lambda field, value: field < value,
+    '<=': lambda field, value: field <= value,
+}
+
+def matches_criteria(record: Dict, criteria: List[Dict]) -> bool:
+    """Whether a record satisfies every criterion (a record without the field never matches)."""
+    for criterion in criteria:
+        field = record.get(criterion['FieldName'])
+        if field is None or not OPERATORS[criterion['Operator']](field, criterion['Value']):
+            return False
+    return True
+
+def generate_firm_users(count: int, seed: int = 0, first_id: int = 90000) -> List[Dict]:
+    """
+    Generate synthetic firm users with the same fields as firm_users.csv / firmUserSearch.
+
+    Args:
+    - count: Number of users.
+    - seed: Random seed (the same seed always yields the same firm).
+    - first_id: Id of the first user.
+
+    Returns:
+    - List of firm user dictionaries.
+    """
+    rng = random.Random(seed)
+    users = []
+    for user_id in range(first_id, first_id + count):
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        users.append({
+            'Id': user_id,
+            'Email': f"{first_name[0].lower()}{last_name[0].lower()}{user_id}@{EMAIL_DOMAIN}",
+            'FirstName': first_name,
+            'LastName': last_name,
+            'UserStatus': 'Inactive' if rng.random() < INACTIVE_SHARE else 'Active',
+            'EmploymentStatus': 'Contractor' if rng.random() < CONTRACTOR_SHARE else 'Employee',
+            'LastUpdatedDate': (datetime(2025, 1, 1) + timedelta(minutes=rng.randrange(500_000))).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        })
+    return users
+
+def generate_timecards(users: List[Dict], start_date: str, end_date: str, seed: int = 0) -> List[Dict]:
+    """
+    Generate synthetic timecards for every work day in [start_date, end_date].
+
+    Args:
+    - users: Firm users (see generate_firm_users).
+    - start_date: First date (YYYY-MM-DD).
+    - end_date: Last date (YYYY-MM-DD).
+    - seed: Random seed.
+
+    Returns:
+    - List of timecard dictionaries shaped like timecardSearch results.
+    """
+    rng = random.Random(seed)
+    first, last = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    work_dates = [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)
+                  if (first + timedelta(days=i)).weekday() < 5]
+
+    timecards = []
+    for user in users:
+        for day in work_dates:
+            if rng.random() >= SUBMISSION_RATE:
+                continue
+            timecards.append({
+                'Id': len(timecards) + 1,
+                'FirmUserId': user['Id'],
+                'Date': day,
+                'Hours': round(rng.uniform(1, 7), 2) if rng.random() < PARTIAL_DAY_RATE else 8.0,
+                'ProjectId': rng.randrange(1000, 1100),
+                'Description': "Client work",
+                'Billable': rng.random() < 0.8,
+                'LastUpdatedDate': f"{day}T18:00:00.000Z",
+            })
+    return timecards
+
+class EmulatorServer(ThreadingHTTPServer):
+    # A deep listen backlog, so connection bursts from a load test aren't dropped (and retried a second later)
+    request_queue_size = 1024
+
+class EmulatorConfig:
+    """Failure and latency behaviour of the emulator."""
+    def __init__(self, latency: float = 0.0, latency_jitter: float = 0.0, per_record_latency: float = 0.0,
+                 max_requests_per_second: Optional[float] = None, throttle_rate: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 0):
+        """
+        Args:
+        - latency: Base delay per search request, in seconds.
+        - latency_jitter: Extra random delay per request, uniform in [0, latency_jitter] seconds.
+        - per_record_latency: Extra delay per returned record, in seconds (larger pages are slower).
+        - max_requests_per_second: Search requests above this rate get HTTP 429 with Retry-After (None: unlimited).
+        - throttle_rate: Share (0-1) of search requests randomly answered with HTTP 429.
+        - error_rate: Share (0-1) of search requests answered with an error Status.ResponseCode (HTTP 200).
+        - seed: Random seed for latency and fault injection.
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.per_record_latency = per_record_latency
+        self.max_requests_per_second = max_requests_per_second
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.seed = seed
+
+class TimeSolvEmulator:
+    """
+    In-process HTTP server emulating the TimeSolv endpoints the tracker uses.
+
+    Usage:
+        with TimeSolvEmulator(users, timecards, EmulatorConfig(latency=0.05)) as emulator:
+            api = TimeSolvAPI(access_token, base_url=emulator.base_url)
+    """
+    def __init__(self, users: List[Dict], timecards: List[Dict], config: Optional[EmulatorConfig] = None,
+                 host: str = '127.0.0.1', port: int = 0):
+        """
+        Args:
+        - users: Firm users served by firmUserSearch.
+        - timecards: Timecards served by timecardSearch.
+        - config: Latency and fault injection settings.
+        - host: Interface to listen on.
+        - port: Port to listen on (0 picks a free port).
+        """
+        self.users = users
+        self.config = config or EmulatorConfig()
+        self.rng = random.Random(self.config.seed)
+        self.tokens = set()
+        self.lock = threading.Lock()
+        self.request_counts: Dict[str, int] = {}
+
+        # Timecards indexed by user and sorted by date, so per-user searches don't scan the whole firm
+        self.timecards = sorted(timecards, key=lambda tc: (tc['Date'], tc['Id']))
+        self.timecards_by_user: Dict[int, List[Dict]] = {}
+        for tc in self.timecards:
+            self.timecards_by_user.setdefault(tc['FirmUserId'], []).append(tc)
+
+        # Token bucket for max_requests_per_second
+        self._bucket = self.config.max_requests_per_second or 0.0
+        self._bucket_updated = time.monotonic()
+
+        self.server = EmulatorServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'TimeSolvEmulator':
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> 'TimeSolvEmulator':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count(self, name: str):
+        with self.lock:
+            self.request_counts[name] = self.request_counts.get(name, 0) + 1
+
+    def issue_token(self, form: Dict[str, str]) -> Tuple[int, Dict]:
+        """oAuth2V1/Token: any authorization_code grant with a code gets a fresh bearer token."""
+        if form.get('grant_type') != 'authorization_code' or not form.get('code'):
+            return 400, {'error': 'invalid_grant', 'error_description': "The authorization code is invalid or expired."}
+
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.tokens.add(token)
+        return 200, {'access_token': token, 'token_type': 'bearer', 'expires_in': 3600}
+
+    def throttled(self) -> bool:
+        """Whether this search request should get a 429 (token bucket, then random throttling)."""
+        with self.lock:
+            rate = self.config.max_requests_per_second
+            if rate:
+                now = time.monotonic()
+                self._bucket = min(rate, self._bucket + (now - self._bucket_updated) * rate)
+                self._bucket_updated = now
+                if self._bucket < 1:
+                    return True
+                self._bucket -= 1
+            return self.rng.random() < self.config.throttle_rate
+
+    def search(self, records: List[Dict], payload: Dict, result_key: str) -> Tuple[int, Dict]:
+        """
+        Run a search payload (Criteria, OrderBy, SortOrderAscending, PageSize, PageNumber) over the records.
+
+        Returns:
+        - Tuple of (HTTP status, response body in the TimeSolv Status envelope).
+        """
+        with self.lock:
+            inject_error = self.rng.random() < self.config.error_rate
+            delay = self.config.latency + self.rng.uniform(0, self.config.latency_jitter)
+        if inject_error:
+            time.sleep(delay)
+            return 200, {'Status': {'ResponseCode': 500, 'Message': "Internal server error (injected)"}, result_key: []}
+
+        try:
+            page_size = int(payload.get('PageSize', 100))
+            page_number = int(payload.get('PageNumber', 1))
+            criteria = payload.get('Criteria') or []
+            for criterion in criteria:
+                if criterion['Operator'] not in OPERATORS:
+                    raise ValueError(f"Unsupported operator {criterion['Operator']}")
+            if page_size < 1 or page_number < 1:
+                raise ValueError("PageSize and PageNumber must be positive")
+        except (KeyError, TypeError, ValueError) as e:
+            return 200, {'Status': {'ResponseCode': 400, 'Message': f"Invalid search request: {e}"}, result_key: []}
+
+        matches = [record for record in records if matches_criteria(record, criteria)]
+        if payload.get('OrderBy'):
+            matches.sort(key=lambda record: record.get(payload['OrderBy']), reverse=not payload.get('SortOrderAscending', 1))
+
+        page = matches[(page_number - 1) * page_size:page_number * page_size]
+        time.sleep(delay + self.config.per_record_latency * len(page))
+        return 200, {'Status': {'ResponseCode': 200, 'Message': "Success"}, result_key: page, 'TotalCount': len(matches)}
+
+    def timecard_candidates(self, criteria: List[Dict]) -> List[Dict]:
+        """Narrow timecardSearch to one user's timecards and the date range, using the indexes."""
+        records = self.timecards
+        for criterion in criteria:
+            if criterion.get('FieldName') == 'FirmUserId' and criterion.get('Operator') == '=':
+                records = self.timecards_by_user.get(criterion['Value'], [])
+
+        dates = [tc['Date'] for tc in records]
+        low, high = 0, len(records)
+        for criterion in criteria:
+            if criterion.get('FieldName') != 'Date':
+                continue
+            if criterion.get('Operator') == '>=':
+                low = max(low, bisect_left(dates, criterion['Value']))
+            elif criterion.get('Operator') == '<=':
+                high = min(high, bisect_right(dates, criterion['Value']))
+        return records[low:high]
+
+    def _handler_class(self):
+        emulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, body: Dict, headers: Optional[Dict[str, str]] = None):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                raw_body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                path = self.path.lower()
+
+                if path.endswith('/oauth2v1/token'):
+                    emulator._count('token')
+                    form = {key: values[0] for key, values in parse_qs(raw_body.decode('utf-8')).items()}
+                    self._reply(*emulator.issue_token(form))
+                    return
+
+                if path.endswith('/oauth2v1/firmusersearch'):
+                    name, result_key = 'firmUserSearch', 'FirmUsers'
+                elif path.endswith('/oauth2v1/timecardsearch'):
+                    name, result_key = 'timecardSearch', 'TimeCards'
+                else:
+                    self._reply(404, {'Message': f"No HTTP resource was found that matches {self.path}"})
+                    return
+                emulator._count(name)
+
+                token = (self.headers.get('Authorization') or '').removeprefix('Bearer ')
+                if token not in emulator.tokens:
+                    self._reply(401, {'Message': "Authorization has been denied for this request."})
+                    return
+
+                if emulator.throttled():
+                    emulator._count('throttled')
+                    self._reply(429, {'Message': "Too many requests."}, {'Retry-After': '1'})
+                    return
+
+                try:
+                    payload = json.loads(raw_body or b'{}')
+                except ValueError:
+                    self._reply(400, {'Message': "The request is invalid."})
+                    return
+
+                if name == 'firmUserSearch':
+                    records = emulator.users
+                else:
+                    records = emulator.timecard_candidates(payload.get('Criteria') or [])
+                status, body = emulator.search(records, payload, result_key)
+
+                # Conditional requests: an unchanged result page is answered with 304 Not Modified
+                etag = f'"{hashlib.sha1(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()}"'
+                if status == 200 and body['Status']['ResponseCode'] == 200 and self.headers.get('If-None-Match') == etag:
+                    emulator._count('notModified')
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self._reply(status, body, {'ETag': etag})
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local TimeSolv API emulator.")
+    parser.add_argument('--users', type=int, default=10_000, help="Number of synthetic firm users.")
+    parser.add_argument('--start-date', default=None, help="First timecard date (default: Monday four weeks ago).")
+    parser.add_argument('--end-date', default=None, help="Last timecard date (default: today).")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help="Base delay per search request, in seconds.")
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help="Extra random delay per request, in seconds.")
+    parser.add_argument('--max-rps', type=float, default=None, help="Search requests per second before HTTP 429.")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Share of search requests randomly answered with 429.")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of search requests answered with an error ResponseCode.")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    today = date.today()
+    start_date = args.start_date or (today - timedelta(days=today.weekday(), weeks=4)).isoformat()
+    end_date = args.end_date or today.isoformat()
+
+    users = generate_firm_users(args.users, args.seed)
+    timecards = generate_timecards(users, start_date, end_date, args.seed)
+    config = EmulatorConfig(args.latency, args.latency_jitter, max_requests_per_second=args.max_rps,
+                            throttle_rate=args.throttle_rate, error_rate=args.error_rate, seed=args.seed)
+
+    emulator = TimeSolvEmulator(users, timecards, config, port=args.port)
+    print(f"TimeSolv emulator serving {len(users)} users and {len(timecards)} timecards at {emulator.base_url}")
+    print(f"Run the tracker against it with TIMESOLV_BASE_URL={emulator.base_url}")
+    try:
+        emulator.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.server.server_close()
+
+if __name__ == "__main__":
+    main()
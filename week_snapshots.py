@@ -0,0 +1,455 @@
+import argparse
+import ast
+import csv
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Dict, Set, Optional, Callable, Tuple
+from zoneinfo import ZoneInfo
+from config import get_env, get_state_file
+from submission_index import SubmissionIndex, get_week_start, get_work_dates
+from timesolv_api import UPDATED_FIELD
+
+logger = logging.getLogger(__name__)
+
+# Default file name of the snapshot store, inside the state directory
+DEFAULT_SNAPSHOT_FILENAME = 'snapshots.db'
+
+# Days after a week's Friday before it is sealed (late timecards usually arrive within a week);
+# FREEZE_GRACE_DAYS overrides it
+DEFAULT_GRACE_DAYS = 7
+
+# Where a snapshot came from: a full TimeSolv fetch, or an imported artifact CSV. Artifact CSVs list only the users
+# with missing dates (without Email/Name), so an artifact snapshot's TrackedUsers and PercentMissing are unknown (None)
+TIMESOLV_SOURCE = 'timesolv'
+ARTIFACT_SOURCE = 'artifact'
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+class WeekSnapshot:
+    """
+    Immutable, compact record of one closed work week: who was tracked and which days each user missed.
+
+    Missing days are stored as one bitmask per user (bit i = i-th work day of the week).
+    """
+    def __init__(self, week_start: str, week_end: str, users: List[List], sealed_at: Optional[str] = None,
+                 stats: Optional[Dict] = None, source: str = TIMESOLV_SOURCE, as_of: Optional[str] = None):
+        """
+        Args:
+        - week_start: Monday of the week (YYYY-MM-DD).
+        - week_end: Friday of the week (YYYY-MM-DD).
+        - users: List of [user ID, email, name, missing-day bitmask] entries.
+        - sealed_at: When the snapshot was sealed (None until it is stored).
+        - stats: Sealed statistics (see stats()), computed from the users if not given.
+        - source: TIMESOLV_SOURCE or ARTIFACT_SOURCE.
+        - as_of: When the data was read (America/New_York, TIMESTAMP_FORMAT); timecards edited later amend the week.
+        """
+        self.week_start = week_start
+        self.week_end = week_end
+        self.work_dates = get_work_dates(week_start, week_end)
+        self.users = users
+        self.sealed_at = sealed_at
+        self._stats = stats
+        self.source = source
+        self.as_of = as_of or sealed_at
+
+    @classmethod
+    def from_missing(cls, week_start: str, week_end: str, users: Dict[int, Tuple[Optional[str], Optional[str]]],
+                     missing: Dict[int, List[str]], source: str = TIMESOLV_SOURCE, as_of: Optional[str] = None) -> 'WeekSnapshot':
+        """
+        Build a snapshot from per-user missing dates.
+
+        Args:
+        - users: Dictionary of user ID to (email, name) for every tracked user.
+        - missing: Dictionary of user ID to missing work dates (users missing nothing may be left out).
+        - source: TIMESOLV_SOURCE or ARTIFACT_SOURCE.
+        - as_of: When the data was read (see __init__).
+        """
+        work_dates = get_work_dates(week_start, week_end)
+        entries = []
+        for user_id in sorted(users):
+            missed = set(missing.get(user_id, ()))
+            mask = sum(1 << i for i, day in enumerate(work_dates) if day in missed)
+            entries.append([user_id, users[user_id][0], users[user_id][1], mask])
+        return cls(week_start, week_end, entries, source=source, as_of=as_of)
+
+    def encode(self) -> bytes:
+        content = {'week_start': self.week_start, 'week_end': self.week_end, 'users': self.users, 'stats': self.stats(),
+                   'source': self.source, 'as_of': self.as_of}
+        return zlib.compress(json.dumps(content, separators=(',', ':')).encode('utf-8'))
+
+    @classmethod
+    def decode(cls, data: bytes, sealed_at: Optional[str] = None) -> 'WeekSnapshot':
+        content = json.loads(zlib.decompress(data))
+        return cls(content['week_start'], content['week_end'], content['users'], sealed_at, content.get('stats'),
+                   content.get('source', TIMESOLV_SOURCE), content.get('as_of'))
+
+    def missing_dates(self, mask: int) -> List[str]:
+        return [day for i, day in enumerate(self.work_dates) if mask & (1 << i)]
+
+    def rows(self) -> List[Dict]:
+        """The week's tracker rows ('UserId', 'Email', 'Name', 'NoSubmissionDates', 'NoSubmissionCount')."""
+        rows = []
+        for user_id, email, name, mask in self.users:
+            missing = self.missing_dates(mask)
+            rows.append({'UserId': user_id, 'Email': email, 'Name': name, 'NoSubmissionDates': missing, 'NoSubmissionCount': len(missing)})
+        return rows
+
+    def stats(self) -> Dict:
+        """
+        Summary statistics of the week.
+
+        Returns:
+        - Dictionary with 'TrackedUsers', 'UsersMissing', 'PercentMissing', 'MissedDays',
+          'MissedByDate' (date -> count) and 'MostFrequentDays' (dates with the highest count).
+          TrackedUsers and PercentMissing are None for an artifact snapshot.
+        """
+        if self._stats is not None:
+            return self._stats
+
+        missed_by_date = Counter()
+        users_missing = 0
+        for _, _, _, mask in self.users:
+            if mask:
+                users_missing += 1
+                missed_by_date.update(self.missing_dates(mask))
+
+        highest = max(missed_by_date.values(), default=0)
+        complete = self.source != ARTIFACT_SOURCE
+        self._stats = {
+            'TrackedUsers': len(self.users) if complete else None,
+            'UsersMissing': users_missing,
+            'PercentMissing': (round(users_missing / len(self.users) * 100, 2) if self.users else 0) if complete else None,
+            'MissedDays': sum(missed_by_date.values()),
+            'MissedByDate': {day: missed_by_date.get(day, 0) for day in self.work_dates},
+            'MostFrequentDays': sorted(day for day, count in missed_by_date.items() if count == highest) if highest else [],
+        }
+        return self._stats
+
+class SnapshotStore:
+    """
+    Sealed week snapshots in SQLite. A sealed week is never rewritten; amend() drops it so the week is
+    refetched (and sealed again) by the next history query.
+    """
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+        - path: SQLite file for the snapshots. Defaults to SNAPSHOT_DB_PATH (a file name in the state directory, or an absolute path),
+          then DEFAULT_SNAPSHOT_FILENAME in the state directory.
+        """
+        self.path = path or get_state_file('SNAPSHOT_DB_PATH', DEFAULT_SNAPSHOT_FILENAME)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS week_snapshots (
+                week_start TEXT PRIMARY KEY,
+                week_end TEXT NOT NULL,
+                sealed_at TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                data BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS amendments (
+                week_start TEXT NOT NULL,
+                amended_at TEXT NOT NULL,
+                reason TEXT,
+                previous_hash TEXT
+            );
+        """)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def is_frozen(self, week_start: str) -> bool:
+        return self.connection.execute("SELECT 1 FROM week_snapshots WHERE week_start = ?", (week_start,)).fetchone() is not None
+
+    def frozen_weeks(self) -> List[str]:
+        return [row[0] for row in self.connection.execute("SELECT week_start FROM week_snapshots ORDER BY week_start")]
+
+    def seal(self, snapshot: WeekSnapshot) -> bool:
+        """
+        Store a week's snapshot.
+
+        Returns:
+        - True if the week was sealed, False if it already was (sealed weeks are immutable).
+        """
+        snapshot.sealed_at = datetime.now(ZoneInfo('America/New_York')).strftime(TIMESTAMP_FORMAT)
+        snapshot.as_of = snapshot.as_of or snapshot.sealed_at
+        data = snapshot.encode()
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO week_snapshots (week_start, week_end, sealed_at, content_hash, data) VALUES (?, ?, ?, ?, ?)",
+            (snapshot.week_start, snapshot.week_end, snapshot.sealed_at, hashlib.sha256(data).hexdigest(), data)
+        )
+        self.connection.commit()
+        return cursor.rowcount == 1
+
+    def load(self, week_start: str) -> Optional[WeekSnapshot]:
+        """Load a sealed week (None if it isn't sealed). Raises ValueError if the stored snapshot was altered."""
+        row = self.connection.execute(
+            "SELECT sealed_at, content_hash, data FROM week_snapshots WHERE week_start = ?", (week_start,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        sealed_at, content_hash, data = row
+        if hashlib.sha256(data).hexdigest() != content_hash:
+            raise ValueError(f"Snapshot of week {week_start} does not match its content hash.")
+        return WeekSnapshot.decode(data, sealed_at)
+
+    def amend(self, week_start: str, reason: Optional[str] = None) -> bool:
+        """
+        Unseal a week whose timecards were amended, so the next history query refetches it.
+
+        Returns:
+        - True if a sealed week was dropped.
+        """
+        row = self.connection.execute("SELECT content_hash FROM week_snapshots WHERE week_start = ?", (week_start,)).fetchone()
+        if row is None:
+            return False
+
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO amendments (week_start, amended_at, reason, previous_hash) VALUES (?, ?, ?, ?)",
+                (week_start, datetime.now(ZoneInfo('America/New_York')).strftime(TIMESTAMP_FORMAT), reason, row[0])
+            )
+            self.connection.execute("DELETE FROM week_snapshots WHERE week_start = ?", (week_start,))
+        return True
+
+def get_grace_days() -> int:
+    return int(get_env('FREEZE_GRACE_DAYS') or DEFAULT_GRACE_DAYS)
+
+def is_sealable(week_end: str, grace_days: int, today: Optional[date] = None) -> bool:
+    """Whether a week ending on week_end (YYYY-MM-DD) is past its grace period."""
+    today = today or datetime.now(ZoneInfo('America/New_York')).date()
+    return date.fromisoformat(week_end) + timedelta(days=grace_days) < today
+
+def week_range(start_week: str, end_week: str) -> List[Tuple[str, str]]:
+    """(Monday, Friday) pairs for every week from start_week's to end_week's week, inclusive."""
+    monday, last = date.fromisoformat(get_week_start(start_week)), date.fromisoformat(get_week_start(end_week))
+    weeks = []
+    while monday <= last:
+        weeks.append((monday.isoformat(), (monday + timedelta(days=4)).isoformat()))
+        monday += timedelta(weeks=1)
+    return weeks
+
+def week_roster(firm_users: List[Dict], week_start: str) -> List[Dict]:
+    """
+    Firm users (active and inactive, see connect_timesolv) who were tracked in a past week.
+
+    When results are persisted (RESULTS_ENABLED), the week's stored tracker rows are the exact roster of that run.
+    Otherwise active users are kept, plus inactive users last updated (i.e. deactivated) after the week started.
+    """
+    from results_store import results_enabled
+    if results_enabled():
+        from results_store import ResultsStore
+
+        results_store = ResultsStore()
+        tracked_ids = {row['UserId'] for row in results_store.week_results(week_start)}
+        results_store.close()
+        if tracked_ids:
+            return [user for user in firm_users if user['Id'] in tracked_ids]
+
+    return [user for user in firm_users
+            if user.get('UserStatus') == 'Active' or (user.get(UPDATED_FIELD) or '') >= week_start]
+
+def fetch_week(timesolv_api, firm_users: List[Dict], week_start: str, week_end: str) -> Tuple[WeekSnapshot, Dict[int, str]]:
+    """
+    Derive one week from TimeSolv (the week's roster and exclusion rules applied).
+
+    Returns:
+    - Tuple of (snapshot of the week, dictionary of user ID to error for users whose fetch failed).
+    """
+    from exclusion_rules import ExclusionRules
+
+    # Read before fetching, so timecards edited during the fetch count as amendments
+    as_of = datetime.now(ZoneInfo('America/New_York')).strftime(TIMESTAMP_FORMAT)
+    rules = ExclusionRules.load().compile(week_start, week_end)
+    tracked_users, _ = rules.partition(week_roster(firm_users, week_start))
+    index = SubmissionIndex()
+    index.add_firm_users(tracked_users)
+    failed = index.sync(timesolv_api, week_start, week_end, force=True)
+
+    users = {user_id: (details['Email'], details['Name']) for user_id, details in index.users.items() if user_id not in failed}
+    missing = {user_id: tracked for user_id, dates in index.who_is_missing(week_start, week_end).items()
+               if (tracked := rules.tracked_dates(user_id, dates))}
+    return WeekSnapshot.from_missing(week_start, week_end, users, missing, as_of=as_of), failed
+
+def _to_utc(timestamp: str) -> str:
+    """America/New_York TIMESTAMP_FORMAT time as a UTC YYYY-MM-DDTHH:MM:SS string (TimeSolv's UPDATED_FIELD format)."""
+    local = datetime.strptime(timestamp, TIMESTAMP_FORMAT).replace(tzinfo=ZoneInfo('America/New_York'))
+    return local.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+def amended_weeks(timesolv_api, snapshots: List[WeekSnapshot]) -> List[str] | str:
+    """
+    Sealed weeks with timecards added or edited after their data was read, found with one TimeSolv search
+    for every snapshot (timecards of those weeks with UPDATED_FIELD after the oldest snapshot's as_of).
+
+    NOTE: a deleted timecard is not returned by any search, so a week whose timecards were only deleted after
+    sealing is not detected (it could only be found by refetching the whole week, which sealing avoids). Such a week
+    keeps its sealed data until it is unsealed with `--amend WEEK_START`.
+
+    Returns:
+    - Sorted week starts of the amended weeks.
+    - Error code as string if the search fails.
+    """
+    if not snapshots:
+        return []
+
+    read_at = {snapshot.week_start: _to_utc(snapshot.as_of) for snapshot in snapshots}
+    timecards = timesolv_api.search_timecards(min(read_at), max(snapshot.week_end for snapshot in snapshots),
+                                              fields=['Date', UPDATED_FIELD], updated_since=min(read_at.values()))
+    if isinstance(timecards, str):
+        return timecards
+
+    amended = set()
+    for timecard in timecards:
+        week_start = get_week_start(timecard['Date'])
+        if week_start in read_at and (timecard.get(UPDATED_FIELD) or '') >= read_at[week_start]:
+            amended.add(week_start)
+    return sorted(amended)
+
+def week_history(store: SnapshotStore, start_week: str, end_week: str, connect: Callable[[], object],
+                 grace_days: Optional[int] = None, check_amendments: bool = True) -> List[Tuple[WeekSnapshot, str]]:
+    """
+    Submission history for a range of weeks. Sealed weeks are served from their snapshots unless TimeSolv reports
+    timecards edited since (one search for all of them, see amended_weeks), in which case they are unsealed and
+    refetched; other weeks are fetched, and sealed once past the grace period (if every user was fetched).
+
+    Args:
+    - store: Snapshot store.
+    - start_week: Any date in the first week (YYYY-MM-DD).
+    - end_week: Any date in the last week (YYYY-MM-DD).
+    - connect: Called at most once, only if TimeSolv is needed; returns a TimeSolvAPI (closed here when done).
+    - grace_days: Days after a week's Friday before it is sealed. Defaults to FREEZE_GRACE_DAYS, then DEFAULT_GRACE_DAYS.
+    - check_amendments: Look for timecards edited after sealing. Without it, sealed weeks need no TimeSolv call.
+
+    Returns:
+    - List of (snapshot, source) per week, oldest first; source is 'snapshot', 'artifact' (sealed from an artifact CSV),
+      'sealed' (fetched and sealed now) or 'fetched' (fetched, not sealed).
+    """
+    grace_days = get_grace_days() if grace_days is None else grace_days
+    weeks = week_range(start_week, end_week)
+    snapshots = {week_start: store.load(week_start) for week_start, _ in weeks}
+    timesolv_api = firm_users = None
+    history = []
+
+    try:
+        if check_amendments and any(snapshots.values()):
+            timesolv_api = connect()
+            amended = amended_weeks(timesolv_api, [snapshot for snapshot in snapshots.values() if snapshot is not None])
+            if isinstance(amended, str):
+                raise RuntimeError(amended)
+            for week_start in amended:
+                store.amend(week_start, reason="Timecards edited after the week was sealed")
+                snapshots[week_start] = None
+                logger.info(f"Unsealed week {week_start}: timecards were edited after it was sealed.")
+
+        for week_start, week_end in weeks:
+            snapshot = snapshots[week_start]
+            if snapshot is not None:
+                history.append((snapshot, 'artifact' if snapshot.source == ARTIFACT_SOURCE else 'snapshot'))
+                continue
+
+            if timesolv_api is None:
+                timesolv_api = connect()
+            if firm_users is None:
+                # Inactive users too, since a user who left since then was still tracked in past weeks
+                firm_users = timesolv_api.get_all_firm_users(include_inactive=True)
+                if isinstance(firm_users, str):
+                    raise RuntimeError(firm_users)
+
+            snapshot, failed = fetch_week(timesolv_api, firm_users, week_start, week_end)
+            for user_id, error in failed.items():
+                logger.error(f"Error fetching timecards for user {user_id} in week {week_start}: {error}")
+
+            if not failed and is_sealable(week_end, grace_days) and store.seal(snapshot):
+                history.append((snapshot, 'sealed'))
+            else:
+                history.append((snapshot, 'fetched'))
+    finally:
+        if timesolv_api is not None:
+            timesolv_api.close()
+
+    return history
+
+def seal_artifact(store: SnapshotStore, path: str, grace_days: Optional[int] = None) -> bool:
+    """
+    Seal a week from a committed artifacts/timecard_submissions_<start>_to_<end>.csv file (no TimeSolv calls).
+
+    The snapshot is labelled ARTIFACT_SOURCE: the file only lists users with missing dates, so the week's tracked-user
+    count is unknown. Its data counts as read at the file's latest lastUpdateDate, so later edits amend the week.
+
+    Returns:
+    - True if the week was sealed, False if it is still in its grace period or already sealed.
+    """
+    week_start, week_end = os.path.basename(path)[len('timecard_submissions_'):-len('.csv')].split('_to_')
+    if not is_sealable(week_end, get_grace_days() if grace_days is None else grace_days):
+        return False
+
+    users, missing, updated = {}, {}, []
+    with open(path, newline='', encoding='utf8') as f:
+        for row in csv.DictReader(f):
+            user_id = int(row['UserId'])
+            users[user_id] = (row.get('Email'), row.get('Name'))
+            missing[user_id] = ast.literal_eval(row['NoSubmissionDates']) if row.get('NoSubmissionDates') else []
+            if row.get('lastUpdateDate'):
+                updated.append(row['lastUpdateDate'])
+    as_of = max(updated, default=f"{week_start} 00:00:00")
+    return store.seal(WeekSnapshot.from_missing(week_start, week_end, users, missing, source=ARTIFACT_SOURCE, as_of=as_of))
+
+def connect_timesolv():
+    """Authenticate with TimeSolv (used only when a week must be checked or fetched)."""
+    from timesolv_api import TimeSolvAPI, TimeSolveAuth
+
+    status, access_token = TimeSolveAuth().get_access_token()
+    if not status:
+        raise RuntimeError(access_token)
+    return TimeSolvAPI(access_token=access_token)
+
+def main():
+    parser = argparse.ArgumentParser(description="Weekly submission history served from sealed week snapshots.")
+    parser.add_argument('--weeks', type=int, default=8, help="Number of closed weeks before the current one.")
+    parser.add_argument('--store', default=None, help="Path of the snapshot database.")
+    parser.add_argument('--amend', action='append', default=[], metavar='WEEK_START', help="Unseal an amended week so it is refetched (e.g. after timecards were deleted, which the amendment check cannot see).")
+    parser.add_argument('--import-artifacts', default=None, metavar='DIR', help="Seal weeks from artifacts/timecard_submissions_*.csv files.")
+    parser.add_argument('--skip-amendment-check', action='store_true', help="Serve sealed weeks without checking TimeSolv for edited timecards.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    store = SnapshotStore(args.store)
+
+    for week_start in args.amend:
+        if store.amend(get_week_start(week_start), reason="Amended via --amend"):
+            logger.info(f"Unsealed week {get_week_start(week_start)}; it will be refetched.")
+
+    if args.import_artifacts:
+        for name in sorted(os.listdir(args.import_artifacts)):
+            if name.startswith('timecard_submissions_') and name.endswith('.csv'):
+                if seal_artifact(store, os.path.join(args.import_artifacts, name)):
+                    logger.info(f"Sealed {name}.")
+
+    today = datetime.now(ZoneInfo('America/New_York')).date()
+    last_closed = today - timedelta(days=today.weekday(), weeks=1)
+    started = time.perf_counter()
+    history = week_history(store, (last_closed - timedelta(weeks=args.weeks - 1)).isoformat(), last_closed.isoformat(), connect_timesolv,
+                           check_amendments=not args.skip_amendment_check)
+
+    print(f"{'week':<12}{'source':<10}{'tracked':>8}{'missing':>8}{'% missing':>10}  most frequent")
+    for snapshot, source in history:
+        stats = snapshot.stats()
+        tracked = '-' if stats['TrackedUsers'] is None else stats['TrackedUsers']
+        percent = '-' if stats['PercentMissing'] is None else f"{stats['PercentMissing']:.2f}"
+        print(f"{snapshot.week_start:<12}{source:<10}{tracked:>8}{stats['UsersMissing']:>8}"
+              f"{percent:>10}  {', '.join(stats['MostFrequentDays'])}")
+
+    from_snapshots = sum(1 for _, source in history if source in ('snapshot', 'artifact'))
+    print(f"{from_snapshots} of {len(history)} weeks served from snapshots in {time.perf_counter() - started:.2f} s.")
+    store.close()
+
+if __name__ == "__main__":
+    main()